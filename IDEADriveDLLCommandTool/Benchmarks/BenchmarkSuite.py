@@ -0,0 +1,200 @@
+# Name:           BenchmarkSuite.py
+# Environment:    Python 3.11
+# File Type:      Benchmark
+# Description:    Repeatable benchmarks of the IDEADrvCommander call paths: getter polling, SendCommand
+#                 round trips, address switching across RS485 drives, GetAllAvailableAddresses,
+#                 GetCommandList parsing and command metadata lookups. Runs against the simulated drive
+#                 (IDEADrvSimulator, link latency and baud rate configurable) or the StandInDrive library,
+#                 and reports ops/sec, latency percentiles and memory per call. Results are written as
+#                 JSON and can be compared against an earlier run:
+#                     python BenchmarkSuite.py --latency 0.0005 --output results.json
+#                     python BenchmarkSuite.py --compare results.json [--tolerance 0.15]
+#                 Memory per call: peak traced bytes of a single call (transient allocations) and the
+#                 net number of allocated blocks left behind per call.
+
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import IDEADrvCommander
+from IDEADrvCommandSet import CommandSet
+from IDEADrvSimulator import SimulatedDLL
+
+PORT = "COM1"
+MEMORY_SAMPLES = 200
+
+def Percentile(sortedValues, fraction):
+    if not sortedValues:
+        return 0.0
+    index = min(len(sortedValues) - 1, max(0, int(round(fraction * (len(sortedValues) - 1)))))
+    return sortedValues[index]
+
+def MeasureMemory(func, samples=MEMORY_SAMPLES):
+    # (peak bytes of one call, net allocated blocks per call)
+    func()
+    gc.collect()
+    gc.disable()
+    try:
+        blocks = sys.getallocatedblocks()
+        for _ in range(samples):
+            func()
+        retained = (sys.getallocatedblocks() - blocks) / float(samples)
+        tracemalloc.start()
+        peak = 0
+        for _ in range(samples):
+            tracemalloc.reset_peak()
+            current = tracemalloc.get_traced_memory()[0]
+            func()
+            peak += tracemalloc.get_traced_memory()[1] - current
+        tracemalloc.stop()
+    finally:
+        gc.enable()
+    return peak / float(samples), retained
+
+def TimeRound(func, iterations):
+    # (seconds, sorted per call latencies in ns) of one round
+    clock = time.perf_counter_ns
+    latencies = [0] * iterations
+    start = clock()
+    for i in range(iterations):
+        t = clock()
+        func()
+        latencies[i] = clock() - t
+    total = (clock() - start) / 1e9
+    latencies.sort()
+    return total, latencies
+
+def Run(name, func, iterations, repeat=3, warmup=20):
+    # The fastest of repeat rounds is reported, which keeps scheduler noise out of comparisons
+    for _ in range(warmup):
+        func()
+    total, latencies = min((TimeRound(func, iterations) for _ in range(repeat)), key=lambda r: r[0])
+    peakBytes, retainedBlocks = MeasureMemory(func)
+    result = {
+        'iterations': iterations,
+        'repeat': repeat,
+        'seconds': total,
+        'opsPerSec': iterations / total if total > 0 else 0.0,
+        'p50us': Percentile(latencies, 0.5) / 1e3,
+        'p90us': Percentile(latencies, 0.9) / 1e3,
+        'p99us': Percentile(latencies, 0.99) / 1e3,
+        'maxus': latencies[-1] / 1e3,
+        'peakBytesPerCall': peakBytes,
+        'retainedBlocksPerCall': retainedBlocks,
+    }
+    print("%-28s %12.0f ops/s  p50 %9.1f us  p99 %9.1f us  %7.0f B/call" %
+          (name, result['opsPerSec'], result['p50us'], result['p99us'], result['peakBytesPerCall']))
+    return result
+
+def MakeBackend(args):
+    if args.backend == "simulated":
+        return SimulatedDLL({PORT: tuple(range(1, args.drives + 1))}, latency=args.latency, baud=args.baud)
+    if args.backend == "standin":
+        from PrototypeBenchmark import BuildStandIn
+        return args.lib or BuildStandIn()
+    return args.backend
+
+def Cases(drive, args):
+    addresses = ["#%03d" % a for a in range(1, args.drives + 1)]
+    commandNames = drive.GetCommandList()
+    commandNames = commandNames if isinstance(commandNames, str) else drive.Buffer2String(commandNames)
+    names = [n for n in commandNames.split(",") if n]
+    name = names[0] if names else ""
+    letter = drive.GetCommandLetterFromDescriptive(name) if name else "v"
+    state = {'next': 0}
+
+    def switchAddress():
+        # Next drive on the bus, then one getter at that address
+        state['next'] = (state['next'] + 1) % len(addresses)
+        with drive.Transaction(addresses[state['next']]):
+            drive.GetPositionVelocity()
+
+    def parseCommandList():
+        return [n for n in drive.GetCommandList().split(",") if n]
+
+    def lookupsUncached():
+        commandSet, drive.commandSet = drive.commandSet, None
+        try:
+            drive.GetCommandLetterFromDescriptive(name)
+            drive.GetParameterList(letter)
+            drive.GetOutputFieldList(letter)
+        finally:
+            drive.commandSet = commandSet
+
+    def lookupsCached():
+        drive.GetCommandLetterFromDescriptive(name)
+        drive.GetParameterList(letter)
+        drive.GetOutputFieldList(letter)
+
+    return [
+        ("getter polling", drive.GetPositionVelocity, args.iterations),
+        ("SendCommand round trip", lambda: drive.SendCommand("v"), args.iterations),
+        ("address switching", switchAddress, args.iterations),
+        ("GetAllAvailableAddresses", drive.GetAllAvailableAddresses, max(1, args.iterations // 10)),
+        ("GetCommandList parsing", parseCommandList, max(1, args.iterations // 10)),
+        ("command set build", lambda: CommandSet.FromDLL(drive), max(1, args.iterations // 100)),
+        ("metadata lookups (DLL)", lookupsUncached, args.iterations),
+        ("metadata lookups (cached)", lookupsCached, args.iterations),
+    ]
+
+def Compare(results, baseline, tolerance):
+    # Returns the names of cases whose ops/sec dropped by more than tolerance
+    regressions = []
+    print("\n%-28s %12s %12s %8s" % ("case", "baseline", "now", "ratio"))
+    for name, result in results['results'].items():
+        before = baseline.get('results', {}).get(name)
+        if before is None or not before['opsPerSec']:
+            continue
+        ratio = result['opsPerSec'] / before['opsPerSec']
+        flag = ""
+        if ratio < 1.0 - tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print("%-28s %12.0f %12.0f %7.2fx%s" % (name, before['opsPerSec'], result['opsPerSec'], ratio, flag))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="IDEADrvCommander call path benchmarks")
+    parser.add_argument("--backend", default="simulated",
+                        help="simulated (default), standin, or the path of a DLL to load")
+    parser.add_argument("--lib", help="StandInDrive library for --backend standin (built with cc if omitted)")
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated link latency per transaction, seconds")
+    parser.add_argument("--baud", type=int, default=None, help="simulated link baud rate (default: unlimited)")
+    parser.add_argument("--drives", type=int, default=4, help="simulated drives on the bus")
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3, help="rounds per case, the fastest is reported")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--compare", help="compare against a JSON file written by an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed ops/sec drop for --compare")
+    args = parser.parse_args()
+
+    drive = IDEADrvCommander.IDEADrv(PORT, MakeBackend(args), "#001")
+    drive.OpenComms()
+    drive.InitializeCommandSet()
+    results = {
+        'meta': {'python': platform.python_version(), 'platform': platform.platform(),
+                 'backend': args.backend, 'latency': args.latency, 'baud': args.baud,
+                 'drives': args.drives, 'timestamp': time.time()},
+        'results': {},
+    }
+    for name, func, iterations in Cases(drive, args):
+        results['results'][name] = Run(name, func, iterations, args.repeat)
+    drive.CloseComms()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=1)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if Compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# Name:           FleetBenchmark.py
+# Environment:    Python 3.11
+# File Type:      Benchmark
+# Description:    Throughput of IDEADrvFleet against the number of buses. Every bus is a simulated port
+#                 with its own link latency; the same number of getter calls per bus is run once through
+#                 a single process DriveSession (all calls share one DLL) and once through a DriveFleet
+#                 with one worker process per bus. Run from this folder:
+#                     python FleetBenchmark.py [--buses 1 2 4 8] [--calls 200] [--latency 0.001]
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from IDEADrvFleet import DriveFleet
+from IDEADrvSession import DriveSession
+from IDEADrvSimulator import SimulatedLibrary
+
+def Poll(drive, calls):
+    # Runs inside the worker (or the session's bus thread): calls getter round trips on one drive
+    for _ in range(calls):
+        drive.GetPositionVelocity()
+    return calls
+
+def Buses(count):
+    return {"COM%d" % (i + 1): (1,) for i in range(count)}
+
+def TimeSession(buses, library, calls):
+    session = DriveSession(library())
+    for port in buses:
+        session.AddDrive(port, 1)
+    try:
+        start = time.perf_counter()
+        futures = [session.Submit(port, 1, Poll, calls) for port in buses]
+        for future in futures:
+            future.result()
+        return time.perf_counter() - start
+    finally:
+        session.Close()
+
+def TimeFleet(buses, library, calls):
+    with DriveFleet(library, buses) as fleet:
+        fleet.Broadcast("GetFirmwareVersion")       # workers started and ports open
+        start = time.perf_counter()
+        futures = [fleet.Submit(port, 1, Poll, calls) for port in buses]
+        for future in futures:
+            future.result()
+        return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="IDEADrvFleet throughput by number of buses")
+    parser.add_argument("--buses", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--calls", type=int, default=200, help="getter calls per bus")
+    parser.add_argument("--latency", type=float, default=0.001, help="simulated link latency per call, seconds")
+    args = parser.parse_args()
+
+    print("%6s %16s %16s %8s" % ("buses", "session calls/s", "fleet calls/s", "speedup"))
+    for count in args.buses:
+        buses = Buses(count)
+        library = SimulatedLibrary(buses, latency=args.latency)
+        total = count * args.calls
+        session = total / TimeSession(buses, library, args.calls)
+        fleet = total / TimeFleet(buses, library, args.calls)
+        print("%6d %16.0f %16.0f %7.2fx" % (count, session, fleet, fleet / session))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# Name:           PrototypeBenchmark.py
+# Environment:    Python 3.11
+# File Type:      Benchmark
+# Description:    Measures the per-call overhead of the IDEADrv wrappers against the StandInDrive
+#                 shared library. Compares the old pattern (argtypes reassigned on every call) with the
+#                 prebound prototype table. Run from this folder:
+#                     python PrototypeBenchmark.py [--lib path\to\StandInDrive.dll] [--calls N]
+#                 Without --lib the stand-in is compiled with the system C compiler (cc).
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from ctypes import *
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import IDEADrvCommander
+
+def BuildStandIn():
+    source = os.path.join(os.path.dirname(os.path.abspath(__file__)), "StandInDrive.c")
+    suffix = ".dll" if sys.platform.startswith('win') else ".so"
+    output = os.path.join(tempfile.gettempdir(), "StandInDrive" + suffix)
+    subprocess.check_call(["cc", "-shared", "-fPIC", "-O2", source, "-o", output])
+    return output
+
+def TimeCalls(func, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - start) / calls * 1e9
+
+#Old per-call pattern, kept here only as the baseline
+def LegacyGetFirmwareVersion(drive):
+    drive.cppdll.GetFWVersion.argtypes = [c_char_p, c_int]
+    mystrbuf = create_string_buffer(drive.MAX_BUFSIZE)
+    mystrbuf[0] = 0
+    drive.cppdll.GetFWVersion(mystrbuf, len(mystrbuf))
+    return drive.Buffer2String(mystrbuf.value)
+
+def LegacySendCommand(drive, command):
+    outputBuffer = create_string_buffer(drive.MAX_BUFSIZE)
+    drive.cppdll.SendCommand.argtypes = [c_char_p, c_char_p, c_int]
+    drive.cppdll.SendCommand(drive.enc(command), outputBuffer, len(outputBuffer))
+    return drive.Buffer2String(outputBuffer.value)
+
+def LegacyIsSerialOpen(drive):
+    drive.cppdll.IsSerialOpen.restype = c_bool
+    return drive.cppdll.IsSerialOpen()
+
+def LegacyMoveToPosition(drive, params):
+    drive.cppdll.MoveToPosition.argtypes = [c_char_p, c_int]
+    return drive.cppdll.MoveToPosition(drive.enc(params), len(params))
+
+def main():
+    parser = argparse.ArgumentParser(description="IDEADrv prototype binding microbenchmark")
+    parser.add_argument("--lib", help="stand-in shared library (built from StandInDrive.c if omitted)")
+    parser.add_argument("--calls", type=int, default=200000)
+    args = parser.parse_args()
+
+    drive = IDEADrvCommander.IDEADrv("COM1", args.lib or BuildStandIn())
+    moveParams = "1000,256000,256000,256000,512000,512000,1000,1000,1500,1500,10,64"
+    cases = [
+        ("GetFirmwareVersion", lambda: LegacyGetFirmwareVersion(drive), drive.GetFirmwareVersion),
+        ("SendCommand", lambda: LegacySendCommand(drive, "v"), lambda: drive.SendCommand("v")),
+        ("IsSerialOpen", lambda: LegacyIsSerialOpen(drive), drive.IsSerialOpen),
+        ("MoveToPosition", lambda: LegacyMoveToPosition(drive, moveParams), lambda: drive.MoveToPosition(moveParams)),
+    ]
+    print("%-20s %14s %14s %9s" % ("call", "legacy ns/call", "bound ns/call", "speedup"))
+    for name, legacy, bound in cases:
+        legacyNs = TimeCalls(legacy, args.calls)
+        boundNs = TimeCalls(bound, args.calls)
+        print("%-20s %14.0f %14.0f %8.2fx" % (name, legacyNs, boundNs, legacyNs / boundNs))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+/*
+Name:           StandInDrive.c
+Environment:    Any C99 compiler (cc -shared -fPIC -O2 StandInDrive.c -o StandInDrive.so)
+File Type:      Benchmark support
+Description:    Minimal stand-in for IDEADriveCommand.dll. It exports a handful of the DLL functions
+                with the same C signatures but answers immediately from memory, so the benchmarks
+                measure only the Python/ctypes overhead of the IDEADrvCommander wrappers.
+*/
+#include <string.h>
+#include <stdio.h>
+#include <stdlib.h>
+
+#ifdef _WIN32
+#define EXPORT __declspec(dllexport)
+#else
+#define EXPORT
+#endif
+
+static char currentAddress[8] = "";
+static int serialOpen = 0;
+static long position = 0;
+
+static void fill(char* outBuffer, int bufferSize, const char* text)
+{
+    if (bufferSize <= 0) return;
+    strncpy(outBuffer, text, (size_t)bufferSize - 1);
+    outBuffer[bufferSize - 1] = 0;
+}
+
+/* Drive style response: "`" + command letter + values + 5 character trailer */
+static void respond(char* outBuffer, int bufferSize, char letter, const char* values)
+{
+    char text[128];
+    snprintf(text, sizeof(text), "`%c%s*000\r\n", letter, values);
+    fill(outBuffer, bufferSize, text);
+}
+
+EXPORT int OpenSerial(const char* port) { (void)port; serialOpen = 1; return 1; }
+EXPORT int CloseSerial(void) { serialOpen = 0; return 1; }
+EXPORT int IsSerialOpen(void) { return serialOpen; }
+
+EXPORT void SetCurrentAddress(const char* address, int length)
+{
+    if (length > 7) length = 7;
+    memcpy(currentAddress, address, (size_t)length);
+    currentAddress[length] = 0;
+}
+
+EXPORT void GetAddresses(int* addressList)
+{
+    int i;
+    for (i = 0; i < 256; i++) addressList[i] = (i == 1);
+}
+
+EXPORT void GetFWVersion(char* outBuffer, int bufferSize) { fill(outBuffer, bufferSize, "v5.12.3\r"); }
+
+EXPORT void GetPositionVelocity(char* outBuffer, int bufferSize)
+{
+    char values[64];
+    snprintf(values, sizeof(values), "%ld,0", position);
+    respond(outBuffer, bufferSize, 'l', values);
+}
+
+EXPORT void IsMoveExecuting(char* outBuffer, int bufferSize) { respond(outBuffer, bufferSize, 'o', "0"); }
+
+EXPORT int MoveToPosition(const char* parameters, int length)
+{
+    (void)length;
+    position = atol(parameters);
+    return 1;
+}
+
+EXPORT void SendCommand(const char* parameters, char* outBuffer, int bufferSize)
+{
+    char text[64];
+    snprintf(text, sizeof(text), "%s%c\r", currentAddress, parameters[0]);
+    fill(outBuffer, bufferSize, text);
+}
+
+EXPORT void SendTimedCommand(const char* parameters, char* outBuffer, int bufferSize, int waitTime, int readTime)
+{
+    (void)waitTime;
+    (void)readTime;
+    SendCommand(parameters, outBuffer, bufferSize);
+}
+
+EXPORT void InitializeCommandSet(void) { }
+
+EXPORT void GetCommandList(char* outBuffer)
+{
+    strcpy(outBuffer, "Get Firmware Version,Move To Position,Get Position Velocity");
+}
+
+EXPORT void GetOutputFieldList(const char* parameters, char* outBuffer, int bufferSize)
+{
+    if (parameters[0] == 'l') fill(outBuffer, bufferSize, "Position,Velocity\r");
+    else fill(outBuffer, bufferSize, "");
+}
+
+EXPORT void GetCommandLetterFromDescriptive(const char* parameters, char* outBuffer, int bufferSize)
+{
+    if (strcmp(parameters, "Get Firmware Version") == 0) fill(outBuffer, bufferSize, "v");
+    else if (strcmp(parameters, "Move To Position") == 0) fill(outBuffer, bufferSize, "M");
+    else if (strcmp(parameters, "Get Position Velocity") == 0) fill(outBuffer, bufferSize, "l");
+    else fill(outBuffer, bufferSize, "");
+}
+
+EXPORT void GetParameterList(const char* parameters, char* outBuffer, int bufferSize)
+{
+    if (parameters[0] == 'M') fill(outBuffer, bufferSize, "Position,Velocity,Acceleration,Deceleration");
+    else fill(outBuffer, bufferSize, "");
+}
+
+EXPORT int GetNumberOfParametersDesc(const char* parameters)
+{
+    return strcmp(parameters, "Move To Position") == 0 ? 4 : 0;
+}
+
+EXPORT int GetNumberOfOutputsDesc(const char* parameters)
+{
+    return strcmp(parameters, "Get Position Velocity") == 0 ? 2 : 0;
+}
+
+EXPORT void GetIOReading(char* outBuffer, int bufferSize) { respond(outBuffer, bufferSize, 'i', "0101,1"); }
+
+EXPORT void GetFaultReading(char* outBuffer, int bufferSize) { respond(outBuffer, bufferSize, 'f', "0"); }
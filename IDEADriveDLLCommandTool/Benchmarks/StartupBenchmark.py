@@ -0,0 +1,104 @@
+# Name:           StartupBenchmark.py
+# Environment:    Python 3.11
+# File Type:      Benchmark
+# Description:    Startup times, each measured in fresh Python processes (median of --runs):
+#                   import            import IDEADrvCommander
+#                   first command     import, IDEADrv(), OpenComms, GetFirmwareVersion
+#                   command set cold  first command plus LoadCommandSet without a cache file (DLL queried)
+#                   command set warm  first command plus LoadCommandSet from the cache file
+#                   first window      launch of IDEADriveDLLCommandTool.py until its window is drawn
+#                                     (skipped when tkinter or PIL is missing)
+#                 Every time is checked against --target (default 1 s). Run from this folder:
+#                     python StartupBenchmark.py [--dll path\to\IDEADriveCommandx64.dll] [--port COM3] [--runs 5]
+#                 Without --dll the simulated drive is used.
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+TOOL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+#Child process running one startup path
+CHILD = r"""
+import sys
+sys.path.insert(0, {toolDir!r})
+import IDEADrvCommander
+if {command!r}:
+    drive = IDEADrvCommander.IDEADrv({port!r}, {dll!r}, "")
+    drive.OpenComms()
+    drive.GetFirmwareVersion()
+    if {cache!r}:
+        drive.SetCommandSetCachePath({cache!r})
+        drive.LoadCommandSet()
+    drive.CloseComms()
+"""
+
+def RunChild(args, command=False, cache=None):
+    code = CHILD.format(toolDir=TOOL_DIR, command=command, port=args.port, dll=args.dll, cache=cache)
+    #Interpreter startup is part of what a user waits for, so it is timed from the launch
+    launched = time.perf_counter()
+    subprocess.check_call([sys.executable, "-c", code])
+    return time.perf_counter() - launched
+
+def TimeFirstWindow():
+    env = dict(os.environ, IDEADRV_STARTUP_BENCHMARK="1")
+    launched = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "IDEADriveDLLCommandTool.py"], cwd=TOOL_DIR, env=env,
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    try:
+        for line in process.stdout:
+            if line.strip() == "first window":
+                return time.perf_counter() - launched
+        return None
+    finally:
+        process.kill()
+        process.wait()
+
+def HasGUI():
+    check = "import tkinter, PIL; tkinter.Tk().destroy()"
+    return subprocess.call([sys.executable, "-c", check], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) == 0
+
+def Median(samples):
+    return statistics.median(samples) if samples else None
+
+def main():
+    parser = argparse.ArgumentParser(description="IDEADrvCommander and command tool startup times")
+    parser.add_argument("--dll", default="simulated", help="DLL path, or 'simulated'")
+    parser.add_argument("--port", default="COM1")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--target", type=float, default=1.0, help="seconds every time should stay under")
+    args = parser.parse_args()
+
+    results = {}
+    cache = os.path.join(tempfile.mkdtemp(), "IDEADriveCommandSet.json")
+    for _ in range(args.runs):
+        total = RunChild(args)
+        results.setdefault("import", []).append(total)
+        total = RunChild(args, command=True)
+        results.setdefault("first command", []).append(total)
+        if os.path.exists(cache):
+            os.remove(cache)
+        total = RunChild(args, command=True, cache=cache)
+        results.setdefault("command set cold", []).append(total)
+        total = RunChild(args, command=True, cache=cache)
+        results.setdefault("command set warm", []).append(total)
+    if HasGUI():
+        for _ in range(args.runs):
+            window = TimeFirstWindow()
+            if window is not None:
+                results.setdefault("first window", []).append(window)
+    else:
+        print("first window skipped: tkinter or PIL not available")
+
+    print("%-18s %10s %10s  %s" % ("step", "median ms", "max ms", "target"))
+    for name, samples in results.items():
+        median = Median(samples)
+        print("%-18s %10.1f %10.1f  %s" % (name, median * 1000.0, max(samples) * 1000.0,
+                                            "ok" if median < args.target else "SLOW"))
+
+if __name__ == "__main__":
+    main()
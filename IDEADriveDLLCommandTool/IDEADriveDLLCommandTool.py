@@ -10,26 +10,34 @@ Some libraries may need to be installed (such as tkinter) to run this example co
 """ 
 
 #Library Imports
-import time
+import os
 import tkinter as tk
 from tkinter import ttk
-import sys
-import glob
 from tkinter.ttk import Style
-import serial
 from tkinter import *
 from PIL import ImageTk, Image
 
 #For IDEA Drive object class
 import IDEADrvCommander
+import IDEADrvDiscovery
+import IDEADrvWorker
+import IDEADrvPlot
 
 #Constants
 DLL_PATH = ".\\IDEADriveCommandx64.dll"
+COMMAND_SET_CACHE = "IDEADriveCommandSet.json"
+PORT_CACHE = "IDEADrivePorts.json"
 MAX_NUM_OF_PARAMETERS = 12
 MAX_NUM_OF_OUTPUTS = 12
+TELEMETRY_RATE = 100.0
 #Globals
 ideaDriveAddresses = list()
 ideaDriveCommandSet = list()
+Ports = list()
+paramList = ['']
+outList = ['']
+telemetryWindow = None
+telemetryPanel = None
 #GUI setup
 root = Tk()
 root.geometry('775x500')
@@ -40,12 +48,18 @@ root.grid()
 root.configure()
 arrowPNG = ImageTk.PhotoImage(Image.open("Arrow2.png"))
 
-# Sets the IDEA Drive address depending on the input command
-def SetIDAddress(command):
+#Drive operations run on the DriveWorker thread (the functions ending in Job); their results come back
+#to the Tk main loop through the callbacks, which are the only functions that touch widgets.
+
+# The IDEA Drive address for the input command (read on the main loop, set by the job)
+def AddressFor(command):
     if command[0] == '#':
-        addr = command[0:4]
-        drive.SetCurrentAddress(addr)
-    elif ideaDriveAddresses:
+        return command[0:4]
+    return SelectedAddress()
+
+# The address selected in the address menu ("" broadcasts when no drives were found)
+def SelectedAddress():
+    if ideaDriveAddresses:
         tmp = addressOptionMenuClicked.get()
         if len(tmp) == 1:
             tmp = "#00" + tmp
@@ -53,83 +67,133 @@ def SetIDAddress(command):
             tmp = "#0" + tmp
         elif len(tmp) == 3:
             tmp = "#" + tmp
-        drive.SetCurrentAddress(tmp)
+        return tmp
     else:
-        drive.SetCurrentAddress("")
+        return ""
+
+def ShowResponse(response):
+    responseTextbox.config(state='normal')
+    responseTextbox.delete("1.0","end")
+    responseTextbox.insert(END, response)
+    responseTextbox.config(state='disabled')
+
+def ShowError(error):
+    ShowResponse("Error: " + str(error))
+
+def ShowPending(count):
+    if count:
+        statusLabel.configure(text=str(count) + " drive operation(s) in progress")
+    elif not progressBar.winfo_ismapped():
+        statusLabel.configure(text="Ready")
+
+def StartProgress(text):
+    statusLabel.configure(text=text)
+    progressBar.grid(row=0, column=1, sticky=W, padx=4)
+    progressBar.start(10)
+
+def StopProgress(text):
+    progressBar.stop()
+    progressBar.grid_remove()
+    statusLabel.configure(text=text)
+
+def SendCommandJob(address, command):
+    #Address and command in one transaction; telemetry streamers share the DLL
+    with drive.Transaction(address):
+        return drive.SendCommand(command)
 
 def SendCommand():
     # Set the proper IDEA Drive address
     command = executeEntry.get()
     if not command:
         return
-    SetIDAddress(command)
     #Get response and output to GUI.
-    response = drive.SendCommand(command)
-    time.sleep(0.06)
-    responseTextbox.config(state='normal')
-    responseTextbox.delete("1.0","end")
-    responseTextbox.insert(END, response)
-    responseTextbox.config(state='disabled')
+    worker.Submit(SendCommandJob, AddressFor(command), command, done=ShowResponse, failed=ShowError)
 
 #Converts list of parameters to a parameter string to send to the IDEA Drive
-def BuildParameterString(cmd):
+def BuildParameterString(cmd, values):
     out = cmd
-    for i in range(0, len(paramList), 1):
-        if IDparams[i].get() == "":
+    for value in values:
+        if value == "":
             return ""
-        out= out + IDparams[i].get() + ","
+        out= out + value + ","
     if out[len(out)-1] == ",":
         out = out[slice(0,-1)]
     return out
-        
-def SendDropDownCommand():
-    command = commandFinderOptionMenu.get()    
-    if not command:
-        return
-    SetIDAddress(command)
+
+def SendDropDownCommandJob(address, command, values):
     SendString = ""
     commandLetter = drive.GetCommandLetterFromDescriptive(command)
-    if paramList[0] != '':
-        SendString = BuildParameterString(commandLetter);
+    if values:
+        SendString = BuildParameterString(commandLetter, values);
         if SendString == "":
-            return
+            return None
     else:
         SendString = commandLetter
-    #Get response and output to GUI.
-    response = drive.SendCommand(SendString)
-    time.sleep(0.06)
-    responseTextbox.config(state='normal')
-    responseTextbox.delete("1.0","end")
-    responseTextbox.insert(END, response)
-    responseTextbox.config(state='disabled')
-    response = response[2:-5]
+    with drive.Transaction(address):
+        response = drive.SendCommand(SendString)
     if command != "Recall Program":
-        responseList = response.split(",")
-    else: responseList = response
+        responseList = drive.ParseResponse(commandLetter, response)
+    else: responseList = response[2:-5]
+    return response, responseList
 
+def ShowDropDownResponse(result):
+    if result is None:
+        return
+    response, responseList = result
+    ShowResponse(response)
     if outList[0] != '':
         for i in range(0,len(outList),1):
             IDoutputs[i].configure(state = 'normal')
             IDoutputs[i].delete(0,END)
-            IDoutputs[i].insert(0,responseList[i])
+            if responseList[i] is not None:
+                IDoutputs[i].insert(0,responseList[i])
             IDoutputs[i].configure(state = 'disabled')
 
-#This function will check to see if IDEA Drives are present on the selected serial port and list them in a dropdown menu.
-def FindDrives():
-    global drive
-    if (not drive.IsSerialOpen):
+def SendDropDownCommand():
+    command = commandFinderOptionMenu.get()    
+    if not command:
         return
-    #Clear options
-    addressOptionMenu['menu'].delete(0, 'end')
+    values = []
+    if paramList[0] != '':
+        values = [IDparams[i].get() for i in range(0, len(paramList), 1)]
+        if "" in values:
+            return
+    #Get response and output to GUI.
+    worker.Submit(SendDropDownCommandJob, AddressFor(command), command, values,
+                  done=ShowDropDownResponse, failed=ShowError)
+
+def FindDrivesJob(report):
+    if not drive.IsSerialOpen():
+        return []
+    report("Scanning " + drive.serialPort + " for drives...")
     #Get all addresses
     addrList = drive.GetAllAvailableAddresses()
-    #Clear existing lists
-    ideaDriveAddresses.clear()
     #Iterate through addresses and build list
+    addresses = []
     for i in range(len(addrList)):
         if addrList[i]:
             print("Address " + str(i) + " Active.")
-            ideaDriveAddresses.append(i)
+            addresses.append(i)
+    return addresses
+
+#This function will check to see if IDEA Drives are present on the selected serial port and list them in a dropdown menu.
+def FindDrives():
+    findAddressesButton.configure(state='disabled')
+    StartProgress("Scanning for drives...")
+    worker.Submit(FindDrivesJob, progress=StartProgress, done=UpdateAddressOptionMenu, failed=FindDrivesFailed)
+
+def FindDrivesFailed(error):
+    StopProgress("Drive scan failed")
+    findAddressesButton.configure(state='normal')
+    ShowError(error)
+
+def UpdateAddressOptionMenu(addresses):
+    StopProgress("Found " + str(len(addresses)) + " drive(s)")
+    findAddressesButton.configure(state='normal')
+    #Clear options and existing lists
+    addressOptionMenu['menu'].delete(0, 'end')
+    ideaDriveAddresses.clear()
+    ideaDriveAddresses.extend(addresses)
     #Update options
     if ideaDriveAddresses:
         addressOptionMenuClicked.set("Broadcast")
@@ -137,26 +201,91 @@ def FindDrives():
             addressOptionMenu['menu'].add_command(label=i, command=tk._setit(addressOptionMenuClicked, i))
         executeButton["state"]= "normal"
         commandFinderButton["state"]= "normal"
+        telemetryButton["state"]= "normal"
         addressOptionMenuClicked.set(ideaDriveAddresses[0])
     else:
         addressOptionMenuClicked.set("No Drives Available")
         executeButton["state"]= "disabled"
         commandFinderButton["state"]= "disabled"
+        telemetryButton["state"]= "disabled"
+
+def SavePorts(found):
+    #The next start shows these ports at once and only re-checks them
+    try:
+        IDEADrvDiscovery.SavePortList(PORT_CACHE, found)
+    except OSError:
+        pass
+
+def FindPortsJob(report):
+    #Close open port, then report each port as soon as it is confirmed
+    drive.CloseComms()
+    found = []
+    for port in portDiscovery.ScanPorts(force=True):
+        found.append(port)
+        report(port)
+    SavePorts(found)
+    return sorted(found)
+
+def CheckSavedPortsJob(saved):
+    drive.CloseComms()
+    found = sorted(portDiscovery.ScanPorts(force=True, candidates=saved))
+    if found != sorted(saved):
+        SavePorts(found)
+    return found
+
+#At startup: list the ports found last time right away and probe only those in the background.
+#A full scan runs when there is no saved list or none of the saved ports answers.
+def CheckSavedPorts():
+    saved = IDEADrvDiscovery.LoadPortList(PORT_CACHE)
+    if not saved:
+        FindPorts()
+        return
+    Ports[:] = saved
+    portOptionMenu['menu'].delete(0, "end")
+    for port in saved:
+        portOptionMenu['menu'].add_command(label=port, command=lambda value=port: portOptionMenuClicked.set(value))
+    portOptionMenuClicked.set(saved[0])
+    findPortsButton.configure(state='disabled')
+    StartProgress("Checking saved ports...")
+    worker.Submit(CheckSavedPortsJob, saved, done=SavedPortsChecked, failed=FindPortsFailed)
+
+def SavedPortsChecked(found):
+    if found:
+        PortsFound(found)
+    else:
+        StopProgress("Saved ports not found")
+        FindPorts()
 
 def FindPorts():
-    #Close open port, clear list and reinitialize
-    global Ports
-    for p in Ports:
-        drive.CloseComms()
+    #Clear list and reinitialize
     Ports.clear()
     portOptionMenu['menu'].delete(0, "end")
     portOptionMenuClicked.set("No Port Devices Found")
     findAddressesButton.configure(state='disabled')
+    findPortsButton.configure(state='disabled')
+    StartProgress("Scanning serial ports...")
     #Find devices
-    Ports = serial_ports()
+    worker.Submit(FindPortsJob, progress=PortFound, done=PortsFound, failed=FindPortsFailed)
+
+def PortFound(port):
+    statusLabel.configure(text="Found " + port + ", still scanning...")
+    portOptionMenu['menu'].add_command(label=port, command=lambda value=port: portOptionMenuClicked.set(value))
+
+def PortsFound(found):
+    StopProgress("Found " + str(len(found)) + " port(s)")
+    findPortsButton.configure(state='normal')
+    Ports[:] = found
     #Update GUI for found devices
-    if Ports:
-        UpdatePortOptionMenu()
+    UpdatePortOptionMenu()
+
+def FindPortsFailed(error):
+    StopProgress("Port scan failed")
+    findPortsButton.configure(state='normal')
+    ShowError(error)
+
+def OpenPortJob(port):
+    drive.SetActivePort(port)
+    drive.OpenComms()
 
 def UpdatePortOptionMenu():
     #Clear list, disable address button and reset text
@@ -167,54 +296,48 @@ def UpdatePortOptionMenu():
         for i in Ports:
             portOptionMenu['menu'].add_command(label=i, command=lambda value=i: portOptionMenuClicked.set(value))
 
-        findAddressesButton.configure(state='normal')
         portOptionMenuClicked.set(Ports[0])
-        drive.SetActivePort(Ports[0])
-        drive.OpenComms()
+        worker.Submit(OpenPortJob, Ports[0], done=lambda result: findAddressesButton.configure(state='normal'),
+                      failed=ShowError)
     
-def serial_ports():
-    if sys.platform.startswith('win'):
-        ports = ['COM%s' % (i + 1) for i in range(256)]
-    elif sys.platform.startswith('linux') or sys.platform.startswith('cygwin'):
-        # this excludes your current terminal "/dev/tty"
-        ports = glob.glob('/dev/tty[A-Za-z]*')
-    elif sys.platform.startswith('darwin'):
-        ports = glob.glob('/dev/tty.*')
-    else:
-        raise EnvironmentError('Unsupported platform')
-
-    result = []
-    for port in ports:
-        try:
-            s = serial.Serial(port)
-            s.close()
-            result.append(port)
-        except (OSError, serial.SerialException):
-            pass
-    return result
+def FillCommandMenuJob():
+    #From the command set cache when it matches the DLL; the DLL is only loaded and queried otherwise
+    drive.LoadCommandSet()
+    #Retrieve the command list
+    response = drive.GetCommandList()
+    #Parse string into list
+    commandSet = response.split(",")
+    commandSet.sort()
+    return commandSet
 
 def FillCommandMenu():
     #Clear commands
     commandFinderOptionMenu.set('')
-    #Initialize DLL command set
-    drive.InitializeCommandSet()
-    #Retrieve the command list from the DLL
-    response = drive.GetCommandList()
-    #Parse string into list
-    ideaDriveCommandSet = response.split(",")
-    ideaDriveCommandSet.sort()
+    worker.Submit(FillCommandMenuJob, done=UpdateCommandMenu, failed=ShowError)
+
+def UpdateCommandMenu(commandSet):
+    ideaDriveCommandSet[:] = commandSet
     if ideaDriveCommandSet:
         commandFinderOptionMenu['values'] = ideaDriveCommandSet
 
-def SetParamsOutputsEntryboxes(arg1):
-    cmd = commandFinderOptionMenu.get()
+def CommandDescriptionJob(cmd):
     cmdLetter = drive.GetCommandLetterFromDescriptive(cmd)
     numberOfParams = drive.GetNumberOfParametersDesc(cmd)
-    global paramList
-    paramList = drive.GetParameterList(cmdLetter).split(",")
+    params = drive.GetParameterList(cmdLetter).split(",")
     numberOfOutputs = drive.GetNumberOfOutputsDesc(cmd)
+    outputs = drive.GetOutputFieldList(cmdLetter).split(",")
+    return numberOfParams, params, numberOfOutputs, outputs
+
+def SetParamsOutputsEntryboxes(arg1):
+    cmd = commandFinderOptionMenu.get()
+    worker.Submit(CommandDescriptionJob, cmd, done=ShowParamsOutputsEntryboxes, failed=ShowError)
+
+def ShowParamsOutputsEntryboxes(description):
+    numberOfParams, params, numberOfOutputs, outputs = description
+    global paramList
+    paramList = params
     global outList
-    outList = drive.GetOutputFieldList(cmdLetter).split(",")
+    outList = outputs
     
     #Create x param entry boxes and y output entryboxes and render them to the display
     for widget in frmCommandParameter.winfo_children():
@@ -231,10 +354,50 @@ def SetParamsOutputsEntryboxes(arg1):
         IDoutputs[i].grid(column=3, row=i, sticky=NE)
         IDoutputsLabels[i] = Label(frmCommandOutput, width=25, font="bold", text=outList[i])
         IDoutputsLabels[i].grid(column=2, row=i, sticky=NE)
+
+def TelemetryJob(port, address):
+    #A second IDEADrv on the same DLL keeps its own address for the streamer
+    telemetryDrive = IDEADrvCommander.IDEADrv(port, DLL_PATH, address, dll=drive.dll)
+    return telemetryDrive.StartTelemetry(IDEADrvPlot.PLOT_GETTERS, TELEMETRY_RATE)
+
+#Opens the telemetry window (once) and adds the drive selected in the address menu to its plots
+def ShowTelemetry():
+    global telemetryWindow, telemetryPanel
+    if telemetryWindow is None:
+        telemetryWindow = Toplevel(root)
+        telemetryWindow.title("IDEA Drive: Live Telemetry")
+        telemetryWindow.geometry('775x450')
+        telemetryPanel = IDEADrvPlot.TelemetryPanel(telemetryWindow)
+        telemetryPanel.pack(fill=BOTH, expand=True)
+        telemetryWindow.protocol("WM_DELETE_WINDOW", CloseTelemetry)
+    address = SelectedAddress()
+    label = drive.serialPort + " " + address
+    if any(source.label == label for source in telemetryPanel.sources):
+        return
+    worker.Submit(TelemetryJob, drive.serialPort, address,
+                  done=lambda streamer: TelemetryStarted(label, streamer), failed=ShowError)
+
+def TelemetryStarted(label, streamer):
+    #The window may have been closed while the streamer was starting
+    if telemetryPanel is None:
+        streamer.Stop()
+    else:
+        telemetryPanel.AddStreamer(label, streamer)
+
+def CloseTelemetry():
+    global telemetryWindow, telemetryPanel
+    if telemetryWindow is not None:
+        telemetryPanel.Stop()
+        telemetryWindow.destroy()
+        telemetryWindow = None
+        telemetryPanel = None
 #endregion
 
 #IDEA Drive Object
-drive = IDEADrvCommander.IDEADrv("COM1", DLL_PATH)
+drive = IDEADrvCommander.IDEADrv("COM1", DLL_PATH, threadSafe=True)
+drive.SetCommandSetCachePath(COMMAND_SET_CACHE)
+portDiscovery = IDEADrvDiscovery.DriveDiscovery(drive)
+worker = IDEADrvWorker.DriveWorker(root, onPending=ShowPending, onError=ShowError)
 
 #region GUI
 
@@ -278,6 +441,10 @@ IDoutputs = [Entry(frmCommandParameter, relief=tk.SUNKEN, width=40)]*MAX_NUM_OF_
 findAddressesButton = Button(frmSelector, text="Find Drives", command=FindDrives, state='disabled', width=20)
 findAddressesButton.grid(row=1, column=0, sticky=W, pady = 3)
 
+#Button: Live Telemetry of the selected drive
+telemetryButton = Button(frmSelector, text="Live Telemetry", command=ShowTelemetry, state='disabled', width=20)
+telemetryButton.grid(row=2, column=0, sticky=W, pady = 3)
+
 #Button: Find Ports
 findPortsButton = Button(frmSelector, text="Find Ports", command=FindPorts, width=20)
 findPortsButton.grid(row=0, column=0, sticky=W, pady = 3)
@@ -285,7 +452,6 @@ findPortsButton.grid(row=0, column=0, sticky=W, pady = 3)
 #Command Select OptionMenu
 commandFinderOptionMenu = ttk.Combobox(frmCommandFinder, values=ideaDriveCommandSet, state='readonly')
 commandFinderOptionMenu.grid(row=0, column=0, sticky=W)
-FillCommandMenu()
 commandFinderOptionMenu.bind("<<ComboboxSelected>>", SetParamsOutputsEntryboxes)
 
 #OptionMenu: Addresses
@@ -299,12 +465,9 @@ addressOptionMenu.grid(row=1, column=1, sticky=W)
 #OptionMenu: Ports
 portOptionMenuClicked = StringVar(root)
 portOptionMenuClicked.set("No Ports Available")
-Ports = serial_ports()
 portOptionMenu = OptionMenu(frmSelector, portOptionMenuClicked, value=Ports)
 portOptionMenu.configure(indicatoron=0, compound=tk.RIGHT, image=arrowPNG, width=140)
 portOptionMenu.grid(row=0, column=1, sticky=W)
-if Ports:
-    UpdatePortOptionMenu()
 
 #Button: Send Command
 executeButton = Button(root, text="Execute Command", command=SendCommand, state="disabled")
@@ -323,10 +486,31 @@ responseTextbox = Text(root, height=2, width = 96, state='disabled')
 responseTextbox.config(fg='black', bg='light grey')
 responseTextbox.grid(row=3, column=0, columnspan=4, sticky=W, padx=2, pady=2)
 
+#Frame: Status
+frmStatus = Frame(root)
+frmStatus.grid(row=8, column=0, columnspan=4, sticky=W)
+
+#Label: Status of drive operations
+statusLabel = Label(frmStatus, text="Ready", anchor=W)
+statusLabel.grid(row=0, column=0, sticky=W, padx=2)
+
+#Progressbar: Shown while ports or drives are being scanned
+progressBar = ttk.Progressbar(frmStatus, mode='indeterminate', length=150)
+
 #endregion
+#The command list, the DLL and the ports are loaded in the background once the window is up
+FillCommandMenu()
+worker.Submit(drive.LoadDLL, failed=ShowError)
+CheckSavedPorts()
+#Startup benchmark (Benchmarks/StartupBenchmark.py): report once the window is drawn, then close
+if os.environ.get("IDEADRV_STARTUP_BENCHMARK"):
+    root.after_idle(lambda: (root.update(), print("first window", flush=True), root.destroy()))
 root.mainloop()
 
-#Close Serial & delete drive
+#Stop telemetry, let queued drive operations finish, then close Serial & delete drive
+if telemetryPanel is not None:
+    telemetryPanel.Stop()
+worker.Stop()
 drive.CloseComms()
 del drive
 """
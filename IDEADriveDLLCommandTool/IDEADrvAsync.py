@@ -0,0 +1,117 @@
+# Name:           IDEADrvAsync.py
+# Environment:    Python 3.11
+# File Type:      Object class
+# Description:    asyncio front end for IDEADrv and DriveSession. DLL calls run on a bounded thread pool
+#                 shared by all AsyncIDEADrv of one DLL (SharedExecutor) or on the session's per-bus
+#                 workers (AsyncDriveSession), so an event loop can coordinate hundreds of drive
+#                 operations without a thread per axis. Every IDEADrv method is available as a
+#                 coroutine with the same name:
+#                     drive = AsyncIDEADrv(IDEADrvCommander.IDEADrv("COM3", DLL_PATH, "#001"))
+#                     response = await drive.SendCommand("v")
+#                     await drive.MoveToPosition("1000,...")
+#                     await drive.WaitUntilMoveDone(timeout=10)
+#                 WaitUntilMoveDone polls IsMoveExecuting between asyncio sleeps, so cancelling the task
+#                 stops the polling at the next await.
+
+import asyncio
+import concurrent.futures
+import functools
+import threading
+
+DEFAULT_POLL_INTERVAL = 0.01
+SHARED_EXECUTOR_WORKERS = 1     # calls into one loaded DLL are serialized anyway
+
+_sharedExecutors = {}           # DLL path (or backend object) -> ThreadPoolExecutor
+_sharedLock = threading.Lock()
+
+def SharedExecutor(drive):
+    # The executor of every AsyncIDEADrv whose drive uses the same DLL, created on first use
+    key = drive.DLL_Path
+    with _sharedLock:
+        executor = _sharedExecutors.get(key)
+        if executor is None:
+            executor = _sharedExecutors[key] = concurrent.futures.ThreadPoolExecutor(
+                max_workers=SHARED_EXECUTOR_WORKERS, thread_name_prefix="IDEADrvAsync")
+        return executor
+
+class AsyncIDEADrv:
+    # By default the drive's calls run on the SharedExecutor of its DLL, so any number of drives use a
+    # bounded set of threads. maxWorkers gives this drive an executor of its own, closed by Close().
+    def __init__(self, drive, executor=None, maxWorkers=None):
+        self.drive = drive
+        self._ownsExecutor = executor is None and maxWorkers is not None
+        if executor is None:
+            if maxWorkers is None:
+                executor = SharedExecutor(drive)
+            else:
+                executor = concurrent.futures.ThreadPoolExecutor(max_workers=maxWorkers,
+                                                                 thread_name_prefix="IDEADrvAsync")
+        self.executor = executor
+
+    def __getattr__(self, name):
+        attr = getattr(self.drive, name)
+        if not callable(attr):
+            return attr
+        async def call(*args):
+            return await self.Run(attr, *args)
+        call.__name__ = name
+        setattr(self, name, call)
+        return call
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.Close()
+
+    def _Call(self, func, args):
+        # The drive's address is set inside the same lock as the call (drives may share one DLL)
+        with self.drive.Transaction(self.drive.IDriveAddress):
+            return func(*args)
+
+    async def Run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(self._Call, func, args))
+
+    async def SendCommand(self, command):
+        return await self.Run(self.drive.SendCommand, command)
+
+    async def IsMoving(self):
+        return await self.Run(self.drive.IsMoving)
+
+    async def WaitUntilMoveDone(self, pollInterval=DEFAULT_POLL_INTERVAL, timeout=None):
+        # Returns once IsMoveExecuting reports the move finished; raises TimeoutError after timeout seconds
+        async def poll():
+            while await self.IsMoving():
+                await asyncio.sleep(pollInterval)
+        await asyncio.wait_for(poll(), timeout)
+
+    def Close(self):
+        if self._ownsExecutor:
+            self.executor.shutdown(wait=False)
+
+class AsyncDriveSession:
+    # Awaitable access to a DriveSession. Calls go through the session's per-bus worker queues.
+    def __init__(self, session):
+        self.session = session
+
+    async def Call(self, port, address, method, *args):
+        return await asyncio.wrap_future(self.session.Submit(port, address, method, *args))
+
+    async def SendCommand(self, port, address, command):
+        return await self.Call(port, address, "SendCommand", command)
+
+    async def IsMoving(self, port, address):
+        return await self.Call(port, address, "IsMoving")
+
+    async def WaitUntilMoveDone(self, port, address, pollInterval=DEFAULT_POLL_INTERVAL, timeout=None):
+        async def poll():
+            while await self.IsMoving(port, address):
+                await asyncio.sleep(pollInterval)
+        await asyncio.wait_for(poll(), timeout)
+
+    async def Gather(self, method, *args):
+        # Runs method on every drive in the session concurrently; returns {(port, address): result}
+        keys = list(self.session)
+        results = await asyncio.gather(*(self.Call(port, address, method, *args) for port, address in keys))
+        return dict(zip(keys, results))
@@ -0,0 +1,71 @@
+# Name:           IDEADrvBatch.py
+# Environment:    Python 3.11
+# File Type:      Object class
+# Description:    Batched command submission. A batch is a list of (command, params, address) entries:
+#                 command is an IDEADrv method name ("SetMotorParameters", "GetControlGain", ...) or a raw
+#                 drive command for SendCommand ("v", "H"); params is the parameter string (or None) and
+#                 address the RS485 address (or None to stay on the current one). Every entry is
+#                 resolved and encoded before the first command is sent, the batch holds the drive's
+#                 lock for its whole run, and SetCurrentAddress is only called when the address changes.
+#                 Each entry gets a BatchResult with its response, error and timing.
+
+import time
+
+class BatchResult:
+    __slots__ = ('command', 'params', 'address', 'response', 'error', 'elapsed')
+
+    def __init__(self, command, params, address):
+        self.command = command
+        self.params = params
+        self.address = address
+        self.response = None
+        self.error = None
+        self.elapsed = 0.0
+
+    def __repr__(self):
+        outcome = "error=" + repr(self.error) if self.error is not None else "response=" + repr(self.response)
+        return "BatchResult(%r, %r, %r, %s, %.6fs)" % (self.command, self.params, self.address, outcome, self.elapsed)
+
+    def Ok(self):
+        return self.error is None
+
+def BatchEntry(entry):
+    # Accepts "cmd", ("cmd",), ("cmd", params) or ("cmd", params, address)
+    if isinstance(entry, str):
+        return entry, None, None
+    entry = tuple(entry)
+    return (entry + (None, None))[:3]
+
+def RunBatch(drive, entries, stopOnError=False, clock=time.perf_counter):
+    # Runs entries back to back on drive. Entries after a failure are skipped (error left None,
+    # response None) only if stopOnError is set. Returns the BatchResult list in entry order.
+    prepared = []
+    results = []
+    for entry in entries:
+        command, params, address = BatchEntry(entry)
+        if isinstance(address, int):
+            address = "#%03d" % address
+        results.append(BatchResult(command, params, address))
+        prepared.append((drive.PrepareCall(command, params), address))
+    with drive.Transaction():
+        originalAddress = drive.IDriveAddress
+        for (call, address), result in zip(prepared, results):
+            func, args = call
+            start = clock()
+            try:
+                if address is not None:
+                    drive.SetCurrentAddress(address)
+                result.response = func(*args)
+            except Exception as e:
+                result.error = e
+            result.elapsed = clock() - start
+            if stopOnError and result.error is not None:
+                break
+        drive.SetCurrentAddress(originalAddress)
+    return results
+
+def BatchErrors(results):
+    return [result for result in results if result.error is not None]
+
+def BatchElapsed(results):
+    return sum(result.elapsed for result in results)
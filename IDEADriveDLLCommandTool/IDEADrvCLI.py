@@ -0,0 +1,338 @@
+# Name:           IDEADrvCLI.py
+# Environment:    Python 3.11
+# File Type:      Executable (headless, no Tk or PIL)
+# Description:    Runs a script of drive commands from a file or stdin on one serial port, for test stations
+#                 and other unattended use. The port is opened once and stays open for the whole run; every
+#                 command is resolved and encoded once when the script is loaded (IDEADrv.PrepareCall) and
+#                 then reused for every cycle. Each command, and each wait on move completion, is captured
+#                 as a record streamed to stdout or a file as CSV, JSON or JSON lines.
+#
+#                     python IDEADrvCLI.py --port COM3 --cycles 1000 --output run.csv station.txt
+#
+#                 Script lines (blank lines and lines starting with "//" are skipped):
+#                     address #002                      switch the current address
+#                     @#003 GetPositionVelocity         one command at another address
+#                     MoveToPosition 10000,1            IDEADrv method name, then its parameter string
+#                     v                                 anything else is a raw command for SendCommand,
+#                     M1000                             writes and moves included
+#                     wait [timeout]                    wait for the moves started at the current address
+#                     @#003 wait                        ... or at another one
+#                     sleep 0.25                        pause, in seconds
+#                     repeat 10                         repeat the lines up to the matching "end"
+#                     end
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+import IDEADrvCommander
+from IDEADrvMotion import MoveTracker
+
+DLL_NAME = "IDEADriveCommandx64.dll" if sys.maxsize > 2**32 else "IDEADriveCommandx86.dll"
+DLL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), DLL_NAME)
+MOVE_COMMANDS = ("MoveToPosition", "IndexDistance", "GoAtSpeed")
+DEFAULT_MOVE_TIMEOUT = 60.0
+CAPTURE_FIELDS = ("cycle", "line", "time", "address", "command", "params", "response", "error", "elapsed")
+CAPTURE_FORMATS = ("csv", "json", "jsonl")
+
+class ScriptError(ValueError):
+    def __init__(self, line, message):
+        ValueError.__init__(self, "line %d: %s" % (line, message))
+        self.line = line
+
+class ScriptStep:
+    __slots__ = ('kind', 'line', 'address', 'command', 'params', 'value', 'body', 'call')
+
+    def __init__(self, kind, line, address=None, command=None, params=None, value=None, body=None):
+        self.kind = kind            # "call", "address", "wait", "sleep" or "repeat"
+        self.line = line
+        self.address = address
+        self.command = command
+        self.params = params
+        self.value = value          # wait timeout, sleep seconds or repeat count
+        self.body = body            # steps of a repeat block
+        self.call = None            # (callable, args) once prepared for a drive
+
+def NormalizeAddress(address):
+    # "2", "#2" or "#002" -> "#002"
+    address = address.lstrip("@").lstrip("#")
+    if not address.isdigit():
+        raise ValueError("bad address " + repr(address))
+    return "#%03d" % int(address)
+
+def _Number(text, line, kind, convert=float):
+    try:
+        value = convert(text)
+    except ValueError:
+        raise ScriptError(line, "%s needs a number, got %r" % (kind, text)) from None
+    if value < 0:
+        raise ScriptError(line, kind + " cannot be negative")
+    return value
+
+def ParseScript(lines):
+    # Nested ScriptStep lists from the script text lines
+    root = []
+    blocks = [(root, None)]
+    for number, text in enumerate(lines, 1):
+        text = text.strip()
+        if not text or text.startswith("//"):
+            continue
+        steps = blocks[-1][0]
+        address = None
+        if text.startswith("@"):
+            token, _, text = text.partition(" ")
+            text = text.strip()
+            try:
+                address = NormalizeAddress(token)
+            except ValueError as e:
+                raise ScriptError(number, str(e)) from None
+            if not text:
+                raise ScriptError(number, "address prefix without a command")
+        word, _, rest = text.partition(" ")
+        rest = rest.strip()
+        if word in ("address", "sleep", "repeat", "end") and address is not None:
+            raise ScriptError(number, "an address prefix only applies to commands and wait")
+        if word == "address":
+            try:
+                steps.append(ScriptStep("address", number, address=NormalizeAddress(rest)))
+            except ValueError as e:
+                raise ScriptError(number, str(e)) from None
+        elif word == "wait":
+            timeout = _Number(rest, number, "wait") if rest else None
+            steps.append(ScriptStep("wait", number, address, value=timeout))
+        elif word == "sleep":
+            steps.append(ScriptStep("sleep", number, value=_Number(rest, number, "sleep")))
+        elif word == "repeat":
+            step = ScriptStep("repeat", number, value=_Number(rest, number, "repeat", int), body=[])
+            steps.append(step)
+            blocks.append((step.body, number))
+        elif word == "end":
+            if len(blocks) == 1:
+                raise ScriptError(number, "end without repeat")
+            blocks.pop()
+        else:
+            steps.append(ScriptStep("call", number, address, word, rest or None))
+    if len(blocks) > 1:
+        raise ScriptError(blocks[-1][1], "repeat without end")
+    return root
+
+def ReadScript(path):
+    if path == "-":
+        return ParseScript(sys.stdin.read().splitlines())
+    with open(path, 'r') as f:
+        return ParseScript(f.read().splitlines())
+
+#region Capture
+def ResponseText(response):
+    if isinstance(response, (bytes, bytearray, memoryview)):
+        response = bytes(response).decode('UTF-8', 'replace')
+    if isinstance(response, str):
+        return response.rstrip("\r\n")
+    return response
+
+class CaptureWriter:
+    # Streams capture records as they happen so long runs never sit in memory
+    def __init__(self, stream, format):
+        if format not in CAPTURE_FORMATS:
+            raise ValueError("Unknown capture format: " + str(format))
+        self.stream = stream
+        self.format = format
+        self.count = 0
+        if format == "csv":
+            self.writer = csv.DictWriter(stream, CAPTURE_FIELDS, lineterminator="\n")
+            self.writer.writeheader()
+        elif format == "json":
+            stream.write("[")
+
+    def Write(self, record):
+        if self.format == "csv":
+            self.writer.writerow(record)
+        elif self.format == "json":
+            self.stream.write(("\n" if self.count == 0 else ",\n") + json.dumps(record))
+        else:
+            self.stream.write(json.dumps(record) + "\n")
+        self.count += 1
+
+    def Close(self):
+        if self.format == "json":
+            self.stream.write("\n]\n" if self.count else "]\n")
+        self.stream.flush()
+
+def CaptureFormat(path, format=None):
+    # Explicit format, else from the output file extension, else JSON lines
+    if format:
+        return format
+    extension = os.path.splitext(path or "")[1].lower().lstrip(".")
+    return extension if extension in CAPTURE_FORMATS else "jsonl"
+#endregion
+
+class ScriptRunner:
+    def __init__(self, drive, writer, stopOnError=False, moveTimeout=DEFAULT_MOVE_TIMEOUT, tracker=None,
+                 clock=time.perf_counter, timestamp=time.time):
+        self.drive = drive
+        self.writer = writer
+        self.stopOnError = stopOnError
+        self.moveTimeout = moveTimeout
+        self.tracker = tracker or MoveTracker()
+        self.clock = clock
+        self.timestamp = timestamp
+        self.moves = {}             # address -> MoveHandles not waited for yet
+        self.cycle = 0
+        self.commands = 0
+        self.errors = 0
+        self.stopped = False
+
+    def Prepare(self, steps):
+        # Resolves and encodes every command once; moves go through the tracker instead
+        for step in steps:
+            if step.kind == "repeat":
+                self.Prepare(step.body)
+            elif step.kind == "call" and step.command not in MOVE_COMMANDS:
+                step.call = self.drive.PrepareCall(step.command, step.params)
+        return steps
+
+    def Run(self, steps, cycles=1, cycleInterval=0.0):
+        # Runs the prepared steps cycles times, each cycle starting at least cycleInterval seconds
+        # after the previous one. Returns the number of failed steps.
+        self.Prepare(steps)
+        nextCycle = self.clock()
+        for self.cycle in range(1, cycles + 1):
+            if cycleInterval:
+                delay = nextCycle - self.clock()
+                if delay > 0:
+                    time.sleep(delay)
+                nextCycle = max(nextCycle + cycleInterval, self.clock())
+            self._Steps(steps)
+            self._WaitAll()
+            if self.stopped:
+                break
+        return self.errors
+
+    def _Steps(self, steps):
+        for step in steps:
+            if self.stopped:
+                return
+            if step.kind == "call":
+                self._Call(step)
+            elif step.kind == "address":
+                self.drive.SetCurrentAddress(step.address)
+            elif step.kind == "wait":
+                self._Wait(step, step.address or self.drive.IDriveAddress)
+            elif step.kind == "sleep":
+                time.sleep(step.value)
+            else:
+                for _ in range(step.value):
+                    self._Steps(step.body)
+
+    def _Record(self, step, address, command, params, response, error, elapsed, started):
+        self.commands += 1
+        if error is not None:
+            self.errors += 1
+            if self.stopOnError:
+                self.stopped = True
+        self.writer.Write({'cycle': self.cycle, 'line': step.line, 'time': started, 'address': address,
+                           'command': command, 'params': params, 'response': ResponseText(response),
+                           'error': None if error is None else "%s: %s" % (type(error).__name__, error),
+                           'elapsed': elapsed})
+
+    def _Call(self, step):
+        drive = self.drive
+        started = self.timestamp()
+        start = self.clock()
+        response = error = None
+        with drive.Transaction():
+            previous = drive.IDriveAddress
+            if step.address is not None:
+                drive.SetCurrentAddress(step.address)
+            address = drive.IDriveAddress
+            try:
+                if step.call is None:
+                    handle = getattr(self.tracker, step.command)(drive, step.params or "")
+                    self.moves.setdefault(address, []).append(handle)
+                    response = True
+                else:
+                    func, args = step.call
+                    response = func(*args)
+            except Exception as e:
+                error = e
+            drive.SetCurrentAddress(previous)
+        self._Record(step, address, step.command, step.params, response, error, self.clock() - start, started)
+
+    def _Wait(self, step, address):
+        handles = self.moves.pop(address, None)
+        if not handles:
+            #Nothing started by this script: wait on whatever the drive is doing
+            with self.drive.Transaction(address):
+                handles = [self.tracker.Track(self.drive, "wait")]
+        timeout = self.moveTimeout if step.value is None else step.value
+        started = self.timestamp()
+        start = self.clock()
+        error = None
+        for handle in handles:
+            if not handle.Wait(max(0.0, start + timeout - self.clock())):
+                error = TimeoutError("move %s %s not finished after %g s" % (handle.command, handle.params, timeout))
+                break
+            if handle.Exception() is not None:
+                error = handle.Exception()
+                break
+        elapsed = self.clock() - start
+        self._Record(step, address, "wait", None if step.value is None else str(step.value),
+                     None, error, elapsed, started)
+
+    def _WaitAll(self):
+        # Moves left running at the end of a cycle are waited for before the next one starts
+        for address in list(self.moves):
+            self._Wait(ScriptStep("wait", 0), address)
+
+    def Close(self):
+        self.tracker.Stop()
+
+def ParseArguments(argv):
+    parser = argparse.ArgumentParser(description="Run a script of IDEA drive commands without the GUI")
+    parser.add_argument("script", nargs="?", default="-", help="script file, - (default) for stdin")
+    parser.add_argument("--port", required=True, help="serial port, e.g. COM3")
+    parser.add_argument("--address", default="", help="starting drive address, e.g. #001")
+    parser.add_argument("--dll", default=DLL_PATH, help="drive DLL path, or 'simulated'")
+    parser.add_argument("--cycles", type=int, default=1, help="times to run the whole script")
+    parser.add_argument("--cycle-interval", type=float, default=0.0, help="minimum seconds from one cycle start to the next")
+    parser.add_argument("--output", help="capture file (default stdout)")
+    parser.add_argument("--format", choices=CAPTURE_FORMATS, help="capture format (default from --output extension, else jsonl)")
+    parser.add_argument("--move-timeout", type=float, default=DEFAULT_MOVE_TIMEOUT, help="seconds a wait may take")
+    parser.add_argument("--stop-on-error", action="store_true", help="stop at the first failed command or wait")
+    parser.add_argument("--quiet", action="store_true", help="no summary on stderr")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = ParseArguments(argv)
+    try:
+        steps = ReadScript(args.script)
+    except (OSError, ScriptError) as e:
+        print("IDEADrvCLI: " + str(e), file=sys.stderr)
+        return 2
+    address = NormalizeAddress(args.address) if args.address else ""
+    drive = IDEADrvCommander.IDEADrv(args.port, args.dll, address)
+    output = open(args.output, 'w', newline='') if args.output else sys.stdout
+    writer = CaptureWriter(output, CaptureFormat(args.output, args.format))
+    runner = ScriptRunner(drive, writer, args.stop_on_error, args.move_timeout)
+    start = time.perf_counter()
+    drive.OpenComms()
+    try:
+        errors = runner.Run(steps, args.cycles, args.cycle_interval)
+    finally:
+        runner.Close()
+        drive.CloseComms()
+        writer.Close()
+        if output is not sys.stdout:
+            output.close()
+    elapsed = time.perf_counter() - start
+    if not args.quiet:
+        print("IDEADrvCLI: %d cycles, %d records, %d errors in %.3f s (%.1f ms per cycle)" %
+              (runner.cycle, runner.commands, errors, elapsed, 1000.0 * elapsed / max(1, runner.cycle)),
+              file=sys.stderr)
+    return 1 if errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+# Name:           IDEADrvCommandSet.py
+# Environment:    Python 3.11
+# File Type:      Object class
+# Description:    In-memory copy of the DLL command database (the data behind GetCommandList,
+#                 GetCommandLetterFromDescriptive, GetParameterList, GetOutputFieldList, ...). It is read
+#                 from the DLL once after InitializeCommandSet and can be saved to a JSON file so later
+#                 processes start without querying the DLL again. Lookups are plain dictionary reads.
+
+import json
+import os
+
+COMMAND_SET_FORMAT = 1
+
+class CommandInfo:
+    __slots__ = ('name', 'letter', 'parameters', 'outputs', 'numberOfParameters', 'numberOfOutputs')
+
+    def __init__(self, name, letter, parameters, outputs, numberOfParameters=None, numberOfOutputs=None):
+        self.name = name
+        self.letter = letter
+        self.parameters = tuple(parameters)
+        self.outputs = tuple(outputs)
+        self.numberOfParameters = len(self.parameters) if numberOfParameters is None else numberOfParameters
+        self.numberOfOutputs = len(self.outputs) if numberOfOutputs is None else numberOfOutputs
+
+    def __repr__(self):
+        return "CommandInfo(" + repr(self.name) + ", " + repr(self.letter) + ")"
+
+    def ParameterList(self):
+        # Same comma separated form as the DLL's GetParameterList
+        return ",".join(self.parameters)
+
+    def OutputFieldList(self):
+        return ",".join(self.outputs)
+
+    def ToDict(self):
+        return {'name': self.name, 'letter': self.letter,
+                'parameters': list(self.parameters), 'outputs': list(self.outputs),
+                'numberOfParameters': self.numberOfParameters, 'numberOfOutputs': self.numberOfOutputs}
+
+def _Text(response):
+    if not isinstance(response, str):
+        response = str(response, 'UTF-8')
+    return response.replace("\r", "")
+
+def _SplitList(response):
+    text = _Text(response)
+    return text.split(",") if text else []
+
+def DLLSignature(dllPath):
+    # Identifies the DLL build a cache file was made from
+    try:
+        stat = os.stat(dllPath)
+    except (OSError, TypeError):
+        return None
+    return [os.path.basename(dllPath), stat.st_size, int(stat.st_mtime)]
+
+class CommandSet:
+    def __init__(self, commands=(), signature=None):
+        self.commands = []
+        self.byName = {}
+        self.byLetter = {}
+        self.signature = signature
+        for info in commands:
+            self.Add(info)
+
+    def __len__(self):
+        return len(self.commands)
+
+    def __contains__(self, name):
+        return name in self.byName
+
+    def Add(self, info):
+        self.commands.append(info)
+        self.byName[info.name] = info
+        self.byLetter.setdefault(info.letter, info)
+
+    def Names(self):
+        return [info.name for info in self.commands]
+
+    def CommandList(self):
+        return ",".join(self.Names())
+
+    def Letter(self, name):
+        return self.byName[name].letter
+
+    def Name(self, letter):
+        return self.byLetter[letter].name
+
+    def Info(self, nameOrLetter):
+        info = self.byName.get(nameOrLetter)
+        if info is None:
+            info = self.byLetter.get(nameOrLetter)
+        return info
+
+    #Build from a drive whose DLL command set has been initialized. Only the raw DLL
+    #query functions are used, so this works before the IDEADrv cache is populated.
+    @classmethod
+    def FromDLL(cls, drive, signature=None):
+        commandSet = cls(signature=signature)
+        for name in _SplitList(drive.GetCommandList()):
+            if not name:
+                continue
+            letter = _Text(drive.GetCommandLetterFromDescriptive(name))
+            commandSet.Add(CommandInfo(name, letter,
+                                       _SplitList(drive.GetParameterList(letter)),
+                                       _SplitList(drive.GetOutputFieldList(letter)),
+                                       drive.GetNumberOfParametersDesc(name),
+                                       drive.GetNumberOfOutputsDesc(name)))
+        return commandSet
+
+    def Save(self, path):
+        document = {'format': COMMAND_SET_FORMAT, 'signature': self.signature,
+                    'commands': [info.ToDict() for info in self.commands]}
+        tmpPath = path + ".tmp"
+        with open(tmpPath, 'w') as f:
+            json.dump(document, f, indent=1)
+        os.replace(tmpPath, path)
+
+    #Returns None if the file is missing, unreadable or was made from a different DLL build
+    @classmethod
+    def Load(cls, path, signature=None):
+        try:
+            with open(path) as f:
+                document = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if document.get('format') != COMMAND_SET_FORMAT:
+            return None
+        if signature is not None and document.get('signature') != signature:
+            return None
+        try:
+            commands = [CommandInfo(c['name'], c['letter'], c['parameters'], c['outputs'],
+                                    c['numberOfParameters'], c['numberOfOutputs'])
+                        for c in document.get('commands', [])]
+        except (KeyError, TypeError):
+            return None
+        return cls(commands, document.get('signature'))
@@ -11,22 +11,353 @@
 #                 accept.
 
 from ctypes import *
+from contextlib import contextmanager, nullcontext
+import os
+import sys
+import threading
 import time
+import weakref
+from IDEADrvParser import ResponseParser, ResponseFlag
+from IDEADrvCommandSet import CommandSet, DLLSignature
+from IDEADrvTelemetry import TelemetryStreamer, DEFAULT_GETTERS
+from IDEADrvLog import TelemetryRecorder
+from IDEADrvBatch import RunBatch
+from IDEADrvConfig import CaptureSnapshot, PushSnapshot
+from IDEADrvProgram import MAX_PARAMETER_LENGTH
+from IDEADrvStats import Instrumentation
+from IDEADrvTiming import AdaptiveTimeouts
+from IDEADrvCoordinated import CoordinatedMove, DISPATCH_AUTO
+
+#Response modes (see IDEADrv.SetResponseMode)
+RESPONSE_STR = 'str'        # decoded UTF-8 string with the first '\r' removed (default)
+RESPONSE_BYTES = 'bytes'    # raw response bytes, no decoding or '\r' stripping
+RESPONSE_VIEW = 'view'      # memoryview over the pooled buffer, valid until the next call on the drive
+
+#region DLL Prototypes
+# Argument and return types of every function exported by the IDEA Drive DLL. Each IDEADrv binds
+# these once per function (see DLLPrototypes) instead of reassigning them on every call.
+# Entries with a restype of None keep the ctypes default (c_int).
+_NO_ARGS = ([], None)
+_OUT_BUFFER = ([c_char_p, c_int], None)             # fn(char* outBuffer, int bufferSize)
+_IN_PARAMS = ([c_char_p, c_int], None)              # fn(char* parameters, int length)
+_IN_OUT = ([c_char_p, c_char_p, c_int], None)       # fn(char* parameters, char* outBuffer, int bufferSize)
+#The same, for functions returning a C bool success flag. Read as the default int, only the low byte of
+#the return register is defined and the rest may hold anything.
+_BOOL_PARAMS = ([c_char_p, c_int], c_bool)          # bool fn(char* parameters, int length)
+_BOOL_IN_OUT = ([c_char_p, c_char_p, c_int], c_bool) # bool fn(char* parameters, char* outBuffer, int bufferSize)
+
+DLL_PROTOTYPES = {
+    # Communications
+    'OpenSerial': ([c_char_p], c_int),
+    'CloseSerial': ([], c_bool),
+    'IsSerialOpen': ([], c_bool),
+    'SetCurrentAddress': ([c_char_p, c_int], None),
+    'GetAddresses': ([POINTER(c_int)], None),
+    # NO R/W commands
+    'Noop': _NO_ARGS,
+    'ReturnFromSub': _NO_ARGS,
+    'SingleStep': _NO_ARGS,
+    'WaitForMove': _NO_ARGS,
+    'Reset': _NO_ARGS,
+    'Abort': _NO_ARGS,
+    'EnableDataLogging': _NO_ARGS,
+    'DisableDataLogging': _NO_ARGS,
+    # Readonly commands
+    'GetFWVersion': _OUT_BUFFER,
+    'GetEncoderConfiguration': _OUT_BUFFER,
+    'GetHallSensorConfiguration': _OUT_BUFFER,
+    'GetMotorType': _OUT_BUFFER,
+    'GetMotorParameters': _OUT_BUFFER,
+    'GetControlReference': _OUT_BUFFER,
+    'GetDriveAddress': _OUT_BUFFER,
+    'GetMaxDriveCurrent': _OUT_BUFFER,
+    'GetFactoryConfiguration': _OUT_BUFFER,
+    'GetVelocityProfile': _OUT_BUFFER,
+    'GetControlGain': _OUT_BUFFER,
+    'IsMoveExecuting': _OUT_BUFFER,
+    'GetPositionVelocity': _OUT_BUFFER,
+    'IsInputOverride': _OUT_BUFFER,
+    'GetIOReading': _OUT_BUFFER,
+    'GetFaultParameters': _OUT_BUFFER,
+    'GetFaultReading': _OUT_BUFFER,
+    'GetStartupProgramName': _OUT_BUFFER,
+    'IsProgramExecuting': _OUT_BUFFER,
+    'GetListProgramNames': _OUT_BUFFER,
+    # Writeonly commands
+    'SetEncoderConfiguration': _BOOL_PARAMS,
+    'SetHallSensorConfiguration': _BOOL_PARAMS,
+    'SetMotorParameters': _BOOL_PARAMS,
+    'SetMotorType': _BOOL_PARAMS,
+    'SetControlReferenceConfiguration': _BOOL_PARAMS,
+    'SetDriveAddress': _BOOL_PARAMS,
+    'SetPassword': _BOOL_PARAMS,
+    'RemovePassword': _IN_PARAMS,
+    'MoveToPosition': _BOOL_PARAMS,
+    'IndexDistance': _BOOL_PARAMS,
+    'GoAtSpeed': _BOOL_PARAMS,
+    'GoAtVoltage': _IN_PARAMS,
+    'GoAtTorque': _IN_PARAMS,
+    'ImmediateStop': _IN_PARAMS,
+    'StopMovement': _IN_PARAMS,
+    'SetVelocityProfileWaveshape': _BOOL_PARAMS,
+    'SetControlGains': _BOOL_PARAMS,
+    'SetPositionOrigin': _BOOL_PARAMS,
+    'SetOutputState': _BOOL_PARAMS,
+    'SetInputInterrupts': _BOOL_PARAMS,
+    'SetPositionLimitFault': _BOOL_PARAMS,
+    'SetCurrentLimitDurationFault': _BOOL_PARAMS,
+    'SetPositionErrorFault': _BOOL_PARAMS,
+    'RunProgram': _IN_PARAMS,
+    'ExecuteProgram': _BOOL_PARAMS,
+    'SetStartupProgram': _BOOL_PARAMS,
+    'DeleteProgram': _BOOL_PARAMS,
+    'SetDebugMode': _BOOL_PARAMS,
+    'RunToLabel': _BOOL_PARAMS,
+    'GotoAddress': _IN_PARAMS,
+    'JumpNTimes': _IN_PARAMS,
+    'GotoIf': _IN_PARAMS,
+    'GotoSub': _IN_PARAMS,
+    'ReturnTo': _IN_PARAMS,
+    'WaitTime': _IN_PARAMS,
+    'Label': _IN_PARAMS,
+    'Comment': _IN_PARAMS,
+    'SetInputs': _BOOL_PARAMS,
+    'SetInputOverride': _BOOL_PARAMS,
+    # Misc commands
+    'SendCommand': _IN_OUT,
+    'SendTimedCommand': ([c_char_p, c_char_p, c_int, c_int, c_int], None),
+    'GetNVParameter': _BOOL_IN_OUT,
+    'DownloadProgram': _BOOL_IN_OUT,
+    'IsValidPassword': _BOOL_IN_OUT,
+    'RecallProgram': _BOOL_IN_OUT,
+    'UpdateFirmware': ([c_bool], c_bool),
+    'RestoreFactoryDefaults': ([c_bool], c_bool),
+    # Command info commands
+    'InitializeCommandSet': _NO_ARGS,
+    'GetCommandName': _IN_OUT,
+    'GetCommandList': ([c_char_p], None),
+    'GetNumberOfOutputsDesc': ([c_char_p], c_int),
+    'GetNumberOfParametersDesc': ([c_char_p], c_int),
+    'GetCommandLetterFromDescriptive': _IN_OUT,
+    'GetParameterList': _IN_OUT,
+    'GetOutputFieldList': _IN_OUT,
+}
+
+def _Locked(lock, func):
+    def call(*args):
+        with lock:
+            return func(*args)
+    call.__name__ = func.__name__
+    return call
+
+class DLLPrototypes:
+    # Resolves DLL exports into typed callables. A function is looked up and has its prototype
+    # applied on first use, then cached as an attribute so later calls are a plain attribute load.
+    # It also tracks the DLL's global state (open port, current address), which is shared by every
+    # IDEADrv created on the same DLLPrototypes, and owns the lock guarding that state. A loaded DLL
+    # has one such state, so every IDEADrv on it must use the same DLLPrototypes (SharedPrototypes). With
+    # threadSafe=True every DLL call is made while holding the lock; drives sharing the DLLPrototypes
+    # share that lock, and one drive asking for threadSafe turns it on for all. With an instrumentation set
+    # (see IDEADrvStats) every function is bound through its timing wrapper.
+    def __init__(self, library, threadSafe=False):
+        self.library = library
+        self.openPort = None
+        self.currentAddress = None
+        self.lock = threading.RLock()
+        self.threadSafe = threadSafe
+        self.instrumentation = None
+        self.programTransfer = None     # IDEADrvCoordinated.SharedTransfer of the moves on this DLL
+        self.armedPrograms = {}         # port|address -> coordinated move arm programs, oldest first
+        self._bound = set()
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        func = getattr(self.library, name)
+        prototype = DLL_PROTOTYPES.get(name)
+        #Prototypes only apply to ctypes functions; Python backends (IDEADrvSimulator) take the arguments as they are
+        if prototype is not None and hasattr(func, 'argtypes'):
+            func.argtypes = prototype[0]
+            if prototype[1] is not None:
+                func.restype = prototype[1]
+        if self.instrumentation is not None:
+            func = self.instrumentation.Wrap(name, func)
+        if self.threadSafe:
+            func = _Locked(self.lock, func)
+        setattr(self, name, func)
+        self._bound.add(name)
+        return func
+
+    def _Unbind(self):
+        # Caller holds the lock. Every function is bound again on next use.
+        for name in self._bound:
+            del self.__dict__[name]
+        self._bound.clear()
+
+    def SetInstrumentation(self, instrumentation):
+        # Rebinds every function on next use, with (or, for None, without) the timing wrapper
+        with self.lock:
+            self.instrumentation = instrumentation
+            self._Unbind()
+
+    def SetThreadSafe(self):
+        # Rebinds every function on next use so that it holds the lock. There is no way back: another
+        # drive on the same DLL may rely on it.
+        with self.lock:
+            if not self.threadSafe:
+                self.threadSafe = True
+                self._Unbind()
+
+    def Timed(self, name):
+        # Context manager timing a non-DLL step (sleeps) under name when instrumented
+        if self.instrumentation is None:
+            return nullcontext()
+        return self.instrumentation.Time(name)
+
+    def BindAll(self):
+        # Resolve every known export up front. Exports missing from older DLL builds are skipped.
+        for name in DLL_PROTOTYPES:
+            try:
+                getattr(self, name)
+            except AttributeError:
+                pass
+
+_dllLoadLock = threading.Lock()
+_sharedPrototypes = weakref.WeakValueDictionary()  # library key -> DLLPrototypes in use
+
+def LibraryKey(path):
+    # Same key for every path naming the same DLL file; backend objects are their own key
+    if isinstance(path, str):
+        return os.path.normcase(os.path.abspath(path))
+    return path
+
+def _SharedPrototypes(path, threadSafe):
+    # Caller holds _dllLoadLock
+    key = LibraryKey(path)
+    dll = _sharedPrototypes.get(key)
+    if dll is None:
+        dll = DLLPrototypes(LoadLibrary(path), threadSafe)
+        _sharedPrototypes[key] = dll
+    elif threadSafe:
+        dll.SetThreadSafe()
+    return dll
+
+def SharedPrototypes(path, threadSafe=False):
+    # The one DLLPrototypes of the DLL at path (or backend object) in this process, loaded on first
+    # use. The DLL keeps a single open port and current address, so the cache of that state and the
+    # lock guarding it must be shared by everything calling into the same library.
+    with _dllLoadLock:
+        return _SharedPrototypes(path, threadSafe)
+
+def LoadLibrary(path):
+    # The DLL at path. SIMULATED_DLL loads a default simulated drive; any other non-path object is
+    # taken to be a backend exporting the DLL functions (e.g. an IDEADrvSimulator.SimulatedDLL).
+    if not isinstance(path, str):
+        return path
+    from IDEADrvSimulator import SimulatedDLL, SIMULATED_DLL
+    if path == SIMULATED_DLL:
+        return SimulatedDLL()
+    return CDLL(path)
+#endregion
+#region Buffer Pool
+def _LoadStrlen():
+    try:
+        crt = cdll.msvcrt if sys.platform.startswith('win') else CDLL(None)
+        strlen = crt.strlen
+    except (OSError, AttributeError):
+        return None
+    strlen.argtypes = [c_void_p]
+    strlen.restype = c_size_t
+    return strlen
+
+_strlen = _LoadStrlen()
+
+BUFFER_GROWTH = 4                   # factor a response buffer grows by when a response fills it
+MAX_POOLED_BUFSIZE = 65536          # larger buffers are freed after use instead of kept in the pool
+
+class BufferPool:
+    # Reusable ctypes string buffers keyed by size, so polling does not allocate a fresh
+    # buffer on every call.
+    def __init__(self, maxPooledSize=MAX_POOLED_BUFSIZE):
+        self._free = {}
+        self.maxPooledSize = maxPooledSize
+
+    def Acquire(self, size):
+        try:
+            return self._free[size].pop()
+        except (KeyError, IndexError):
+            return create_string_buffer(size)
+
+    def Release(self, buf):
+        if len(buf) > self.maxPooledSize:
+            return
+        try:
+            self._free[len(buf)].append(buf)
+        except KeyError:
+            self._free[len(buf)] = [buf]
+
+    def Clear(self):
+        self._free.clear()
+#endregion
 
 class IDEADrv:
 #region Constructor
-    def __init__(self, Port, path, address=""):
+    def __init__(self, Port, path, address="", dll=None, threadSafe=False):
+        # Pass dll (the .dll attribute of another IDEADrv) to share an already loaded DLL; otherwise the
+        # DLL at path is loaded on first use (see LoadDLL), so creating an IDEADrv costs no DLL work.
+        # Drives on the same path or backend share one DLLPrototypes either way.
+        # threadSafe=True serializes every DLL call; use Transaction() to keep address + command atomic.
         self.MAX_BUFSIZE = 1024
         self.MAX_STREAM_BUFF_SIZE = 85000
-        self.cppdll = CDLL(path)
+        self.MAX_RESPONSE_SIZE = 85 * 1024 * 1024
+        self.bufferSizes = {}               # function name or command letter -> buffer size that fits its responses
+        self.timedCommands = AdaptiveTimeouts()     # SendTimedCommand delays learned per command letter
+        self._threadSafe = threadSafe
+        self.bufferPool = BufferPool()
+        self.responseMode = RESPONSE_STR
+        self._pinnedBuffer = None
+        self.responseParser = ResponseParser(self)
+        self.commandSet = None
+        self.commandSetCachePath = None
+        self._batchExecutor = None
         self.serialPort = Port
         self.DLL_Path = path
         self.IDriveAddress = address
-        self.SetCurrentAddress(address)
+        if dll is not None:
+            if threadSafe:
+                dll.SetThreadSafe()
+            self.dll = dll
+            self.cppdll = dll.library
+            self.SetCurrentAddress(address)
 
     def __str__(self):
         return self.serialPort
 
+    def __getattr__(self, name):
+        # Only reached while dll/cppdll are not set yet; once loaded they are plain attributes
+        if name in ('dll', 'cppdll'):
+            self.LoadDLL()
+            return self.__dict__[name]
+        raise AttributeError("'IDEADrv' object has no attribute '" + name + "'")
+
+    #Loads the DLL now, e.g. on a background thread at startup, instead of at the first drive call.
+    #The current address is set in the DLL before any other thread can see it.
+    def LoadDLL(self):
+        with _dllLoadLock:
+            if 'dll' not in self.__dict__:
+                dll = _SharedPrototypes(self.DLL_Path, self._threadSafe)
+                address = self.IDriveAddress
+                with dll.lock:
+                    if dll.currentAddress != address:
+                        dll.SetCurrentAddress(self.enc(address), len(address))
+                        dll.currentAddress = address
+                self.cppdll = dll.library
+                self.dll = dll
+        return self.dll
+
+    def IsDLLLoaded(self):
+        return 'dll' in self.__dict__
+
 #endregion
 #region Utilities
     def enc(self, x):
@@ -34,527 +365,618 @@ class IDEADrv:
         return y
 
     def Buffer2String(self, buf):
-        rtnStr = str(buf, 'UTF-8')
-        index = rtnStr.find('\r')
-        if index > -1:
-            rtnStr = rtnStr.replace("\r","",1)
-        return rtnStr
+        # Accepts bytes or a memoryview returned in the bytes/view response modes
+        return str(buf, 'UTF-8').replace("\r","",1)
+
+    def DecodeResponse(self, buf):
+        if self.responseMode == RESPONSE_STR:
+            return self.Buffer2String(buf.value)
+        if self.responseMode == RESPONSE_BYTES:
+            return buf.value
+        length = _strlen(buf) if _strlen else len(buf.value)
+        return memoryview(buf).cast('B')[:length]
+
+    #Calls func(*args, buffer, bufferSize) with a pooled buffer and decodes the response. A response that
+    #fills the buffer may have been cut off, so the call is repeated with a buffer BUFFER_GROWTH times
+    #larger (up to MAX_RESPONSE_SIZE). The size that fitted is remembered per key (the DLL function name,
+    #or the command letter for SendCommand) and used from the next call on. Commands are only re-sent
+    #when their response filled the buffer, which only read commands (recalls, lists) ever do.
+    def ReadBuffer(self, func, *args, size=None, key=None):
+        if key is None:
+            key = func.__name__
+        size = self.bufferSizes.get(key) or size or self.MAX_BUFSIZE
+        while True:
+            buf = self.bufferPool.Acquire(size)
+            buf[0] = 0
+            buf[size - 2] = 0
+            try:
+                func(*args, buf, size)
+                #A non-zero second to last byte means the DLL wrote at least size - 1 characters
+                if buf[size - 2] == b'\0' or size >= self.MAX_RESPONSE_SIZE:
+                    return self.DecodeResponse(buf)
+            finally:
+                self.ReleaseBuffer(buf)
+            size = min(size * BUFFER_GROWTH, self.MAX_RESPONSE_SIZE)
+            self.bufferSizes[key] = size
+
+    def ReleaseBuffer(self, buf):
+        # In view mode the last buffer stays pinned until the next call so the returned view stays valid
+        if self.responseMode == RESPONSE_VIEW:
+            buf, self._pinnedBuffer = self._pinnedBuffer, buf
+            if buf is None:
+                return
+        self.bufferPool.Release(buf)
+
+    def CachedResponse(self, text):
+        # Values served from the command set cache, in the same type the DLL path would return
+        if self.responseMode == RESPONSE_STR:
+            return text
+        return self.enc(text)
+
+    def ParseResponse(self, commandLetter, response):
+        # Typed record for a response to commandLetter, fields named from GetOutputFieldList
+        return self.responseParser.Parse(commandLetter, response)
 #endregion
 #region G&S Methods
-    def GetBufferSize():
+    def GetBufferSize(self):
         print("Buffer Size = " + str(self.MAX_BUFSIZE))
         return self.MAX_BUFSIZE  
   
+    #Initial size of response buffers; they grow on demand (see ReadBuffer)
     def SetBufferSize(self,Size):
         self.MAX_BUFSIZE = Size
 
-    def GetDLLPath():
+    def GetBufferHighWaterMarks(self):
+        # Buffer sizes grown to so far, by DLL function name or command letter
+        return dict(self.bufferSizes)
+
+    def ResetBufferHighWaterMarks(self):
+        self.bufferSizes.clear()
+        self.bufferPool.Clear()
+
+    def GetTimingPolicies(self):
+        # SendTimedCommand delays and round trip estimates, by command letter
+        return self.timedCommands.Snapshot()
+
+    #Pins the SendTimedCommand delays (ms) of one command letter instead of learning them
+    def SetTimedCommandDelays(self, commandLetter, writeDelay, readDelay):
+        self.timedCommands.SetDelays(commandLetter, writeDelay, readDelay)
+
+    #Turns SendTimedCommand retries of one read command letter off or on (writes are never retried)
+    def SetTimedCommandRetry(self, commandLetter, enabled):
+        self.timedCommands.SetRetry(commandLetter, enabled)
+
+    def GetDLLPath(self):
         print("Full DLL Path = " + str(self.DLL_Path))
         return self.DLL_Path
 
-    def SetDLLPath(path):
+    def SetDLLPath(self, path):
         self.DLL_Path = path
 
+    def GetResponseMode(self):
+        return self.responseMode
+
+    def SetResponseMode(self, mode):
+        if mode not in (RESPONSE_STR, RESPONSE_BYTES, RESPONSE_VIEW):
+            raise ValueError("Unknown response mode: " + str(mode))
+        self.responseMode = mode
+        if mode != RESPONSE_VIEW and self._pinnedBuffer is not None:
+            self.bufferPool.Release(self._pinnedBuffer)
+            self._pinnedBuffer = None
+        self.responseParser = ResponseParser(self)
+
+    def GetCommandSetCachePath(self):
+        return self.commandSetCachePath
+
+    def SetCommandSetCachePath(self, path):
+        self.commandSetCachePath = path
+
     def SetActivePort(self,inPort):
         self.serialPort = inPort
 #endregion
 #region Communications
     def OpenComms(self):
-        self.cppdll.OpenSerial.argtypes = [c_char_p]
-        self.cppdll.OpenSerial.restype = c_int
         tmp = c_char_p(self.enc(self.serialPort))
-        _portHandle = self.cppdll.OpenSerial(tmp)
-        time.sleep(0.06)
+        with self.dll.lock:
+            _portHandle = self.dll.OpenSerial(tmp)
+            self.dll.openPort = self.serialPort
+            self.dll.currentAddress = None
+            with self.dll.Timed("OpenComms.sleep"):
+                time.sleep(0.06)
 
     def CloseComms(self):
-        self.cppdll.IsSerialOpen.restype = c_bool
-        self.cppdll.CloseSerial.restype = c_bool
-        while(self.cppdll.IsSerialOpen()):
-            if (self.cppdll.CloseSerial()): break
-            time.sleep(0.01)
+        #Nothing can be open before the DLL is loaded; don't load it just to close
+        if not self.IsDLLLoaded():
+            return
+        with self.dll.lock:
+            while(self.dll.IsSerialOpen()):
+                if (self.dll.CloseSerial()): break
+                with self.dll.Timed("CloseComms.sleep"):
+                    time.sleep(0.01)
+            self.dll.openPort = None
+            self.dll.currentAddress = None
 
     def SetCurrentAddress(self, localAddress):
-        self.cppdll.SetCurrentAddress.argtypes = [c_char_p, c_int]
-        self.cppdll.SetCurrentAddress(self.enc(localAddress),len(localAddress))
+        # The DLL call is skipped when the DLL is already set to this address
+        with self.dll.lock:
+            if self.dll.currentAddress != localAddress:
+                self.dll.SetCurrentAddress(self.enc(localAddress),len(localAddress))
+                self.dll.currentAddress = localAddress
         self.IDriveAddress = localAddress
 
+    @contextmanager
+    def Transaction(self, address=None):
+        # Holds the DLL lock so no other thread can change the address or interleave commands:
+        #     with drive.Transaction("#002"):
+        #         drive.MoveToPosition(...)
+        #         response = drive.GetPositionVelocity()
+        # The drive's own address is set back when the block ends.
+        with self.dll.lock:
+            if address is None:
+                yield self
+                return
+            previous = self.IDriveAddress
+            self.SetCurrentAddress(address)
+            try:
+                yield self
+            finally:
+                self.SetCurrentAddress(previous)
+
     def IsSerialOpen(self):
-        self.cppdll.IsSerialOpen.restype = c_bool
-        return self.cppdll.IsSerialOpen()
+        return self.dll.IsSerialOpen()
 
     def GetAllAvailableAddresses(self):
         if not self.IsSerialOpen():
             return ""
         numberOfPossibleIDEADriveAddresses = 256
         _addressList = (c_int*numberOfPossibleIDEADriveAddresses)(*[x for x in range(numberOfPossibleIDEADriveAddresses)])
-        self.cppdll.GetAddresses(_addressList)
+        self.dll.GetAddresses(_addressList)
         return _addressList
 
 #endregion
 #region NO R/W Commands
     def Noop(self):
-        self.cppdll.Noop()
+        self.dll.Noop()
 
     def ReturnFromSub(self):
-        self.cppdll.ReturnFromSub()
+        self.dll.ReturnFromSub()
 
     def SingleStep(self):
-        self.cppdll.SingleStep()
+        self.dll.SingleStep()
 
     def WaitForMove(self):
-        self.cppdll.WaitForMove()
+        self.dll.WaitForMove()
 
     def Reset(self):
-        self.cppdll.Reset()
+        self.dll.Reset()
 
     def Abort(self):
-        self.cppdll.Abort()
+        self.dll.Abort()
 
     def EnableDataLogging(self):
-        self.cppdll.EnableDataLogging()
+        self.dll.EnableDataLogging()
 
     def DisableDataLogging(self):
-        self.cppdll.DisableDataLogging()
+        self.dll.DisableDataLogging()
 
 #endregion
 #region Readonly Commands
     def GetFirmwareVersion(self):
-        self.cppdll.GetFWVersion.argtypes = [c_char_p, c_int]
-        mystrbuf = create_string_buffer(self.MAX_BUFSIZE)
-        mystrbuf[0] = 0
-        self.cppdll.GetFWVersion(mystrbuf, len(mystrbuf))
-        return self.Buffer2String(mystrbuf.value)
+        return self.ReadBuffer(self.dll.GetFWVersion)
 
     def GetEncoderConfiguration(self):
-        self.cppdll.GetEncoderConfiguration.argtypes = [c_char_p, c_int]
-        mystrbuf = create_string_buffer(self.MAX_BUFSIZE)
-        mystrbuf[0] = 0
-        self.cppdll.GetEncoderConfiguration(mystrbuf, len(mystrbuf))
-        return self.Buffer2String(mystrbuf.value)
+        return self.ReadBuffer(self.dll.GetEncoderConfiguration)
 
     def GetHallSensorConfiguration(self):
-        self.cppdll.GetHallSensorConfiguration.argtypes = [c_char_p, c_int]
-        mystrbuf = create_string_buffer(self.MAX_BUFSIZE)
-        mystrbuf[0] = 0
-        self.cppdll.GetHallSensorConfiguration(mystrbuf, len(mystrbuf))
-        return self.Buffer2String(mystrbuf.value)
+        return self.ReadBuffer(self.dll.GetHallSensorConfiguration)
 
     def GetMotorType(self):
-        self.cppdll.GetMotorType.argtypes = [c_char_p, c_int]
-        mystrbuf = create_string_buffer(self.MAX_BUFSIZE)
-        mystrbuf[0] = 0
-        self.cppdll.GetMotorType(mystrbuf, len(mystrbuf))
-        return self.Buffer2String(mystrbuf.value)
+        return self.ReadBuffer(self.dll.GetMotorType)
 
     def GetMotorParameters(self):
-        self.cppdll.GetMotorParameters.argtypes = [c_char_p, c_int]
-        mystrbuf = create_string_buffer(self.MAX_BUFSIZE)
-        mystrbuf[0] = 0
-        self.cppdll.GetMotorParameters(mystrbuf, len(mystrbuf))
-        return self.Buffer2String(mystrbuf.value)
+        return self.ReadBuffer(self.dll.GetMotorParameters)
 
     def GetControlReference(self):
-        self.cppdll.GetControlReference.argtypes = [c_char_p, c_int]
-        mystrbuf = create_string_buffer(self.MAX_BUFSIZE)
-        mystrbuf[0] = 0
-        self.cppdll.GetControlReference(mystrbuf, len(mystrbuf))
-        return self.Buffer2String(mystrbuf.value)
+        return self.ReadBuffer(self.dll.GetControlReference)
 
     def GetDriveAddress(self):
-        self.cppdll.GetDriveAddress.argtypes = [c_char_p, c_int]
-        mystrbuf = create_string_buffer(self.MAX_BUFSIZE)
-        mystrbuf[0] = 0
-        self.cppdll.GetDriveAddress(mystrbuf, len(mystrbuf))
-        return self.Buffer2String(mystrbuf.value)
+        return self.ReadBuffer(self.dll.GetDriveAddress)
 
     def GetMaxDriveCurrent(self):
-        self.cppdll.GetMaxDriveCurrent.argtypes = [c_char_p, c_int]
-        mystrbuf = create_string_buffer(self.MAX_BUFSIZE)
-        mystrbuf[0] = 0
-        self.cppdll.GetMaxDriveCurrent(mystrbuf, len(mystrbuf))
-        return self.Buffer2String(mystrbuf.value)
+        return self.ReadBuffer(self.dll.GetMaxDriveCurrent)
 
     def GetFactoryConfiguration(self):
-        self.cppdll.GetFactoryConfiguration.argtypes = [c_char_p, c_int]
-        mystrbuf = create_string_buffer(self.MAX_BUFSIZE)
-        mystrbuf[0] = 0
-        self.cppdll.GetFactoryConfiguration(mystrbuf, len(mystrbuf))
-        return self.Buffer2String(mystrbuf.value)
+        return self.ReadBuffer(self.dll.GetFactoryConfiguration)
 
     def GetVelocityProfile(self):
-        self.cppdll.GetVelocityProfile.argtypes = [c_char_p, c_int]
-        mystrbuf = create_string_buffer(self.MAX_BUFSIZE)
-        mystrbuf[0] = 0
-        self.cppdll.GetVelocityProfile(mystrbuf, len(mystrbuf))
-        return self.Buffer2String(mystrbuf.value)
+        return self.ReadBuffer(self.dll.GetVelocityProfile)
 
     def GetControlGain(self):
-        self.cppdll.GetControlGain.argtypes = [c_char_p, c_int]
-        mystrbuf = create_string_buffer(self.MAX_BUFSIZE)
-        mystrbuf[0] = 0
-        self.cppdll.GetControlGain(mystrbuf, len(mystrbuf))
-        return self.Buffer2String(mystrbuf.value)
+        return self.ReadBuffer(self.dll.GetControlGain)
 
     def IsMoveExecuting(self):
-        self.cppdll.IsMoveExecuting.argtypes = [c_char_p, c_int]
-        mystrbuf = create_string_buffer(self.MAX_BUFSIZE)
-        mystrbuf[0] = 0
-        self.cppdll.IsMoveExecuting(mystrbuf, len(mystrbuf))
-        return self.Buffer2String(mystrbuf.value)
+        return self.ReadBuffer(self.dll.IsMoveExecuting)
+
+    def IsMoving(self):
+        # IsMoveExecuting as a bool
+        return ResponseFlag(self.IsMoveExecuting())
 
     def GetPositionVelocity(self):
-        self.cppdll.GetPositionVelocity.argtypes = [c_char_p, c_int]
-        mystrbuf = create_string_buffer(self.MAX_BUFSIZE)
-        mystrbuf[0] = 0
-        self.cppdll.GetPositionVelocity(mystrbuf, len(mystrbuf))
-        return self.Buffer2String(mystrbuf.value)
+        return self.ReadBuffer(self.dll.GetPositionVelocity)
 
     def IsInputOverride(self):
-        self.cppdll.IsInputOverride.argtypes = [c_char_p, c_int]
-        mystrbuf = create_string_buffer(self.MAX_BUFSIZE)
-        mystrbuf[0] = 0
-        self.cppdll.IsInputOverride(mystrbuf, len(mystrbuf))
-        return self.Buffer2String(mystrbuf.value)
+        return self.ReadBuffer(self.dll.IsInputOverride)
 
     def GetIOReading(self):
-        self.cppdll.GetIOReading.argtypes = [c_char_p, c_int]
-        mystrbuf = create_string_buffer(self.MAX_BUFSIZE)
-        mystrbuf[0] = 0
-        self.cppdll.GetIOReading(mystrbuf, len(mystrbuf))
-        return self.Buffer2String(mystrbuf.value)
+        return self.ReadBuffer(self.dll.GetIOReading)
 
     def GetFaultParameters(self):
-        self.cppdll.GetFaultParameters.argtypes = [c_char_p, c_int]
-        mystrbuf = create_string_buffer(self.MAX_BUFSIZE)
-        mystrbuf[0] = 0
-        self.cppdll.GetFaultParameters(mystrbuf, len(mystrbuf))
-        return self.Buffer2String(mystrbuf.value)
+        return self.ReadBuffer(self.dll.GetFaultParameters)
 
     def GetFaultReading(self):
-        self.cppdll.GetFaultReading.argtypes = [c_char_p, c_int]
-        mystrbuf = create_string_buffer(self.MAX_BUFSIZE)
-        mystrbuf[0] = 0
-        self.cppdll.GetFaultReading(mystrbuf, len(mystrbuf))
-        return self.Buffer2String(mystrbuf.value)
+        return self.ReadBuffer(self.dll.GetFaultReading)
 
     def GetStartupProgramName(self):
-        self.cppdll.GetStartupProgramName.argtypes = [c_char_p, c_int]
-        mystrbuf = create_string_buffer(self.MAX_BUFSIZE)
-        mystrbuf[0] = 0
-        self.cppdll.GetStartupProgramName(mystrbuf, len(mystrbuf))
-        return self.Buffer2String(mystrbuf.value)
+        return self.ReadBuffer(self.dll.GetStartupProgramName)
 
     def IsProgramExecuting(self):
-        self.cppdll.IsProgramExecuting.argtypes = [c_char_p, c_int]
-        mystrbuf = create_string_buffer(self.MAX_BUFSIZE)
-        mystrbuf[0] = 0
-        self.cppdll.IsProgramExecuting(mystrbuf, len(mystrbuf))
-        return self.Buffer2String(mystrbuf.value)
+        return self.ReadBuffer(self.dll.IsProgramExecuting)
 
     def GetListProgramNames(self):
-        self.cppdll.GetListProgramNames.argtypes = [c_char_p, c_int]
-        mystrbuf = create_string_buffer(self.MAX_BUFSIZE)
-        mystrbuf[0] = 0
-        self.cppdll.GetListProgramNames(mystrbuf, len(mystrbuf))
-        return self.Buffer2String(mystrbuf.value)
+        return self.ReadBuffer(self.dll.GetListProgramNames)
 
 #endregion
 #region Writeonly Commands
     def SetEncoderConfiguration(self, commandParameters):
-        self.cppdll.SetEncoderConfiguration.argtypes = [c_char_p, c_int]
-        success = self.cppdll.SetEncoderConfiguration(self.enc(commandParameters), len(commandParameters))
+        success = self.dll.SetEncoderConfiguration(self.enc(commandParameters), len(commandParameters))
         return success
 
     def SetHallSensorConfiguration(self, commandParameters):
-        self.cppdll.SetHallSensorConfiguration.argtypes = [c_char_p, c_int]
-        success = self.cppdll.SetHallSensorConfiguration(self.enc(commandParameters), len(commandParameters))
+        success = self.dll.SetHallSensorConfiguration(self.enc(commandParameters), len(commandParameters))
         return success
 
     def SetMotorParameters(self, commandParameters):
-        self.cppdll.SetMotorParameters.argtypes = [c_char_p, c_int]
-        success = self.cppdll.SetMotorParameters(self.enc(commandParameters), len(commandParameters))
+        success = self.dll.SetMotorParameters(self.enc(commandParameters), len(commandParameters))
         return success
     def SetMotorType(self, commandParameters):
-        self.cppdll.SetMotorType.argtypes = [c_char_p, c_int]
-        success = self.cppdll.SetMotorType(self.enc(commandParameters), len(commandParameters))
+        success = self.dll.SetMotorType(self.enc(commandParameters), len(commandParameters))
         return success
 
     def SetControlReferenceConfiguration(self, commandParameters):
-        self.cppdll.SetControlReferenceConfiguration.argtypes = [c_char_p, c_int]
-        success = self.cppdll.SetControlReferenceConfiguration(self.enc(commandParameters), len(commandParameters))
+        success = self.dll.SetControlReferenceConfiguration(self.enc(commandParameters), len(commandParameters))
         return success
 
     def SetDriveAddress(self, commandParameters):
-        self.cppdll.SetDriveAddress.argtypes = [c_char_p, c_int]
-        success = self.cppdll.SetDriveAddress(self.enc(commandParameters), len(commandParameters))
+        success = self.dll.SetDriveAddress(self.enc(commandParameters), len(commandParameters))
         return success
 
     def SetPassword(self, commandParameters):
-        self.cppdll.SetPassword.argtypes = [c_char_p, c_int]
-        success = self.cppdll.SetPassword(self.enc(commandParameters), len(commandParameters))
+        success = self.dll.SetPassword(self.enc(commandParameters), len(commandParameters))
         return success
 
     def RemovePassword(self, commandParameters):
-        self.cppdll.RemovePassword.argtypes = [c_char_p, c_int]
-        success = self.cppdll.RemovePassword(self.enc(commandParameters), len(commandParameters))
+        success = self.dll.RemovePassword(self.enc(commandParameters), len(commandParameters))
         return success
 
     def MoveToPosition(self, commandParameters):
-        self.cppdll.MoveToPosition.argtypes = [c_char_p, c_int]
-        success = self.cppdll.MoveToPosition(self.enc(commandParameters), len(commandParameters))
+        success = self.dll.MoveToPosition(self.enc(commandParameters), len(commandParameters))
         return success
 
     def IndexDistance(self, commandParameters):
-        self.cppdll.IndexDistance.argtypes = [c_char_p, c_int]
-        success = self.cppdll.IndexDistance(self.enc(commandParameters), len(commandParameters))
+        success = self.dll.IndexDistance(self.enc(commandParameters), len(commandParameters))
         return success
 
     def GoAtSpeed(self, commandParameters):
-        self.cppdll.GoAtSpeed.argtypes = [c_char_p, c_int]
-        success = self.cppdll.GoAtSpeed(self.enc(commandParameters), len(commandParameters))
+        success = self.dll.GoAtSpeed(self.enc(commandParameters), len(commandParameters))
         return success
 
     def GoAtVoltage(self, commandParameters):
-        self.cppdll.GoAtVoltage.argtypes = [c_char_p, c_int]
-        success = self.cppdll.GoAtVoltage(self.enc(commandParameters), len(commandParameters))
+        success = self.dll.GoAtVoltage(self.enc(commandParameters), len(commandParameters))
         return success
 
     def GoAtTorque(self, commandParameters):
-        self.cppdll.GoAtTorque.argtypes = [c_char_p, c_int]
-        success = self.cppdll.GoAtTorque(self.enc(commandParameters), len(commandParameters))
+        success = self.dll.GoAtTorque(self.enc(commandParameters), len(commandParameters))
         return success
 
     def ImmediateStop(self, commandParameters):
-        self.cppdll.ImmediateStop.argtypes = [c_char_p, c_int]
-        success = self.cppdll.ImmediateStop(self.enc(commandParameters), len(commandParameters))
+        success = self.dll.ImmediateStop(self.enc(commandParameters), len(commandParameters))
         return success
 
     def StopMovement(self, commandParameters):
-        self.cppdll.StopMovement.argtypes = [c_char_p, c_int]
-        success = self.cppdll.StopMovement(self.enc(commandParameters), len(commandParameters))
+        success = self.dll.StopMovement(self.enc(commandParameters), len(commandParameters))
         return success
 
     def SetVelocityProfileWaveshape(self, commandParameters):
-        self.cppdll.SetVelocityProfileWaveshape.argtypes = [c_char_p, c_int]
-        success = self.cppdll.SetVelocityProfileWaveshape(self.enc(commandParameters), len(commandParameters))
+        success = self.dll.SetVelocityProfileWaveshape(self.enc(commandParameters), len(commandParameters))
         return success
 
     def SetControlGains(self, commandParameters):
-        self.cppdll.SetControlGains.argtypes = [c_char_p, c_int]
-        success = self.cppdll.SetControlGains(self.enc(commandParameters), len(commandParameters))
+        success = self.dll.SetControlGains(self.enc(commandParameters), len(commandParameters))
         return success
 
     def SetPositionOrigin(self, commandParameters):
-        self.cppdll.SetPositionOrigin.argtypes = [c_char_p, c_int]
-        success = self.cppdll.SetPositionOrigin(self.enc(commandParameters), len(commandParameters))
+        success = self.dll.SetPositionOrigin(self.enc(commandParameters), len(commandParameters))
         return success
 
     def SetOutputState(self, commandParameters):
-        self.cppdll.SetOutputState.argtypes = [c_char_p, c_int]
-        success = self.cppdll.SetOutputState(self.enc(commandParameters), len(commandParameters))
+        success = self.dll.SetOutputState(self.enc(commandParameters), len(commandParameters))
         return success
 
     def SetInputInterrupts(self, commandParameters):
-        self.cppdll.SetInputInterrupts.argtypes = [c_char_p, c_int]
-        success = self.cppdll.SetInputInterrupts(self.enc(commandParameters), len(commandParameters))
+        success = self.dll.SetInputInterrupts(self.enc(commandParameters), len(commandParameters))
         return success
 
     def SetPositionLimitFault(self, commandParameters):
-        self.cppdll.SetPositionLimitFault.argtypes = [c_char_p, c_int]
-        success = self.cppdll.SetPositionLimitFault(self.enc(commandParameters), len(commandParameters))
+        success = self.dll.SetPositionLimitFault(self.enc(commandParameters), len(commandParameters))
         return success
 
     def SetCurrentLimitDurationFault(self, commandParameters):
-        self.cppdll.SetCurrentLimitDurationFault.argtypes = [c_char_p, c_int]
-        success = self.cppdll.SetCurrentLimitDurationFault(self.enc(commandParameters), len(commandParameters))
+        success = self.dll.SetCurrentLimitDurationFault(self.enc(commandParameters), len(commandParameters))
         return success
 
     def SetPositionErrorFault(self, commandParameters):
-        self.cppdll.SetPositionErrorFault.argtypes = [c_char_p, c_int]
-        success = self.cppdll.SetPositionErrorFault(self.enc(commandParameters), len(commandParameters))
+        success = self.dll.SetPositionErrorFault(self.enc(commandParameters), len(commandParameters))
         return success
 
     def RunProgram(self, commandParameters):
-        self.cppdll.RunProgram.argtypes = [c_char_p, c_int]
-        success = self.cppdll.RunProgram(self.enc(commandParameters), len(commandParameters))
+        success = self.dll.RunProgram(self.enc(commandParameters), len(commandParameters))
         return success
 
     def ExecuteProgram(self, commandParameters):
-        self.cppdll.ExecuteProgram.argtypes = [c_char_p, c_int]
-        success = self.cppdll.ExecuteProgram(self.enc(commandParameters), len(commandParameters))
+        success = self.dll.ExecuteProgram(self.enc(commandParameters), len(commandParameters))
         return success
 
     def SetStartupProgram(self, commandParameters):
-        self.cppdll.SetStartupProgram.argtypes = [c_char_p, c_int]
-        success = self.cppdll.SetStartupProgram(self.enc(commandParameters), len(commandParameters))
+        success = self.dll.SetStartupProgram(self.enc(commandParameters), len(commandParameters))
         return success
 
     def DeleteProgram(self, commandParameters):
-        self.cppdll.DeleteProgram.argtypes = [c_char_p, c_int]
-        success = self.cppdll.DeleteProgram(self.enc(commandParameters), len(commandParameters))
+        success = self.dll.DeleteProgram(self.enc(commandParameters), len(commandParameters))
         return success
 
     def SetDebugMode(self, commandParameters):
-        self.cppdll.SetDebugMode.argtypes = [c_char_p, c_int]
-        success = self.cppdll.SetDebugMode(self.enc(commandParameters), len(commandParameters))
+        success = self.dll.SetDebugMode(self.enc(commandParameters), len(commandParameters))
         return success
 
     def RunToLabel(self, commandParameters):
-        self.cppdll.RunToLabel.argtypes = [c_char_p, c_int]
-        success = self.cppdll.RunToLabel(self.enc(commandParameters), len(commandParameters))
+        success = self.dll.RunToLabel(self.enc(commandParameters), len(commandParameters))
         return success
 
     def GotoAddress(self, commandParameters):
-        self.cppdll.GotoAddress.argtypes = [c_char_p, c_int]
-        success = self.cppdll.GotoAddress(self.enc(commandParameters), len(commandParameters))
+        success = self.dll.GotoAddress(self.enc(commandParameters), len(commandParameters))
         return success
 
     def JumpNTimes(self, commandParameters):
-        self.cppdll.JumpNTimes.argtypes = [c_char_p, c_int]
-        success = self.cppdll.JumpNTimes(self.enc(commandParameters), len(commandParameters))
+        success = self.dll.JumpNTimes(self.enc(commandParameters), len(commandParameters))
         return success
 
     def GotoIf(self, commandParameters):
-        self.cppdll.GotoIf.argtypes = [c_char_p, c_int]
-        success = self.cppdll.GotoIf(self.enc(commandParameters), len(commandParameters))
+        success = self.dll.GotoIf(self.enc(commandParameters), len(commandParameters))
         return success
 
     def GotoSub(self, commandParameters):
-        self.cppdll.GotoSub.argtypes = [c_char_p, c_int]
-        success = self.cppdll.GotoSub(self.enc(commandParameters), len(commandParameters))
+        success = self.dll.GotoSub(self.enc(commandParameters), len(commandParameters))
         return success
 
     def ReturnTo(self, commandParameters):
-        self.cppdll.ReturnTo.argtypes = [c_char_p, c_int]
-        success = self.cppdll.ReturnTo(self.enc(commandParameters), len(commandParameters))
+        success = self.dll.ReturnTo(self.enc(commandParameters), len(commandParameters))
         return success
 
     def WaitTime(self, commandParameters):
-        self.cppdll.WaitTime.argtypes = [c_char_p, c_int]
-        success = self.cppdll.WaitTime(self.enc(commandParameters), len(commandParameters))
+        success = self.dll.WaitTime(self.enc(commandParameters), len(commandParameters))
         return success
 
     def Label(self, commandParameters):
-        self.cppdll.Label.argtypes = [c_char_p, c_int]
-        success = self.cppdll.Label(self.enc(commandParameters), len(commandParameters))
+        success = self.dll.Label(self.enc(commandParameters), len(commandParameters))
         return success
 
     def Comment(self, commandParameters):
-        self.cppdll.Comment.argtypes = [c_char_p, c_int]
-        success = self.cppdll.Comment(self.enc(commandParameters), len(commandParameters))
+        success = self.dll.Comment(self.enc(commandParameters), len(commandParameters))
         return success
 
     def SetInputs(self, commandParameters):
-        self.cppdll.SetInputs.argtypes = [c_char_p, c_int]
-        success = self.cppdll.SetInputs(self.enc(commandParameters), len(commandParameters))
+        success = self.dll.SetInputs(self.enc(commandParameters), len(commandParameters))
         return success
 
     def SetInputOverride(self, commandParameters):
-        self.cppdll.SetInputOverride.argtypes = [c_char_p, c_int]
-        success = self.cppdll.SetInputOverride(self.enc(commandParameters), len(commandParameters))
+        success = self.dll.SetInputOverride(self.enc(commandParameters), len(commandParameters))
         return success
 
 #endregion
 #region Misc Commands
     def SendCommand(self, commandParameters):
-        outputBuffer = create_string_buffer(self.MAX_BUFSIZE)
-        self.cppdll.SendCommand.argtypes = [c_char_p, c_char_p, c_int]
-        self.cppdll.SendCommand(self.enc(commandParameters), outputBuffer, len(outputBuffer))
-        return self.Buffer2String(outputBuffer.value)
+        return self.ReadBuffer(self.dll.SendCommand, self.enc(commandParameters), key=commandParameters[:1])
 
-    def SendTimedCommand(self, commandParameters):
-        outputBuffer = create_string_buffer(self.MAX_BUFSIZE)
-        self.cppdll.SendTimedCommand.argtypes = [c_char_p, c_char_p, c_int, c_int, c_int]
-        self.cppdll.SendTimedCommand(self.enc(commandParameters), outputBuffer, len(outputBuffer), 60, 30)
-        return self.Buffer2String(outputBuffer.value)
+    #Delays in ms; by default the ones learned for the command letter (see IDEADrvTiming). Empty or
+    #garbled responses to reads are retried; CommandTimeoutError/GarbledResponseError is raised when
+    #retries run out. Write and motion commands are never resent.
+    def SendTimedCommand(self, commandParameters, writeDelay=None, readDelay=None, retries=None):
+        return self.timedCommands.Send(self._SendTimedCommandOnce, commandParameters, writeDelay, readDelay, retries)
+
+    def _SendTimedCommandOnce(self, commandParameters, writeDelay, readDelay):
+        command = self.enc(commandParameters)
+        return self.ReadBuffer(lambda buf, size: self.dll.SendTimedCommand(command, buf, size, writeDelay, readDelay),
+                               key=commandParameters[:1])
 
     def GetNVParameter(self, commandParameters):
-        outputBuffer = create_string_buffer(self.MAX_BUFSIZE)
-        self.cppdll.GetNVParameter.argtypes = [c_char_p, c_char_p, c_int]
-        self.cppdll.GetNVParameter(self.enc(commandParameters), outputBuffer, len(outputBuffer))
-        return self.Buffer2String(outputBuffer.value)
+        return self.ReadBuffer(self.dll.GetNVParameter, self.enc(commandParameters))
 
     def DownloadProgram(self, commandParameters):
-        outputBuffer = create_string_buffer(self.MAX_BUFSIZE)
-        self.cppdll.DownloadProgram.argtypes = [c_char_p, c_char_p, c_int]
-        self.cppdll.DownloadProgram(self.enc(commandParameters), outputBuffer, len(outputBuffer))
-        return self.Buffer2String(outputBuffer.value)
+        # The DLL cuts longer input off without telling; send long programs with IDEADrvProgram
+        if len(commandParameters) > MAX_PARAMETER_LENGTH:
+            raise ValueError("DownloadProgram input is longer than " + str(MAX_PARAMETER_LENGTH) + " characters")
+        return self.ReadBuffer(self.dll.DownloadProgram, self.enc(commandParameters))
 
     def IsValidPassword(self, commandParameters):
-        outputBuffer = create_string_buffer(self.MAX_BUFSIZE)
-        self.cppdll.IsValidPassword.argtypes = [c_char_p, c_char_p, c_int]
-        self.cppdll.IsValidPassword(self.enc(commandParameters), outputBuffer, len(outputBuffer))
-        return self.Buffer2String(outputBuffer.value)
+        return self.ReadBuffer(self.dll.IsValidPassword, self.enc(commandParameters))
 
     def RecallProgram(self, commandParameters):
-        outputBuffer = create_string_buffer(self.MAX_BUFSIZE)
-        self.cppdll.RecallProgram.argtypes = [c_char_p, c_char_p, c_int]
-        self.cppdll.RecallProgram(self.enc(commandParameters), outputBuffer, len(outputBuffer))
-        return self.Buffer2String(outputBuffer.value)
-
-    def GetListProgramNames(self):
-        outputBuffer = create_string_buffer(self.MAX_BUFSIZE)
-        self.cppdll.GetListProgramNames.argtypes = [c_char_p, c_char_p, c_int]
-        self.cppdll.GetListProgramNames(outputBuffer, len(outputBuffer))
-        return self.Buffer2String(outputBuffer.value)
+        return self.ReadBuffer(self.dll.RecallProgram, self.enc(commandParameters))
 
     def UpdateFirmware(self, passwordIn):
-        self.cppdll.UpdateFirmware.argtypes = [c_bool]
         if passwordIn == "@metek23":
-            return self.cppdll.UpdateFirmware(c_bool(True))
+            return self.dll.UpdateFirmware(c_bool(True))
         else:
-            return self.cppdll.UpdateFirmware(c_bool(False))
+            return self.dll.UpdateFirmware(c_bool(False))
 
     def RestoreFactoryDefaults(self, check):
-        self.cppdll.RestoreFactoryDefaults.argtypes = [c_bool]
         if check:
-            return self.cppdll.RestoreFactoryDefaults(c_bool(True))
+            return self.dll.RestoreFactoryDefaults(c_bool(True))
         else:
-            return self.cppdll.RestoreFactoryDefaults(c_bool(False))
+            return self.dll.RestoreFactoryDefaults(c_bool(False))
+#endregion
+
+#region Batch
+    def PrepareCall(self, command, params=None):
+        # (callable, args) for a wrapper method name or, failing that, a raw command for SendCommand.
+        # Plain write-only DLL calls get their parameters encoded here so nothing is left to do at send time.
+        if params is not None and DLL_PROTOTYPES.get(command) in (_IN_PARAMS, _BOOL_PARAMS) and hasattr(IDEADrv, command):
+            return getattr(self.dll, command), (self.enc(params), len(params))
+        method = getattr(self, command, None) if command[:1].isupper() else None
+        if callable(method):
+            return method, (() if params is None else (params,))
+        return self.SendCommand, (command + (params or ""),)
+
+    def RunBatch(self, entries, stopOnError=False):
+        # entries: (command, params, address) tuples, see IDEADrvBatch. Returns a BatchResult per entry.
+        return RunBatch(self, entries, stopOnError)
+
+    def SubmitBatch(self, entries, stopOnError=False):
+        # Same as RunBatch on this drive's batch worker thread; returns a Future for the result list
+        if self._batchExecutor is None:
+            import concurrent.futures
+            self._batchExecutor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="IDEADrvBatch")
+        return self._batchExecutor.submit(RunBatch, self, list(entries), stopOnError)
+#endregion
+
+#region Coordinated Motion
+    #Arms a move on several drives of this bus for a low-skew start, see IDEADrvCoordinated. axes are
+    #AxisMove or (address, params[, command]) entries. Call Dispatch() on the result to start them.
+    def PrepareCoordinatedMove(self, axes, mode=DISPATCH_AUTO, trigger=None):
+        return CoordinatedMove(self, axes, mode, trigger).Arm()
+#endregion
+
+#region Configuration
+    def CaptureConfiguration(self):
+        # ConfigSnapshot of this drive's configuration, see IDEADrvConfig
+        return CaptureSnapshot(self)
+
+    def PushConfiguration(self, target, current=None):
+        # Sends only the setters whose values differ from current (read first if not given).
+        # Returns (BatchResult list, snapshot after the push).
+        return PushSnapshot(self, target, current)
+#endregion
+
+#region Instrumentation
+    #Starts recording DLL call statistics. The instrumentation belongs to the loaded DLL, so it covers
+    #every IDEADrv sharing it. Pass an existing Instrumentation to keep adding to its stats.
+    def EnableInstrumentation(self, instrumentation=None):
+        if instrumentation is None:
+            instrumentation = self.dll.instrumentation or Instrumentation()
+        self.dll.SetInstrumentation(instrumentation)
+        return instrumentation
+
+    def DisableInstrumentation(self):
+        instrumentation = self.dll.instrumentation
+        self.dll.SetInstrumentation(None)
+        return instrumentation
+
+    def GetStats(self):
+        # {DLL function: {calls, errors, timeouts, bytesIn, bytesOut, total, mean, p50, p99, max}}
+        if self.dll.instrumentation is None:
+            return {}
+        return self.dll.instrumentation.Snapshot()
+
+    def ExportStats(self, format="json"):
+        # "json" or "prometheus" (text exposition format)
+        instrumentation = self.dll.instrumentation or Instrumentation()
+        if format == "prometheus":
+            return instrumentation.ToPrometheus()
+        if format == "json":
+            return instrumentation.ToJSON()
+        raise ValueError("Unknown stats format: " + str(format))
+#endregion
+
+#region Telemetry
+    def StartTelemetry(self, getters=DEFAULT_GETTERS, rate=100.0, capacity=100000):
+        # Polls the getters at rate Hz on a background thread into a ring buffer; call Stop() on the result
+        return TelemetryStreamer(self, getters, rate, capacity).Start()
+
+    def StartTelemetryLog(self, path, getters=DEFAULT_GETTERS, rate=100.0, capacity=100000):
+        # As StartTelemetry, with every sample appended to the binary log at path (see IDEADrvLog);
+        # call Close() on the returned TelemetryRecorder to stop both
+        streamer = self.StartTelemetry(getters, rate, capacity)
+        try:
+            recorder = TelemetryRecorder(path, streamer.ring.channels, {'getters': list(getters), 'rate': rate})
+        except Exception:
+            streamer.Stop()
+            raise
+        return recorder.Follow(streamer, self.IDriveAddress, owned=True)
 #endregion
 
 #region Command Info Commands
     def InitializeCommandSet(self):
-        self.cppdll.InitializeCommandSet()
+        self.dll.InitializeCommandSet()
+        self.LoadCommandSet(initialized=True)
+
+    #Loads the whole command database into self.commandSet. A cache file (see SetCommandSetCachePath)
+    #made from the same DLL build is used when available; otherwise the DLL is queried once and the
+    #cache file is rewritten. The query functions below answer from self.commandSet once loaded.
+    def LoadCommandSet(self, initialized=False):
+        signature = DLLSignature(self.DLL_Path)
+        commandSet = None
+        if self.commandSetCachePath:
+            commandSet = CommandSet.Load(self.commandSetCachePath, signature)
+        if commandSet is None:
+            if not initialized:
+                self.dll.InitializeCommandSet()
+            self.commandSet = None
+            commandSet = CommandSet.FromDLL(self, signature)
+            if self.commandSetCachePath:
+                try:
+                    commandSet.Save(self.commandSetCachePath)
+                except OSError:
+                    pass
+        self.commandSet = commandSet
+        self.responseParser.Clear()
+        return commandSet
 
     def GetCommandName(self, commandParameters):
-        outputBuffer = create_string_buffer(self.MAX_BUFSIZE)
-        self.cppdll.GetCommandName.argtypes = [c_char_p, c_char_p, c_int]
-        self.cppdll.GetCommandName(self.enc(commandParameters), outputBuffer, len(outputBuffer))
-        return self.Buffer2String(outputBuffer.value)
+        if self.commandSet is not None and commandParameters in self.commandSet.byLetter:
+            return self.CachedResponse(self.commandSet.byLetter[commandParameters].name)
+        return self.ReadBuffer(self.dll.GetCommandName, self.enc(commandParameters))
 
     def GetCommandList(self):
-        outputBuffer = create_string_buffer(self.MAX_STREAM_BUFF_SIZE)
-        self.cppdll.GetCommandList.argtypes = [c_char_p]
-        self.cppdll.GetCommandList(outputBuffer)
-        return self.Buffer2String(outputBuffer.value)
+        if self.commandSet is not None:
+            return self.CachedResponse(self.commandSet.CommandList())
+        #The DLL's GetCommandList is not told the buffer size. A list that fills the buffer is read
+        #again into a larger one, and that size is used from then on.
+        return self.ReadBuffer(lambda buf, size: self.dll.GetCommandList(buf), size=self.MAX_STREAM_BUFF_SIZE,
+                               key='GetCommandList')
 
     def GetNumberOfOutputsDesc(self, commandParameters):
-        self.cppdll.GetNumberOfOutputsDesc.argtypes = [c_char_p]
-        self.cppdll.GetNumberOfOutputsDesc.restype = c_int
-        return self.cppdll.GetNumberOfOutputsDesc(self.enc(commandParameters))
+        if self.commandSet is not None and commandParameters in self.commandSet.byName:
+            return self.commandSet.byName[commandParameters].numberOfOutputs
+        return self.dll.GetNumberOfOutputsDesc(self.enc(commandParameters))
 
     def GetNumberOfParametersDesc(self, commandParameters):
-        self.cppdll.GetNumberOfParametersDesc.argtypes = [c_char_p]
-        self.cppdll.GetNumberOfParametersDesc.restype = c_int
-        return self.cppdll.GetNumberOfParametersDesc(self.enc(commandParameters))
+        if self.commandSet is not None and commandParameters in self.commandSet.byName:
+            return self.commandSet.byName[commandParameters].numberOfParameters
+        return self.dll.GetNumberOfParametersDesc(self.enc(commandParameters))
 
     def GetCommandLetterFromDescriptive(self, commandParameters):
-        outputBuffer = create_string_buffer(self.MAX_BUFSIZE)
-        self.cppdll.GetCommandLetterFromDescriptive.argtypes = [c_char_p, c_char_p, c_int]
-        self.cppdll.GetCommandLetterFromDescriptive(self.enc(commandParameters), outputBuffer, len(outputBuffer))
-        return self.Buffer2String(outputBuffer.value)
+        if self.commandSet is not None and commandParameters in self.commandSet.byName:
+            return self.CachedResponse(self.commandSet.byName[commandParameters].letter)
+        return self.ReadBuffer(self.dll.GetCommandLetterFromDescriptive, self.enc(commandParameters))
 
     def GetParameterList(self, commandParameters):
-        outputBuffer = create_string_buffer(self.MAX_BUFSIZE)
-        self.cppdll.GetParameterList.argtypes = [c_char_p, c_char_p, c_int]
-        self.cppdll.GetParameterList(self.enc(commandParameters), outputBuffer, len(outputBuffer))
-        return self.Buffer2String(outputBuffer.value)
+        if self.commandSet is not None and commandParameters in self.commandSet.byLetter:
+            return self.CachedResponse(self.commandSet.byLetter[commandParameters].ParameterList())
+        return self.ReadBuffer(self.dll.GetParameterList, self.enc(commandParameters))
 
     def GetOutputFieldList(self, commandParameters):
-        outputBuffer = create_string_buffer(self.MAX_BUFSIZE)
-        self.cppdll.GetOutputFieldList.argtypes = [c_char_p, c_char_p, c_int]
-        self.cppdll.GetOutputFieldList(self.enc(commandParameters), outputBuffer, len(outputBuffer))
-        return self.Buffer2String(outputBuffer.value)
+        if self.commandSet is not None and commandParameters in self.commandSet.byLetter:
+            return self.CachedResponse(self.commandSet.byLetter[commandParameters].OutputFieldList())
+        return self.ReadBuffer(self.dll.GetOutputFieldList, self.enc(commandParameters))
 
 #endregion
\ No newline at end of file
@@ -0,0 +1,230 @@
+# Name:           IDEADrvConfig.py
+# Environment:    Python 3.11
+# File Type:      Object class
+# Description:    Drive configuration snapshots for commissioning. A ConfigSnapshot holds everything the
+#                 configuration getters return (encoder, hall sensor, motor type and parameters, control
+#                 reference, gains, fault limits, startup program) and saves to / loads from JSON.
+#                 PushSnapshot compares a target snapshot with the drive's current one and sends only the
+#                 setters whose values differ, as one batch (see IDEADrvBatch). FleetConfig does the same
+#                 for every drive of a DriveSession: snapshots are captured through the per-bus workers,
+#                 so buses are worked on side by side, and the last known state of each drive is kept so
+#                 a push does not have to read the drive first.
+
+import json
+import os
+import time
+
+from IDEADrvParser import ResponseBody, ToNumber
+
+CONFIG_FORMAT = 1
+
+class ConfigItem:
+    # One configuration getter and the setter(s) that write its values back. A getter whose values
+    # are written by several setters (GetFaultParameters) is split by each setter's parameter count.
+    # setters: (IDEADrv method, descriptive command name) pairs; the command set and the DLL know a
+    # command by its descriptive name, not by the Python method that sends it.
+    __slots__ = ('name', 'getter', 'setters', 'descriptions')
+
+    def __init__(self, name, getter, setters):
+        self.name = name
+        self.getter = getter
+        self.setters = tuple(setter for setter, _ in setters)
+        self.descriptions = dict(setters)
+
+    def __repr__(self):
+        return "ConfigItem(" + repr(self.name) + ")"
+
+    def Read(self, drive):
+        body = ResponseBody(getattr(drive, self.getter)())
+        return body.split(",") if body else []
+
+    def Writes(self, drive, values):
+        # [(setter, parameter string)] that write values to drive
+        if len(self.setters) == 1:
+            return [(self.setters[0], ",".join(values))]
+        writes = []
+        start = 0
+        for setter in self.setters:
+            count = SetterParameterCount(drive, self.descriptions[setter])
+            writes.append((setter, ",".join(values[start:start + count])))
+            start += count
+        if start != len(values):
+            raise ValueError(self.name + ": setter parameter counts do not match the " +
+                             str(len(values)) + " values returned by " + self.getter)
+        return writes
+
+CONFIG_ITEMS = (
+    ConfigItem('EncoderConfiguration', 'GetEncoderConfiguration',
+               (('SetEncoderConfiguration', 'Set Encoder Configuration'),)),
+    ConfigItem('HallSensorConfiguration', 'GetHallSensorConfiguration',
+               (('SetHallSensorConfiguration', 'Set Hall Sensor Configuration'),)),
+    ConfigItem('MotorType', 'GetMotorType', (('SetMotorType', 'Set Motor Type'),)),
+    ConfigItem('MotorParameters', 'GetMotorParameters', (('SetMotorParameters', 'Set Motor Parameters'),)),
+    ConfigItem('ControlReference', 'GetControlReference',
+               (('SetControlReferenceConfiguration', 'Set Control Reference Configuration'),)),
+    ConfigItem('ControlGain', 'GetControlGain', (('SetControlGains', 'Set Control Gains'),)),
+    ConfigItem('FaultParameters', 'GetFaultParameters',
+               (('SetPositionLimitFault', 'Set Position Limit Fault'),
+                ('SetCurrentLimitDurationFault', 'Set Current Limit Duration Fault'),
+                ('SetPositionErrorFault', 'Set Position Error Fault'))),
+    ConfigItem('StartupProgram', 'GetStartupProgramName', (('SetStartupProgram', 'Set Startup Program'),)),
+)
+
+def SetterParameterCount(drive, description):
+    # Number of parameters of a setter, by its descriptive command name, from the loaded command set
+    # or the DLL
+    if drive.commandSet is not None:
+        info = drive.commandSet.Info(description)
+        if info is not None:
+            return info.numberOfParameters
+    return drive.GetNumberOfParametersDesc(description)
+
+def SameValues(a, b):
+    # "1000" and "1000.0" are the same setting; bit patterns ("0101") compare as text
+    return len(a) == len(b) and all(ToNumber(x) == ToNumber(y) for x, y in zip(a, b))
+
+class ConfigSnapshot:
+    def __init__(self, values=None, port=None, address=None, firmware=None, capturedAt=None):
+        self.values = dict(values or {})        # item name -> [value strings]
+        self.port = port
+        self.address = address
+        self.firmware = firmware
+        self.capturedAt = capturedAt
+
+    def __repr__(self):
+        return "ConfigSnapshot(%r, %r, %d items)" % (self.port, self.address, len(self.values))
+
+    def __eq__(self, other):
+        if not isinstance(other, ConfigSnapshot):
+            return NotImplemented
+        return not Diff(self, other) and not Diff(other, self)
+
+    def ToDict(self):
+        return {'format': CONFIG_FORMAT, 'port': self.port, 'address': self.address,
+                'firmware': self.firmware, 'capturedAt': self.capturedAt,
+                'values': {name: list(values) for name, values in self.values.items()}}
+
+    @classmethod
+    def FromDict(cls, document):
+        if document.get('format') != CONFIG_FORMAT:
+            raise ValueError("unsupported configuration format " + repr(document.get('format')))
+        return cls(document.get('values'), document.get('port'), document.get('address'),
+                   document.get('firmware'), document.get('capturedAt'))
+
+    def Save(self, path):
+        _WriteJSON(path, self.ToDict())
+
+    @classmethod
+    def Load(cls, path):
+        with open(path) as f:
+            return cls.FromDict(json.load(f))
+
+def _WriteJSON(path, document):
+    tmpPath = path + ".tmp"
+    with open(tmpPath, 'w') as f:
+        json.dump(document, f, indent=1)
+    os.replace(tmpPath, path)
+
+def CaptureSnapshot(drive, items=CONFIG_ITEMS):
+    # Reads every item from drive at its own address, nothing else interleaved
+    with drive.Transaction(drive.IDriveAddress):
+        values = {item.name: item.Read(drive) for item in items}
+        firmware = drive.GetFirmwareVersion()
+    if not isinstance(firmware, str):
+        firmware = drive.Buffer2String(firmware)
+    return ConfigSnapshot(values, drive.serialPort, drive.IDriveAddress, firmware.strip(), time.time())
+
+def Diff(current, target, items=CONFIG_ITEMS):
+    # Names of the items whose target values differ from (or are missing in) current
+    changed = []
+    for item in items:
+        if item.name not in target.values:
+            continue
+        values = current.values.get(item.name) if current is not None else None
+        if values is None or not SameValues(values, target.values[item.name]):
+            changed.append(item.name)
+    return changed
+
+def PushSnapshot(drive, target, current=None, items=CONFIG_ITEMS, stopOnError=False):
+    # Sends the setters of the items that differ between current (read from the drive if not given)
+    # and target. Returns (BatchResult list, snapshot of the drive after the push).
+    if current is None:
+        current = CaptureSnapshot(drive, items)
+    changed = set(Diff(current, target, items))
+    entries = []
+    owners = []
+    for item in items:
+        if item.name in changed:
+            for setter, params in item.Writes(drive, target.values[item.name]):
+                entries.append((setter, params))
+                owners.append(item.name)
+    results = drive.RunBatch(entries, stopOnError) if entries else []
+    failed = set()
+    stopped = False
+    for owner, result in zip(owners, results):
+        #A setter returns False when the drive did not take the command; with stopOnError the
+        #entries after the first failure were not sent
+        if stopped or not result.Ok() or result.response is not True:
+            failed.add(owner)
+            stopped = stopped or stopOnError
+    values = dict(current.values)
+    for name in changed - failed:
+        values[name] = list(target.values[name])
+    return results, ConfigSnapshot(values, current.port, current.address, current.firmware, time.time())
+
+class FleetConfig:
+    def __init__(self, session, items=CONFIG_ITEMS):
+        self.session = session
+        self.items = items
+        self.snapshots = {}         # (port, address) -> last known ConfigSnapshot
+
+    def Keys(self, keys=None):
+        return sorted(self.session) if keys is None else list(keys)
+
+    def Capture(self, keys=None):
+        # Snapshots of the given drives (default: every drive in the session), captured on the
+        # per-bus workers so different buses are read side by side
+        futures = {key: self.session.Submit(key[0], key[1], CaptureSnapshot, self.items) for key in self.Keys(keys)}
+        snapshots = {key: future.result() for key, future in futures.items()}
+        self.snapshots.update(snapshots)
+        return snapshots
+
+    def Invalidate(self, key=None):
+        if key is None:
+            self.snapshots.clear()
+        else:
+            self.snapshots.pop(key, None)
+
+    def Diff(self, target, keys=None):
+        # (port, address) -> names of the items a push of target would write. target is one snapshot
+        # for every drive or a dict of per-drive snapshots.
+        return {key: Diff(self.snapshots.get(key), self._Target(target, key), self.items) for key in self.Keys(keys)}
+
+    def Push(self, target, keys=None, stopOnError=False):
+        # Writes target to the drives, sending only what differs from their last known state (drives
+        # without a cached snapshot are read first). Returns (port, address) -> BatchResult list.
+        futures = {}
+        for key in self.Keys(keys):
+            futures[key] = self.session.Submit(key[0], key[1], PushSnapshot, self._Target(target, key),
+                                               self.snapshots.get(key), self.items, stopOnError)
+        results = {}
+        for key, future in futures.items():
+            results[key], self.snapshots[key] = future.result()
+        return results
+
+    def _Target(self, target, key):
+        return target[key] if isinstance(target, dict) else target
+
+    def Save(self, path):
+        _WriteJSON(path, {'format': CONFIG_FORMAT,
+                          'drives': [snapshot.ToDict() for _, snapshot in sorted(self.snapshots.items())]})
+
+    @staticmethod
+    def Load(path):
+        # (port, address) -> ConfigSnapshot from a file written by Save
+        with open(path) as f:
+            document = json.load(f)
+        if document.get('format') != CONFIG_FORMAT:
+            raise ValueError("unsupported configuration format " + repr(document.get('format')))
+        snapshots = [ConfigSnapshot.FromDict(d) for d in document.get('drives', [])]
+        return {(s.port, s.address): s for s in snapshots}
@@ -0,0 +1,300 @@
+# Name:           IDEADrvCoordinated.py
+# Environment:    Python 3.11
+# File Type:      Object class
+# Description:    Coordinated start of moves on several drives of one RS485 bus. Sending SetCurrentAddress
+#                 and a move to each axis in turn skews the starts by the serial round trips in between,
+#                 so a CoordinatedMove does all the work up front and keeps the start itself as short as
+#                 the drives allow:
+#                   program  (arm then trigger) every axis gets its move as a small drive program, all
+#                            under one name derived from the hash of the whole move; one broadcast
+#                            ExecuteProgram then starts every axis from the same frame. Programs go
+#                            through one ProgramTransfer shared by all moves on the DLL, so re-arming
+#                            an unchanged move downloads nothing, and each move's programs are recalled
+#                            and checked before its trigger, so a move never fires another move's
+#                            programs. The oldest arm programs beyond ARM_PROGRAMS_KEPT per drive are
+#                            deleted.
+#                   trigger  the drives already hold programs waiting for a label or an input; one
+#                            broadcast RunToLabel or SetInputs (or any write command) releases them.
+#                   direct   SetCurrentAddress + move for each axis, pre-encoded and sent back to back
+#                            from a prebuilt list while the DLL lock is held.
+#                 "auto" arms programs and falls back to direct when a drive does not take them. Every
+#                 dispatch reports each axis's host-side send time and its skew from the first axis.
+#                 Axes on other buses are not covered: the DLL holds one open port.
+
+import time
+
+from IDEADrvProgram import Program, ProgramHash, ProgramTransfer
+
+DISPATCH_AUTO = "auto"
+DISPATCH_PROGRAM = "program"
+DISPATCH_TRIGGER = "trigger"
+DISPATCH_DIRECT = "direct"
+DISPATCH_MODES = (DISPATCH_AUTO, DISPATCH_PROGRAM, DISPATCH_TRIGGER, DISPATCH_DIRECT)
+#Descriptive names of the move commands; the command letters for the lines of the arm programs are
+#looked up by these in the drive's command set
+MOVE_COMMANDS = {"MoveToPosition": "Move To Position", "IndexDistance": "Index Distance", "GoAtSpeed": "Go At Speed"}
+ARM_PREFIX = "C"                # arm program names: prefix + the first ARM_HASH_LENGTH hex digits of the move hash
+ARM_HASH_LENGTH = 7
+ARM_PROGRAMS_KEPT = 4           # arm programs left on each drive, most recently armed first
+BROADCAST_ADDRESS = ""
+
+def SharedTransfer(drive):
+    # The ProgramTransfer of every CoordinatedMove on drive's DLL that is not given one. It is kept on
+    # the DLLPrototypes, like the arm program names of each drive, and its cache is keyed by port and
+    # address, so all moves on a drive see the same record of what that drive holds.
+    dll = drive.dll
+    with dll.lock:
+        if dll.programTransfer is None:
+            dll.programTransfer = ProgramTransfer()
+        return dll.programTransfer
+
+def MoveLetter(drive, command):
+    # Command letter of a move command, from the drive's command set or the DLL
+    letter = drive.GetCommandLetterFromDescriptive(MOVE_COMMANDS[command])
+    if not isinstance(letter, str):
+        letter = str(letter, 'UTF-8')
+    letter = letter.strip()
+    if len(letter) != 1:
+        raise ValueError("no command letter for " + MOVE_COMMANDS[command])
+    return letter
+
+def ArmProgramName(drive, axes):
+    # Same name for the same moves on the same drives, a different one for any other move
+    text = "\n".join(axis.address + " " + axis.ProgramLine(drive) for axis in axes)
+    return ARM_PREFIX + ProgramHash(text)[:ARM_HASH_LENGTH].upper()
+
+def AxisAddress(address):
+    # 7, "7" or "#7" -> "#007"
+    if isinstance(address, int):
+        return "#%03d" % address
+    text = str(address).lstrip("#")
+    if not text.isdigit():
+        raise ValueError("an axis needs a drive address, got " + repr(address))
+    return "#%03d" % int(text)
+
+class AxisMove:
+    __slots__ = ('address', 'command', 'params')
+
+    def __init__(self, address, params=None, command="MoveToPosition"):
+        # params may be None for axes whose move is already in a program on the drive (trigger mode)
+        if command not in MOVE_COMMANDS:
+            raise ValueError("Unknown move command: " + str(command))
+        self.address = AxisAddress(address)
+        self.command = command
+        self.params = params
+
+    def __repr__(self):
+        return "AxisMove(%r, %r, %r)" % (self.address, self.params, self.command)
+
+    def ProgramLine(self, drive):
+        return MoveLetter(drive, self.command) + self.params
+
+class AxisDispatch:
+    __slots__ = ('address', 'command', 'params', 'sentAt', 'skew', 'acknowledged', 'error')
+
+    def __init__(self, axis):
+        self.address = axis.address
+        self.command = axis.command
+        self.params = axis.params
+        self.sentAt = None          # host clock when the frame that starts this axis had been sent
+        self.skew = None            # sentAt - sentAt of the first axis, seconds
+        self.acknowledged = None    # the move call's success flag (direct mode; broadcasts get no reply)
+        self.error = None
+
+    def __repr__(self):
+        skew = "%.6fs" % self.skew if self.skew is not None else "not sent"
+        return "AxisDispatch(%r, skew %s%s)" % (self.address, skew, "" if self.error is None else ", " + repr(self.error))
+
+class DispatchResult:
+    __slots__ = ('mode', 'axes', 'startedAt', 'elapsed')
+
+    def __init__(self, mode, axes, startedAt):
+        self.mode = mode
+        self.axes = axes
+        self.startedAt = startedAt
+        self.elapsed = 0.0          # from the first frame sent to the last
+
+    def __repr__(self):
+        return "DispatchResult(%s, %d axes, max skew %.6fs)" % (self.mode, len(self.axes), self.MaxSkew())
+
+    def MaxSkew(self):
+        skews = [axis.skew for axis in self.axes if axis.skew is not None]
+        return max(skews) if skews else 0.0
+
+    def Skews(self):
+        return {axis.address: axis.skew for axis in self.axes}
+
+    def Ok(self):
+        return all(axis.error is None for axis in self.axes)
+
+    def Track(self, tracker, drive):
+        # MoveHandles (IDEADrvMotion.MoveTracker) for every axis that was started
+        handles = []
+        for axis in self.axes:
+            if axis.error is None:
+                with drive.Transaction(axis.address):
+                    handles.append(tracker.Track(drive, axis.command, axis.params or ""))
+        return handles
+
+class CoordinatedMove:
+    #trigger: (write command, parameters) broadcast to start the axes, by default ExecuteProgram of the
+    #arm program. Giving one without arming (mode "trigger") releases programs already on the drives.
+    #programName defaults to ArmProgramName of the axes, transfer to SharedTransfer(drive).
+    def __init__(self, drive, axes, mode=DISPATCH_AUTO, trigger=None, programName=None,
+                 transfer=None, clock=time.perf_counter):
+        if mode not in DISPATCH_MODES:
+            raise ValueError("Unknown dispatch mode: " + str(mode))
+        self.drive = drive
+        self.axes = [axis if isinstance(axis, AxisMove) else AxisMove(*axis) for axis in axes]
+        addresses = [axis.address for axis in self.axes]
+        if not addresses or len(set(addresses)) != len(addresses):
+            raise ValueError("a coordinated move needs at least one axis and distinct addresses")
+        if mode == DISPATCH_TRIGGER and trigger is None:
+            raise ValueError("trigger mode needs a trigger command")
+        if mode != DISPATCH_TRIGGER and any(axis.params is None for axis in self.axes):
+            raise ValueError(mode + " mode needs the move parameters of every axis")
+        self.mode = mode
+        if programName is None and mode != DISPATCH_TRIGGER:
+            programName = ArmProgramName(drive, self.axes)
+        self.programName = programName
+        self.trigger = trigger or ("ExecuteProgram", programName)
+        self.transfer = transfer if transfer is not None else SharedTransfer(drive)
+        self.clock = clock
+        self.armed = None           # mode the move is armed for
+        self.armResults = {}        # address -> TransferResult of the arm program
+        self.programs = {}          # address -> arm Program
+        self._frames = None
+
+    def __repr__(self):
+        return "CoordinatedMove(%d axes, %s)" % (len(self.axes), self.armed or "not armed")
+
+    def _Encode(self, params):
+        params = params or ""
+        return self.drive.enc(params), len(params)
+
+    def _ArmPrograms(self):
+        # True if every axis now holds its move as the arm program
+        self.armResults = {}
+        for axis in self.axes:
+            program = self.programs[axis.address] = Program(self.programName, axis.ProgramLine(self.drive))
+            with self.drive.Transaction(axis.address):
+                result = self.transfer.Download(self.drive, program)
+                if result.Ok():
+                    self._Keep(axis.address)
+            self.armResults[axis.address] = result
+            if not result.Ok():
+                return False
+        return True
+
+    def _Keep(self, address):
+        # Records this move's program on the drive at address (selected) and deletes the oldest arm
+        # programs beyond ARM_PROGRAMS_KEPT; a move whose program was deleted is re-armed by Dispatch
+        key = self.drive.serialPort + "|" + address
+        dll = self.drive.dll
+        with dll.lock:
+            names = dll.armedPrograms.setdefault(key, [])
+            if self.programName in names:
+                names.remove(self.programName)
+            names.append(self.programName)
+            stale = names[:-ARM_PROGRAMS_KEPT]
+            del names[:-ARM_PROGRAMS_KEPT]
+        for name in stale:
+            self.transfer.Delete(self.drive, name)
+
+    def _Verify(self):
+        # True if every axis still holds this move's arm program (recalled, not taken from the cache)
+        for axis in self.axes:
+            with self.drive.Transaction(axis.address):
+                if not self.transfer.Verify(self.drive, self.programs[axis.address]):
+                    return False
+        return True
+
+    #Does everything that is not time critical: arm programs (program/auto), then pre-encode every
+    #frame of the dispatch. Returns self so Arm() can be chained.
+    def Arm(self):
+        mode = self.mode
+        if mode in (DISPATCH_PROGRAM, DISPATCH_AUTO):
+            if self._ArmPrograms():
+                mode = DISPATCH_PROGRAM
+            elif mode == DISPATCH_PROGRAM:
+                failed = [a for a, r in self.armResults.items() if not r.Ok()]
+                raise RuntimeError("arming failed on " + ", ".join(failed) + ": " + repr(self.armResults[failed[0]].error))
+            else:
+                mode = DISPATCH_DIRECT
+        dll = self.drive.dll
+        if mode == DISPATCH_DIRECT:
+            self._frames = [(dll.SetCurrentAddress,) + self._Encode(axis.address) +
+                            (getattr(dll, axis.command),) + self._Encode(axis.params)
+                            for axis in self.axes]
+        else:
+            command, params = self.trigger
+            self._frames = (dll.SetCurrentAddress,) + self._Encode(BROADCAST_ADDRESS) + \
+                           (getattr(dll, command),) + self._Encode(params)
+        self.armed = mode
+        return self
+
+    def Dispatch(self, verify=True):
+        # Starts every axis; arms first if Arm() was not called. In program mode the arm programs are
+        # checked first (verify) and downloaded again when another move or client replaced them.
+        # Returns a DispatchResult.
+        if self.armed is None:
+            self.Arm()
+        elif self.armed == DISPATCH_PROGRAM and verify and not self._Verify():
+            self.Arm()
+        if self.armed == DISPATCH_DIRECT:
+            return self._DispatchDirect()
+        return self._DispatchTrigger()
+
+    def _DispatchDirect(self):
+        drive = self.drive
+        clock = self.clock
+        frames = self._frames
+        sent = []
+        acknowledged = []
+        errors = {}
+        with drive.dll.lock:
+            previous = drive.IDriveAddress
+            startedAt = clock()
+            #Nothing but the two DLL calls per axis between the frames
+            for index, (setAddress, address, addressLength, move, params, paramsLength) in enumerate(frames):
+                try:
+                    setAddress(address, addressLength)
+                    acknowledged.append(move(params, paramsLength))
+                except Exception as e:
+                    acknowledged.append(None)
+                    errors[index] = e
+                sent.append(clock())
+            drive.dll.currentAddress = self.axes[-1].address
+            drive.SetCurrentAddress(previous)
+        result = self._Result(DISPATCH_DIRECT, startedAt, sent, errors)
+        for axis, success in zip(result.axes, acknowledged):
+            axis.acknowledged = success
+        return result
+
+    def _DispatchTrigger(self):
+        drive = self.drive
+        clock = self.clock
+        setAddress, address, addressLength, trigger, params, paramsLength = self._frames
+        errors = {}
+        with drive.dll.lock:
+            previous = drive.IDriveAddress
+            setAddress(address, addressLength)
+            drive.dll.currentAddress = BROADCAST_ADDRESS
+            startedAt = clock()
+            try:
+                trigger(params, paramsLength)
+            except Exception as e:
+                errors = dict.fromkeys(range(len(self.axes)), e)
+            done = clock()
+            drive.SetCurrentAddress(previous)
+        #One broadcast frame starts every axis
+        return self._Result(self.armed, startedAt, [done] * len(self.axes), errors)
+
+    def _Result(self, mode, startedAt, sent, errors):
+        result = DispatchResult(mode, [AxisDispatch(axis) for axis in self.axes], startedAt)
+        for index, (axis, sentAt) in enumerate(zip(result.axes, sent)):
+            axis.sentAt = sentAt
+            axis.skew = sentAt - sent[0]
+            axis.error = errors.get(index)
+        result.elapsed = sent[-1] - startedAt
+        return result
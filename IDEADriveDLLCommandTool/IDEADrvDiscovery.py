@@ -0,0 +1,232 @@
+# Name:           IDEADrvDiscovery.py
+# Environment:    Python 3.11
+# File Type:      Object class
+# Description:    Finds serial ports and IDEA Drives. Ports are probed concurrently on a thread pool with
+#                 a per-port timeout and reported as soon as each one answers. Drives on each found port
+#                 are then scanned through an IDEADrv (one port at a time, since the DLL holds a single
+#                 open serial port) and streamed back as (port, address, firmware version) results.
+#                 Port and drive results are cached for a TTL so rescans only probe ports that are new
+#                 or whose cached result has expired. The ports found last can be saved to a file
+#                 (SavePortList) so the next start shows them at once and only re-checks those. The port
+#                 lister and opener can be replaced, so the engine can be exercised against simulated
+#                 serial ports.
+
+import glob
+import json
+import math
+import os
+import sys
+import threading
+import time
+
+NUMBER_OF_ADDRESSES = 256
+
+def CandidatePorts():
+    # Every port name worth trying on this platform (same list the command tool used to brute force)
+    try:
+        from serial.tools import list_ports
+        return sorted(p.device for p in list_ports.comports())
+    except ImportError:
+        pass
+    if sys.platform.startswith('win'):
+        return ['COM%s' % (i + 1) for i in range(NUMBER_OF_ADDRESSES)]
+    elif sys.platform.startswith('linux') or sys.platform.startswith('cygwin'):
+        # this excludes your current terminal "/dev/tty"
+        return glob.glob('/dev/tty[A-Za-z]*')
+    elif sys.platform.startswith('darwin'):
+        return glob.glob('/dev/tty.*')
+    else:
+        raise EnvironmentError('Unsupported platform')
+
+def OpenAndClosePort(port, timeout):
+    import serial
+    try:
+        s = serial.Serial(port, timeout=timeout, write_timeout=timeout)
+        s.close()
+        return True
+    except (OSError, serial.SerialException):
+        return False
+
+def LoadPortList(path):
+    # Ports saved by SavePortList, [] if the file is missing or unreadable
+    try:
+        with open(path) as f:
+            ports = json.load(f).get('ports', [])
+    except (OSError, ValueError, AttributeError):
+        return []
+    return [port for port in ports if isinstance(port, str)]
+
+def SavePortList(path, ports):
+    tmpPath = path + ".tmp"
+    with open(tmpPath, 'w') as f:
+        json.dump({'ports': sorted(ports), 'saved': time.time()}, f)
+    os.replace(tmpPath, path)
+
+def AddressString(address):
+    # 7 -> "#007", the form SetCurrentAddress expects
+    return "#%03d" % address
+
+class DiscoveryResult:
+    __slots__ = ('port', 'address', 'firmware')
+
+    def __init__(self, port, address, firmware):
+        self.port = port
+        self.address = address
+        self.firmware = firmware
+
+    def __repr__(self):
+        return "DiscoveryResult(%r, %r, %r)" % (self.port, self.address, self.firmware)
+
+    def __eq__(self, other):
+        if not isinstance(other, DiscoveryResult):
+            return NotImplemented
+        return (self.port, self.address, self.firmware) == (other.port, other.address, other.firmware)
+
+class DriveDiscovery:
+    def __init__(self, drive=None, maxWorkers=16, portTimeout=0.5, ttl=30.0,
+                 portLister=CandidatePorts, portOpener=OpenAndClosePort, clock=time.monotonic):
+        self.drive = drive
+        self.maxWorkers = maxWorkers
+        self.portTimeout = portTimeout
+        self.ttl = ttl
+        self.portLister = portLister
+        self.portOpener = portOpener
+        self.clock = clock
+        self.portCache = {}         # port -> (checkedAt, available)
+        self.driveCache = {}        # port -> (checkedAt, [DiscoveryResult])
+        self.cacheLock = threading.Lock()
+        self.driveLock = threading.Lock()
+
+    def _Fresh(self, entry):
+        return entry is not None and self.clock() - entry[0] < self.ttl
+
+    def Invalidate(self, port=None):
+        with self.cacheLock:
+            if port is None:
+                self.portCache.clear()
+                self.driveCache.clear()
+            else:
+                self.portCache.pop(port, None)
+                self.driveCache.pop(port, None)
+
+    def _ProbePort(self, port):
+        start = self.clock()
+        try:
+            available = bool(self.portOpener(port, self.portTimeout))
+        except Exception:
+            available = False
+        #A port that took longer than its timeout to open is treated as unusable
+        if self.clock() - start > self.portTimeout:
+            available = False
+        with self.cacheLock:
+            self.portCache[port] = (self.clock(), available)
+        return available
+
+    #Yields available port names as they are confirmed. Fresh cached results are yielded first,
+    #the remaining ports are probed concurrently. candidates limits the scan to those ports
+    #(e.g. the ones from LoadPortList) instead of every port the lister returns.
+    def ScanPorts(self, force=False, candidates=None):
+        listed = candidates is None
+        candidates = list(self.portLister()) if listed else list(candidates)
+        toProbe = []
+        with self.cacheLock:
+            for port in list(self.portCache):
+                if listed and port not in candidates:
+                    self.portCache.pop(port, None)
+                    self.driveCache.pop(port, None)
+            cached = {port: self.portCache.get(port) for port in candidates}
+        for port in candidates:
+            entry = cached[port]
+            if not force and self._Fresh(entry):
+                if entry[1]:
+                    yield port
+            else:
+                toProbe.append(port)
+        if not toProbe:
+            return
+        import concurrent.futures
+        import queue
+        workers = max(1, min(self.maxWorkers, len(toProbe)))
+        waves = math.ceil(len(toProbe) / workers)
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="IDEADrvPortProbe")
+        #Probes report into a queue as they finish, so the time the caller spends on each yielded port
+        #neither delays nor drops the probes that finish meanwhile. The deadline only gives up on probes
+        #still running when it passes; everything already finished is still yielded.
+        finished = queue.Queue()
+        futures = {}
+        try:
+            for port in toProbe:
+                future = executor.submit(self._ProbePort, port)
+                futures[future] = port
+                future.add_done_callback(finished.put)
+            deadline = time.monotonic() + self.portTimeout * waves + 0.05
+            for _ in range(len(futures)):
+                try:
+                    future = finished.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                port = futures.pop(future)
+                if future.result():
+                    yield port
+            #Hung ports are remembered as unavailable until the TTL runs out
+            with self.cacheLock:
+                for future, port in futures.items():
+                    if not future.done():
+                        self.portCache[port] = (self.clock(), False)
+            for future, port in futures.items():
+                if future.done() and future.result():
+                    yield port
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def AvailablePorts(self, force=False):
+        return sorted(self.ScanPorts(force))
+
+    def ProbeDrives(self, port):
+        # Scans one port for drives through the shared IDEADrv. Serialized, the DLL has one open port.
+        results = []
+        if self.drive is None:
+            return results
+        with self.driveLock:
+            drive = self.drive
+            previousPort = drive.serialPort
+            previousAddress = drive.IDriveAddress
+            wasOpen = drive.IsSerialOpen()
+            drive.CloseComms()
+            drive.SetActivePort(port)
+            drive.OpenComms()
+            try:
+                if drive.IsSerialOpen():
+                    addressList = drive.GetAllAvailableAddresses()
+                    for address in range(len(addressList)):
+                        if addressList[address]:
+                            drive.SetCurrentAddress(AddressString(address))
+                            firmware = drive.GetFirmwareVersion()
+                            if not isinstance(firmware, str):
+                                firmware = drive.Buffer2String(firmware)
+                            results.append(DiscoveryResult(port, address, firmware))
+            finally:
+                drive.CloseComms()
+                drive.SetActivePort(previousPort)
+                drive.SetCurrentAddress(previousAddress)
+                if wasOpen:
+                    drive.OpenComms()
+        with self.cacheLock:
+            self.driveCache[port] = (self.clock(), results)
+        return results
+
+    #Yields a DiscoveryResult for every drive found. Drive scans of a port start as soon as that port
+    #is confirmed while the remaining ports are still being probed.
+    def Discover(self, force=False):
+        for port in self.ScanPorts(force):
+            with self.cacheLock:
+                entry = self.driveCache.get(port)
+            if not force and self._Fresh(entry):
+                results = entry[1]
+            else:
+                results = self.ProbeDrives(port)
+            for result in results:
+                yield result
+
+    def DiscoverAll(self, force=False):
+        return list(self.Discover(force))
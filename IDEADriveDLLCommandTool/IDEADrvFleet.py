@@ -0,0 +1,533 @@
+# Name:           IDEADrvFleet.py
+# Environment:    Python 3.11
+# File Type:      Object class
+# Description:    Multi-process execution for large drive fleets. The DLL keeps one open port and one
+#                 current address per process, so a DriveFleet starts worker processes that each load
+#                 their own copy of the DLL and own one or more serial ports (a DriveSession inside every
+#                 worker). The coordinator routes every call to the worker owning its port and returns a
+#                 concurrent.futures.Future; calls to different workers run truly in parallel, and the
+#                 Python side of each call (encoding, parsing) runs in the worker process too.
+#
+#                 Telemetry: workers poll their drives and write the parsed values into rings in shared
+#                 memory (one block per worker, created by the coordinator so it outlives worker
+#                 restarts), which the coordinator reads without any messages or copies of whole rows.
+#
+#                 Supervision: a monitor thread restarts a worker whose process died, whose heartbeat
+#                 stopped, or whose call in progress has run longer than callTimeout (a hung DLL call or
+#                 serial port; time a call spent queued behind others does not count). The calls it
+#                 still had fail with WorkerRestartedError; telemetry is resumed.
+
+import concurrent.futures
+import itertools
+import math
+import multiprocessing
+import os
+import threading
+import time
+from multiprocessing import shared_memory
+
+from IDEADrvParser import ResponseValues
+from IDEADrvSession import DriveSession, NormalizeAddress
+from IDEADrvTelemetry import DEFAULT_GETTERS, SampleValue
+
+TELEMETRY_CHANNELS = 16         # values kept per telemetry row (NaN padded)
+TELEMETRY_CAPACITY = 4096       # rows per drive ring
+WORKER_HEADER = 4               # int64 per worker block: pid, heartbeat (monotonic ns), telemetry cycles,
+                                # start of the call in progress (monotonic ns, 0 when idle)
+SLOT_HEADER = 4                 # int64 per drive ring: rows written, dropped, errors, channels used
+HEARTBEAT_INTERVAL = 0.1        # seconds
+DEFAULT_CALL_TIMEOUT = 30.0
+DEFAULT_HEARTBEAT_TIMEOUT = 5.0
+STARTUP_TIMEOUT = 30.0          # seconds a new worker has to send its first heartbeat
+MONITOR_INTERVAL = 0.1
+
+class FleetError(Exception):
+    pass
+
+class FleetCallError(FleetError):
+    # An exception raised by a call inside a worker; the original type name and text are kept
+    def __init__(self, port, address, method, remoteType, message):
+        self.port = port
+        self.address = address
+        self.method = method
+        self.remoteType = remoteType
+        self.remoteMessage = message
+        FleetError.__init__(self, "%s on %s %s: %s: %s" % (method, port, address or "(broadcast)", remoteType, message))
+
+class FleetClosedError(FleetError):
+    # A call submitted after DriveFleet.Close
+    def __init__(self, port, address, method):
+        self.port = port
+        self.address = address
+        self.method = method
+        FleetError.__init__(self, "%s on %s %s: the fleet is closed" % (method, port, address or "(broadcast)"))
+
+class WorkerRestartedError(FleetError):
+    # The worker running a call was restarted ("died", "hung" or "heartbeat") before it answered
+    def __init__(self, port, address, method, reason):
+        self.port = port
+        self.address = address
+        self.method = method
+        self.reason = reason
+        FleetError.__init__(self, "%s on %s %s: worker %s and was restarted" % (
+            method, port, address or "(broadcast)", reason))
+
+def MethodName(method):
+    return method if isinstance(method, str) else getattr(method, '__name__', repr(method))
+
+#region Shared memory
+def _AttachSharedMemory(name):
+    # The coordinator owns and unlinks the block. Workers share the coordinator's resource tracker, so
+    # before Python 3.13 (no track argument) attaching only registers the same name again.
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+class TelemetryBlock:
+    # One worker's shared memory: the worker header, then for each drive a slot header and a ring of
+    # rows (timestamp, TELEMETRY_CHANNELS values). Created by the coordinator, attached by the worker.
+    def __init__(self, keys, capacity=TELEMETRY_CAPACITY, name=None):
+        self.keys = list(keys)
+        self.capacity = capacity
+        self.width = 1 + TELEMETRY_CHANNELS
+        self.slotSize = SLOT_HEADER + capacity * self.width
+        size = 8 * (WORKER_HEADER + len(self.keys) * self.slotSize)
+        if name is None:
+            self.memory = shared_memory.SharedMemory(create=True, size=size)
+            self.owner = True
+        else:
+            self.memory = _AttachSharedMemory(name)
+            self.owner = False
+        self.name = self.memory.name
+        self.ints = self.memory.buf.cast('q')
+        self.floats = self.memory.buf.cast('d')         # new shared memory is zero filled
+
+    def Ring(self, key):
+        return SharedRing(self, self.keys.index(key))
+
+    def Heartbeat(self):
+        return self.ints[1]
+
+    def CallStartedAt(self):
+        return self.ints[3]
+
+    def Close(self):
+        self.ints.release()
+        self.floats.release()
+        self.memory.close()
+        if self.owner:
+            try:
+                self.memory.unlink()
+            except FileNotFoundError:
+                pass
+
+class SharedRing:
+    # Telemetry ring of one drive inside a TelemetryBlock. The worker writes a row, then publishes it
+    # by advancing the row counter; readers check the counter again afterwards and drop rows that the
+    # writer may have overwritten meanwhile.
+    def __init__(self, block, index):
+        self.block = block
+        self.header = WORKER_HEADER + index * block.slotSize
+        self.data = self.header + SLOT_HEADER
+        self.capacity = block.capacity
+        self.width = block.width
+        self.channels = ()          # names, filled in by the coordinator
+
+    def Total(self):
+        return self.block.ints[self.header]
+
+    def Append(self, timestamp, values):
+        ints = self.block.ints
+        floats = self.block.floats
+        total = ints[self.header]
+        row = self.data + (total % self.capacity) * self.width
+        floats[row] = timestamp
+        count = min(len(values), TELEMETRY_CHANNELS)
+        for i in range(count):
+            floats[row + 1 + i] = values[i]
+        for i in range(count, TELEMETRY_CHANNELS):
+            floats[row + 1 + i] = math.nan
+        ints[self.header + 3] = count
+        ints[self.header] = total + 1
+
+    def Count(self, slot, amount=1):
+        # slot 1: dropped samples, 2: errors
+        self.block.ints[self.header + slot] += amount
+
+    def RowsSince(self, total):
+        # Rows (timestamp, values...) written after the first `total` rows, and the new total
+        floats = self.block.floats
+        newTotal = self.Total()
+        first = max(total, newTotal - self.capacity + 1)
+        used = self.block.ints[self.header + 3] or TELEMETRY_CHANNELS
+        rows = []
+        for n in range(first, newTotal):
+            row = self.data + (n % self.capacity) * self.width
+            rows.append(tuple(floats[row:row + 1 + used]))
+        overwritten = self.Total() - self.capacity + 1 - first
+        if overwritten > 0:
+            rows = rows[overwritten:]
+        return rows, newTotal
+
+    def Latest(self, n=1):
+        total = self.Total()
+        return self.RowsSince(max(0, total - n))[0]
+
+    def Stats(self):
+        ints = self.block.ints
+        return {'samples': ints[self.header], 'dropped': ints[self.header + 1], 'errors': ints[self.header + 2],
+                'channels': self.channels}
+#endregion
+
+#region Worker process
+def _ReadTelemetry(drive, getters):
+    responses = [getattr(drive, getter)() for getter in getters]
+    names = []
+    values = []
+    for getter, response in zip(getters, responses):
+        parsed = ResponseValues(response) or [math.nan]
+        names.extend(getter + "." + str(i) for i in range(len(parsed)))
+        values.extend(SampleValue(v) for v in parsed)
+    return names, values
+
+class _WorkerTelemetry:
+    # Telemetry thread of a worker: reads every drive of the worker once per cycle at rate cycles/s
+    def __init__(self, session, block, send, getters, rate):
+        self.session = session
+        self.block = block
+        self.send = send
+        self.getters = tuple(getters)
+        self.rate = rate
+        self.stop = threading.Event()
+        self.thread = threading.Thread(target=self._Run, name="IDEADrvFleetTelemetry", daemon=True)
+        self.thread.start()
+
+    def _Run(self):
+        rings = {key: self.block.Ring(key) for key in self.block.keys}
+        announced = set()
+        period = 1.0 / self.rate
+        nextCycle = time.perf_counter()
+        while not self.stop.is_set():
+            now = time.perf_counter()
+            if now < nextCycle:
+                self.stop.wait(nextCycle - now)
+                continue
+            missed = int((now - nextCycle) / period)
+            nextCycle += (missed + 1) * period
+            for key, ring in rings.items():
+                if missed:
+                    ring.Count(1, missed)
+                try:
+                    names, values = self.session.Call(key[0], key[1], _ReadTelemetry, self.getters)
+                except Exception:
+                    ring.Count(2)
+                    continue
+                ring.Append(time.time(), values)
+                if key not in announced:
+                    announced.add(key)
+                    self.send(("channels", key, names[:TELEMETRY_CHANNELS]))
+            self.block.ints[2] += 1
+
+def _WorkerMain(library, buses, blockName, capacity, conn):
+    # Entry point of a worker process. buses: [(port, addresses)]
+    if callable(library):
+        library = library()
+    keys = [(port, NormalizeAddress(address)) for port, addresses in buses for address in addresses]
+    block = TelemetryBlock(keys, capacity, blockName)
+    block.ints[0] = os.getpid()
+    session = DriveSession(library)
+    for port, address in keys:
+        session.AddDrive(port, address)
+    sendLock = threading.Lock()
+    stopped = threading.Event()
+    telemetry = None
+
+    def send(message):
+        with sendLock:
+            conn.send(message)
+
+    def heartbeat():
+        while not stopped.is_set():
+            block.ints[1] = time.monotonic_ns()
+            stopped.wait(HEARTBEAT_INTERVAL)
+
+    block.ints[1] = time.monotonic_ns()
+    threading.Thread(target=heartbeat, name="IDEADrvFleetHeartbeat", daemon=True).start()
+    send(("ready", os.getpid()))
+    try:
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                break
+            kind = message[0]
+            if kind == "call":
+                _, requestId, port, address, method, args = message
+                block.ints[3] = time.monotonic_ns()
+                try:
+                    result = session.Call(port, address, method, *args)
+                    if isinstance(result, memoryview):
+                        result = bytes(result)
+                    reply = ("result", requestId, True, result)
+                except Exception as e:
+                    reply = ("result", requestId, False, (type(e).__name__, str(e)))
+                finally:
+                    block.ints[3] = 0
+                send(reply)
+            elif kind == "telemetry":
+                if telemetry is not None:
+                    telemetry.stop.set()
+                    telemetry.thread.join()
+                    telemetry = None
+                getters, rate = message[1], message[2]
+                if rate:
+                    telemetry = _WorkerTelemetry(session, block, send, getters, rate)
+            elif kind == "stop":
+                break
+    finally:
+        stopped.set()
+        if telemetry is not None:
+            telemetry.stop.set()
+            telemetry.thread.join()
+        session.Close()
+        block.Close()
+        conn.close()
+#endregion
+
+#region Coordinator
+class FleetWorker:
+    # Coordinator side of one worker process
+    def __init__(self, index, buses, capacity):
+        self.index = index
+        self.buses = buses                  # [(port, addresses)]
+        self.keys = [(port, NormalizeAddress(a)) for port, addresses in buses for a in addresses]
+        self.block = TelemetryBlock(self.keys, capacity)
+        self.rings = {key: self.block.Ring(key) for key in self.keys}
+        self.process = None
+        self.conn = None
+        self.reader = None
+        self.pending = {}                   # request id -> (future, (port, address, method))
+        self.lock = threading.RLock()       # pending, conn and restarts
+        self.startedAt = 0.0
+        self.restarts = 0
+        self.lastRestartReason = None
+
+    def Ports(self):
+        return [port for port, _ in self.buses]
+
+class DriveFleet:
+    # buses: {port: addresses}. portsPerWorker ports share one worker process (and one DLL, which
+    # reopens the serial port whenever it switches between them). path may be a DLL path or a
+    # picklable callable returning the library (IDEADrvSimulator.SimulatedLibrary).
+    def __init__(self, path, buses, portsPerWorker=1, callTimeout=DEFAULT_CALL_TIMEOUT,
+                 heartbeatTimeout=DEFAULT_HEARTBEAT_TIMEOUT, telemetryCapacity=TELEMETRY_CAPACITY, context="spawn"):
+        self.DLL_Path = path
+        self.callTimeout = callTimeout
+        self.heartbeatTimeout = heartbeatTimeout
+        self.telemetryCapacity = telemetryCapacity
+        self.context = multiprocessing.get_context(context)
+        self.telemetry = None               # (getters, rate) while telemetry runs, resent after restarts
+        self.ids = itertools.count()
+        self.lock = threading.Lock()
+        self.closed = False
+        ports = sorted(buses)
+        self.workers = []
+        self.routes = {}                    # port -> FleetWorker
+        for index in range(0, len(ports), max(1, portsPerWorker)):
+            group = [(port, tuple(buses[port])) for port in ports[index:index + max(1, portsPerWorker)]]
+            worker = FleetWorker(len(self.workers), group, telemetryCapacity)
+            self.workers.append(worker)
+            for port, _ in group:
+                self.routes[port] = worker
+        for worker in self.workers:
+            self._Start(worker)
+        self._stopMonitor = threading.Event()
+        self.monitor = threading.Thread(target=self._Monitor, name="IDEADrvFleetMonitor", daemon=True)
+        self.monitor.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.Close()
+
+    def __iter__(self):
+        return iter([key for worker in self.workers for key in worker.keys])
+
+    def __len__(self):
+        return sum(len(worker.keys) for worker in self.workers)
+
+    def _Start(self, worker):
+        parentConn, childConn = self.context.Pipe()
+        worker.process = self.context.Process(
+            target=_WorkerMain, name="IDEADrvFleet-" + str(worker.index), daemon=True,
+            args=(self.DLL_Path, worker.buses, worker.block.name, self.telemetryCapacity, childConn))
+        worker.block.ints[1] = 0
+        worker.block.ints[3] = 0
+        worker.startedAt = time.monotonic()
+        worker.process.start()
+        childConn.close()
+        worker.conn = parentConn
+        worker.reader = threading.Thread(target=self._Read, args=(worker, parentConn),
+                                         name="IDEADrvFleetReader-" + str(worker.index), daemon=True)
+        worker.reader.start()
+        if self.telemetry is not None:
+            self._Send(worker, ("telemetry",) + self.telemetry)
+
+    def _Send(self, worker, message):
+        try:
+            with worker.lock:
+                worker.conn.send(message)
+        except (OSError, ValueError):
+            pass                            # the monitor restarts the worker and fails its calls
+
+    def _Read(self, worker, conn):
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                return
+            kind = message[0]
+            if kind == "result":
+                _, requestId, ok, value = message
+                with worker.lock:
+                    entry = worker.pending.pop(requestId, None)
+                if entry is None:
+                    continue
+                future, (port, address, method) = entry
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(FleetCallError(port, address, method, value[0], value[1]))
+            elif kind == "channels":
+                worker.rings[message[1]].channels = tuple(message[2])
+
+    def _Monitor(self):
+        while not self._stopMonitor.wait(MONITOR_INTERVAL):
+            now = time.monotonic()
+            for worker in self.workers:
+                reason = None
+                if not worker.process.is_alive():
+                    reason = "died"
+                else:
+                    #time.monotonic is the same system wide clock in every process
+                    callStartedAt = worker.block.CallStartedAt()
+                    heartbeat = worker.block.Heartbeat()
+                    if callStartedAt and now - callStartedAt / 1e9 > self.callTimeout:
+                        reason = "hung"
+                    elif heartbeat and now - heartbeat / 1e9 > self.heartbeatTimeout:
+                        reason = "heartbeat"
+                    elif not heartbeat and now - worker.startedAt > STARTUP_TIMEOUT:
+                        reason = "heartbeat"
+                if reason is not None:
+                    with self.lock:
+                        if not self.closed:
+                            self._Restart(worker, reason)
+
+    def _Restart(self, worker, reason):
+        # Holds the worker lock throughout, so no call is sent to the old process after its calls failed
+        with worker.lock:
+            process = worker.process
+            if process.is_alive():
+                process.kill()
+            process.join(5.0)
+            worker.conn.close()
+            pending, worker.pending = worker.pending, {}
+            for future, (port, address, method) in pending.values():
+                future.set_exception(WorkerRestartedError(port, address, method, reason))
+            worker.restarts += 1
+            worker.lastRestartReason = reason
+            self._Start(worker)
+
+    def Restart(self, port, reason="requested"):
+        # Restarts the worker owning port by hand
+        with self.lock:
+            self._Restart(self.routes[port], reason)
+
+    def Submit(self, port, address, method, *args):
+        # Runs drive.<method>(*args) (or method(drive, *args) for a picklable function) in the worker
+        # owning port and returns a Future. Raises FleetClosedError once Close has been called.
+        worker = self.routes[port]
+        address = NormalizeAddress(address)
+        future = concurrent.futures.Future()
+        future.set_running_or_notify_cancel()
+        requestId = next(self.ids)
+        with worker.lock:
+            #Close sets closed before it fails the pending calls under this lock, so a call is either
+            #refused here or failed by Close
+            if self.closed:
+                raise FleetClosedError(port, address, MethodName(method))
+            worker.pending[requestId] = (future, (port, address, MethodName(method)))
+            self._Send(worker, ("call", requestId, port, address, method, args))
+        return future
+
+    def Call(self, port, address, method, *args):
+        return self.Submit(port, address, method, *args).result()
+
+    def SendCommand(self, port, address, command):
+        return self.Call(port, address, "SendCommand", command)
+
+    def SubmitAll(self, method, *args):
+        return {key: self.Submit(key[0], key[1], method, *args) for key in self}
+
+    def Broadcast(self, method, *args):
+        # Runs method on every drive, all workers at once; exceptions are returned in place of results
+        futures = self.SubmitAll(method, *args)
+        results = {}
+        for key, future in futures.items():
+            try:
+                results[key] = future.result()
+            except Exception as e:
+                results[key] = e
+        return results
+
+    def StartTelemetry(self, getters=DEFAULT_GETTERS, rate=100.0):
+        # Every worker polls all of its drives rate times a second into shared memory
+        self.telemetry = (tuple(getters), rate)
+        for worker in self.workers:
+            self._Send(worker, ("telemetry",) + self.telemetry)
+
+    def StopTelemetry(self):
+        self.telemetry = None
+        for worker in self.workers:
+            self._Send(worker, ("telemetry", (), 0))
+
+    def Telemetry(self, port, address=""):
+        # The SharedRing of one drive: RowsSince(total), Latest(n), Stats(); channels is filled in
+        # once the first sample has arrived
+        return self.routes[port].rings[(port, NormalizeAddress(address))]
+
+    def Stats(self):
+        stats = []
+        for worker in self.workers:
+            with worker.lock:
+                pending = len(worker.pending)
+            stats.append({'ports': worker.Ports(), 'pid': worker.process.pid, 'alive': worker.process.is_alive(),
+                          'restarts': worker.restarts, 'lastRestartReason': worker.lastRestartReason,
+                          'pending': pending, 'telemetryCycles': worker.block.ints[2]})
+        return stats
+
+    def Close(self, timeout=5.0):
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+        self._stopMonitor.set()
+        self.monitor.join()
+        for worker in self.workers:
+            self._Send(worker, ("stop",))
+        for worker in self.workers:
+            worker.process.join(timeout)
+            if worker.process.is_alive():
+                worker.process.kill()
+                worker.process.join()
+            worker.conn.close()
+            worker.reader.join(timeout)
+            with worker.lock:
+                pending, worker.pending = worker.pending, {}
+            for future, (port, address, method) in pending.values():
+                future.set_exception(WorkerRestartedError(port, address, method, "closed"))
+            worker.rings.clear()
+            worker.block.Close()
+#endregion
@@ -0,0 +1,318 @@
+# Name:           IDEADrvLog.py
+# Environment:    Python 3.11
+# File Type:      Object class
+# Description:    Host side binary telemetry log (the drive's own EnableDataLogging is unrelated). A
+#                 TelemetryRecorder appends fixed size records to a file: timestamp, drive address and
+#                 one float64 per channel (position, velocity, I/O, faults... as parsed by a
+#                 TelemetryStreamer), after a header naming the channels. A TelemetryLog memory-maps
+#                 such a file and reads it in place: records, zero-copy channel columns, NumPy structured
+#                 views (when NumPy is installed) and binary searched time ranges, so logs of many
+#                 gigabytes are analysed without parsing text or loading them into memory.
+#
+#                 Layout (little endian): header "IDEATLOG", version, header size, record size, channel
+#                 count, JSON length, JSON {"channels": [...], ...}, zero padding to the header size;
+#                 then records (float64 timestamp, int32 address, int32 reserved, float64 x channels).
+#                 A record cut short by a crash is ignored.
+#
+#                 Time ranges are found by binary search, so records must be in timestamp order. Rows of
+#                 all followed streamers are merged by timestamp before they are written; rows appended
+#                 by hand must not be older than the records already in the log.
+
+import bisect
+import json
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+
+LOG_MAGIC = b"IDEATLOG"
+LOG_VERSION = 1
+LOG_HEADER = struct.Struct("<8sIIIII")
+HEADER_ALIGNMENT = 64
+RECORD_PREFIX = "<dii"          # timestamp, address, reserved
+RECORD_FIELDS = 2               # float64 sized words before the channel values
+BROADCAST_ADDRESS = -1
+FOLLOW_INTERVAL = 0.1           # seconds between appends of the followed streamers' new rows
+FOLLOW_LAG = 0.5                # seconds; a followed streamer's rows are held back until every other
+                                # streamer has sampled past them, or for at most this long
+
+def AddressNumber(address):
+    # "#007" or 7 -> 7, "" (broadcast/no address) -> BROADCAST_ADDRESS
+    if isinstance(address, int):
+        return address
+    address = str(address).lstrip("#")
+    return int(address) if address else BROADCAST_ADDRESS
+
+def RecordStruct(channelCount):
+    return struct.Struct(RECORD_PREFIX + "d" * channelCount)
+
+def ReadHeader(f):
+    # (channels, header size, record size, metadata) of an open log file
+    fixed = f.read(LOG_HEADER.size)
+    if len(fixed) < LOG_HEADER.size:
+        raise ValueError("not a telemetry log: file too short")
+    magic, version, headerSize, recordSize, channelCount, jsonLength = LOG_HEADER.unpack(fixed)
+    if magic != LOG_MAGIC:
+        raise ValueError("not a telemetry log: bad magic")
+    if version != LOG_VERSION:
+        raise ValueError("unsupported telemetry log version " + str(version))
+    metadata = json.loads(f.read(jsonLength).decode('UTF-8'))
+    channels = tuple(metadata['channels'])
+    if len(channels) != channelCount or recordSize != RecordStruct(channelCount).size:
+        raise ValueError("corrupt telemetry log header")
+    return channels, headerSize, recordSize, metadata
+
+class _Follower:
+    __slots__ = ('streamer', 'address', 'owned', 'total', 'last')
+
+    def __init__(self, streamer, address, owned):
+        self.streamer = streamer
+        self.address = AddressNumber(address)
+        self.owned = owned
+        self.total = 0              # ring rows taken so far
+        self.last = -math.inf       # timestamp of the newest row taken
+
+class TelemetryRecorder:
+    # Appends records to path. An existing log is appended to if its channels are the same.
+    def __init__(self, path, channels, metadata=None):
+        self.path = path
+        self.channels = tuple(channels)
+        self.record = RecordStruct(len(self.channels))
+        self.lock = threading.Lock()
+        self.followers = []         # _Follower per followed streamer
+        self.followLock = threading.Lock()
+        self.followThread = None
+        self.followStop = threading.Event()
+        self.records = 0
+        self.missed = 0             # followed rows overwritten in a streamer's ring before they were appended
+        self.late = 0               # followed rows older than rows already appended (a late Follow), dropped
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, 'rb') as f:
+                existing, headerSize, recordSize, _ = ReadHeader(f)
+            if existing != self.channels:
+                raise ValueError("log " + path + " has different channels")
+            self.file = open(path, 'r+b')
+            #Drop a record cut short by a crash so the next append stays aligned
+            size = os.path.getsize(path)
+            self.file.truncate(size - (size - headerSize) % recordSize)
+            self.file.seek(0, os.SEEK_END)
+        else:
+            self.file = open(path, 'wb')
+            document = dict(metadata or {})
+            document['channels'] = list(self.channels)
+            document.setdefault('created', time.time())
+            text = json.dumps(document).encode('UTF-8')
+            headerSize = -(-(LOG_HEADER.size + len(text)) // HEADER_ALIGNMENT) * HEADER_ALIGNMENT
+            header = LOG_HEADER.pack(LOG_MAGIC, LOG_VERSION, headerSize, self.record.size, len(self.channels), len(text))
+            self.file.write((header + text).ljust(headerSize, b"\0"))
+            self.file.flush()
+
+    def Append(self, timestamp, address, values):
+        data = self.record.pack(timestamp, AddressNumber(address), 0, *values)
+        with self.lock:
+            self.file.write(data)
+            self.records += 1
+
+    def AppendRows(self, address, rows):
+        # rows: (timestamp, values...) as kept by TelemetryRing, written in one go
+        address = AddressNumber(address)
+        pack = self.record.pack
+        data = b"".join(pack(row[0], address, 0, *row[1:]) for row in rows)
+        with self.lock:
+            self.file.write(data)
+            self.records += len(rows)
+
+    def Flush(self):
+        with self.lock:
+            self.file.flush()
+
+    #Records every row of a running TelemetryStreamer from its first sample on. With owned set the
+    #streamer is stopped when the recorder is closed. Rows of several followed streamers are written in
+    #timestamp order, so their streamers must share a timestamp clock (time.time by default).
+    def Follow(self, streamer, address, owned=False):
+        if tuple(streamer.ring.channels) != self.channels:
+            raise ValueError("streamer channels do not match the log")
+        with self.followLock:
+            self.followers.append(_Follower(streamer, address, owned))
+            if self.followThread is None:
+                self.followThread = threading.Thread(target=self._Follow, name="IDEADrvLogFollow", daemon=True)
+                self.followThread.start()
+        return self
+
+    def _Follow(self):
+        held = []                   # (timestamp, address, row) taken but not written yet
+        written = -math.inf         # timestamp of the newest row written
+        while True:
+            stopping = self.followStop.wait(FOLLOW_INTERVAL)
+            with self.followLock:
+                followers = list(self.followers)
+            #Rows a streamer has still to deliver are newer than its last row, and (once it has fallen
+            #silent) than FOLLOW_LAG ago; everything older than the earliest such bound is final
+            watermark = math.inf
+            for follower in followers:
+                streamer = follower.streamer
+                running = streamer.IsRunning()
+                rows, newTotal = streamer.ring.RowsSince(follower.total)
+                self.missed += newTotal - follower.total - len(rows)
+                follower.total = newTotal
+                if rows:
+                    follower.last = rows[-1][0]
+                    #A streamer followed late still holds rows from before the ones already written
+                    if rows[0][0] < written:
+                        count = len(rows)
+                        rows = rows[bisect.bisect_left(rows, written, key=lambda row: row[0]):]
+                        self.late += count - len(rows)
+                    held.extend((row[0], follower.address, row) for row in rows)
+                if running and not stopping:
+                    watermark = min(watermark, max(follower.last, streamer.timestamp() - FOLLOW_LAG))
+            if held:
+                held.sort(key=lambda entry: entry[0])
+                ready = bisect.bisect_right(held, watermark, key=lambda entry: entry[0])
+                if ready:
+                    written = held[ready - 1][0]
+                    self._AppendMerged(held[:ready])
+                    del held[:ready]
+                    self.Flush()
+            if stopping:
+                return
+
+    def _AppendMerged(self, entries):
+        pack = self.record.pack
+        data = b"".join(pack(row[0], address, 0, *row[1:]) for _, address, row in entries)
+        with self.lock:
+            self.file.write(data)
+            self.records += len(entries)
+
+    def Close(self):
+        #Owned streamers stop first, so the last pass of the follow thread writes their final rows
+        with self.followLock:
+            followers = list(self.followers)
+            thread, self.followThread = self.followThread, None
+        for follower in followers:
+            if follower.owned:
+                follower.streamer.Stop()
+        if thread is not None:
+            self.followStop.set()
+            thread.join()
+        with self.followLock:
+            self.followers = []
+        with self.lock:
+            if not self.file.closed:
+                self.file.close()
+
+    def Stop(self):
+        self.Close()
+
+class TelemetryLog:
+    # Read-only, memory-mapped view of a log written by TelemetryRecorder
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        self.channels, self.headerSize, self.recordSize, self.metadata = ReadHeader(self.file)
+        self.record = RecordStruct(len(self.channels))
+        self.width = self.recordSize // 8
+        self.map = None
+        self.words = None
+        self.count = 0
+        self.Refresh()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.Close()
+
+    def __len__(self):
+        return self.count
+
+    def Refresh(self):
+        # Maps the file again to take in records appended since; returns the record count
+        self._Unmap()
+        size = os.path.getsize(self.path)
+        self.count = max(0, size - self.headerSize) // self.recordSize
+        if self.count:
+            self.map = mmap.mmap(self.file.fileno(), self.headerSize + self.count * self.recordSize,
+                                 access=mmap.ACCESS_READ)
+            self.words = memoryview(self.map)[self.headerSize:].cast('d')
+        return self.count
+
+    def _Unmap(self):
+        if self.words is not None:
+            self.words.release()
+            self.words = None
+        if self.map is not None:
+            #Columns, timestamps or NumPy views still held keep the old mapping alive until released
+            try:
+                self.map.close()
+            except BufferError:
+                pass
+            self.map = None
+
+    def Close(self):
+        self._Unmap()
+        self.file.close()
+
+    def Record(self, index):
+        # (timestamp, address, values...) of one record
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("telemetry log record out of range")
+        timestamp, address, _, *values = self.record.unpack_from(self.map, self.headerSize + index * self.recordSize)
+        return (timestamp, address) + tuple(values)
+
+    def Records(self, start=0, stop=None):
+        stop = self.count if stop is None else min(stop, self.count)
+        for index in range(start, stop):
+            yield self.Record(index)
+
+    def Timestamps(self):
+        # Zero-copy, strided memoryview of the record timestamps
+        if self.words is None:
+            return memoryview(b"").cast('d')
+        return self.words[0::self.width]
+
+    def Column(self, channel, start=0, stop=None):
+        # Zero-copy, strided memoryview of one channel (name or index) for records start..stop
+        if not isinstance(channel, int):
+            channel = self.channels.index(channel)
+        if self.words is None:
+            return memoryview(b"").cast('d')
+        stop = self.count if stop is None else min(stop, self.count)
+        offset = RECORD_FIELDS + channel
+        return self.words[start * self.width + offset:stop * self.width:self.width]
+
+    def IndexRange(self, t0=None, t1=None):
+        # (start, stop) record indexes with t0 <= timestamp < t1, by binary search over the timestamps
+        # (records are in time order, see the description at the top)
+        times = self.Timestamps()
+        start = 0 if t0 is None else bisect.bisect_left(times, t0)
+        stop = self.count if t1 is None else bisect.bisect_left(times, t1)
+        return start, max(start, stop)
+
+    def Dtype(self):
+        import numpy
+        return numpy.dtype([('timestamp', '<f8'), ('address', '<i4'), ('reserved', '<i4')] +
+                           [(channel, '<f8') for channel in self.channels])
+
+    def Numpy(self, start=0, stop=None):
+        # Structured NumPy array over records start..stop, sharing the mapped file's memory
+        import numpy
+        stop = self.count if stop is None else min(stop, self.count)
+        if self.map is None or stop <= start:
+            return numpy.zeros(0, dtype=self.Dtype())
+        return numpy.frombuffer(self.map, dtype=self.Dtype(), count=stop - start,
+                                offset=self.headerSize + start * self.recordSize)
+
+    def TimeRange(self, t0=None, t1=None):
+        # NumPy view of the records with t0 <= timestamp < t1
+        return self.Numpy(*self.IndexRange(t0, t1))
+
+    def Addresses(self):
+        # Drive addresses present in the log
+        if self.words is None:
+            return []
+        ints = self.words.cast('B').cast('i')
+        return sorted(set(ints[2::self.width * 2]))
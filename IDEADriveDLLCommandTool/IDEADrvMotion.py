@@ -0,0 +1,215 @@
+# Name:           IDEADrvMotion.py
+# Environment:    Python 3.11
+# File Type:      Object class
+# Description:    Move completion tracking. MoveTracker sends MoveToPosition / IndexDistance / GoAtSpeed and
+#                 returns a MoveHandle with Wait(timeout), Done() and done callbacks, so application code
+#                 no longer loops on IsMoveExecuting or sleeps a fixed time. One background thread polls all
+#                 tracked moves. Polling is adaptive: the expected move time is estimated from the
+#                 distance and the drive's velocity profile (GetVelocityProfile), polls are sparse while
+#                 most of the move is still ahead and tight around the expected finish. Without an
+#                 estimate the poll interval backs off exponentially.
+
+import math
+import threading
+import time
+
+from IDEADrvParser import ResponseValues
+
+MIN_POLL_INTERVAL = 0.005
+MAX_POLL_INTERVAL = 0.25
+FINISH_WINDOW = 0.05            # seconds before the expected finish at which tight polling starts
+
+def MoveDuration(distance, velocity, acceleration, deceleration):
+    # Trapezoidal (or triangular, for short moves) profile time in seconds, None if not computable
+    distance = abs(distance)
+    if velocity <= 0 or acceleration <= 0 or deceleration <= 0:
+        return None
+    accelDistance = velocity * velocity / (2.0 * acceleration)
+    decelDistance = velocity * velocity / (2.0 * deceleration)
+    if accelDistance + decelDistance <= distance:
+        return velocity / acceleration + velocity / deceleration + (distance - accelDistance - decelDistance) / velocity
+    peak = math.sqrt(2.0 * distance * acceleration * deceleration / (acceleration + deceleration))
+    return peak / acceleration + peak / deceleration
+
+def VelocityProfile(drive):
+    # (velocity, acceleration, deceleration) from GetVelocityProfile, None if it cannot be read
+    values = [v for v in ResponseValues(drive.GetVelocityProfile()) if isinstance(v, (int, float))]
+    if len(values) < 3:
+        return None
+    return values[0], values[1], values[2]
+
+def FirstValue(params):
+    try:
+        return float(params.split(",")[0])
+    except ValueError:
+        return None
+
+class MoveHandle:
+    def __init__(self, drive, address, command, params, expectedDuration, clock):
+        self.drive = drive
+        self.address = address
+        self.command = command
+        self.params = params
+        self.expectedDuration = expectedDuration
+        self.clock = clock
+        self.startedAt = clock()
+        self.finishedAt = None
+        self.polls = 0
+        self.error = None
+        self.interval = MIN_POLL_INTERVAL / 2
+        self._ScheduleNext(self.startedAt)
+        self._done = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        state = "done" if self.Done() else "moving"
+        return "MoveHandle(%s%s, %s)" % (self.command, self.params, state)
+
+    def Done(self):
+        return self._done.is_set()
+
+    def Wait(self, timeout=None):
+        # True once the move has finished (or failed), False if timeout expired first
+        return self._done.wait(timeout)
+
+    def Elapsed(self):
+        end = self.finishedAt if self.finishedAt is not None else self.clock()
+        return end - self.startedAt
+
+    def Exception(self):
+        return self.error
+
+    def AddDoneCallback(self, callback):
+        # callback(handle) runs on the tracker thread, or immediately if the move already finished
+        with self._lock:
+            if not self._done.is_set():
+                self._callbacks.append(callback)
+                return
+        callback(self)
+
+    def _Finish(self, error=None):
+        with self._lock:
+            self.error = error
+            self.finishedAt = self.clock()
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback(self)
+            except Exception:
+                pass
+
+    def _ScheduleNext(self, now):
+        if self.expectedDuration is None:
+            self.interval = min(self.interval * 2, MAX_POLL_INTERVAL)
+            self.nextPoll = now + self.interval
+            return
+        remaining = self.startedAt + self.expectedDuration - FINISH_WINDOW - now
+        if remaining > 0:
+            #Long way to go: sleep most of the remaining time, in steps of at most MAX_POLL_INTERVAL
+            self.nextPoll = now + max(MIN_POLL_INTERVAL, min(remaining, MAX_POLL_INTERVAL))
+        else:
+            #At or past the expected finish: poll tightly, easing off if the move overruns a lot
+            overrun = -remaining
+            self.nextPoll = now + min(MAX_POLL_INTERVAL, max(MIN_POLL_INTERVAL, overrun / 10.0))
+
+class MoveTracker:
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.handles = []
+        self._wake = threading.Condition()
+        self._thread = None
+        self._stopped = False
+
+    def _Start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped = False
+            self._thread = threading.Thread(target=self._Run, name="IDEADrvMoveTracker", daemon=True)
+            self._thread.start()
+
+    def Stop(self):
+        with self._wake:
+            self._stopped = True
+            self._wake.notify_all()
+        if self._thread is not None and threading.current_thread() is not self._thread:
+            self._thread.join()
+        self._thread = None
+
+    def Track(self, drive, command="", params="", expectedDuration=None):
+        # Tracks a move that has already been sent to drive (at its current address)
+        handle = MoveHandle(drive, drive.IDriveAddress, command, params, expectedDuration, self.clock)
+        with self._wake:
+            self.handles.append(handle)
+            self._Start()
+            self._wake.notify_all()
+        return handle
+
+    def _Estimate(self, drive, distance):
+        if distance is None:
+            return None
+        try:
+            profile = VelocityProfile(drive)
+        except Exception:
+            return None
+        if profile is None:
+            return None
+        return MoveDuration(distance, *profile)
+
+    def MoveToPosition(self, drive, params, expectedDuration=None):
+        with drive.Transaction(drive.IDriveAddress):
+            if expectedDuration is None:
+                target = FirstValue(params)
+                position = ResponseValues(drive.GetPositionVelocity())
+                if target is not None and position and isinstance(position[0], (int, float)):
+                    expectedDuration = self._Estimate(drive, target - position[0])
+            drive.MoveToPosition(params)
+            return self.Track(drive, "MoveToPosition", params, expectedDuration)
+
+    def IndexDistance(self, drive, params, expectedDuration=None):
+        with drive.Transaction(drive.IDriveAddress):
+            if expectedDuration is None:
+                expectedDuration = self._Estimate(drive, FirstValue(params))
+            drive.IndexDistance(params)
+            return self.Track(drive, "IndexDistance", params, expectedDuration)
+
+    def GoAtSpeed(self, drive, params, expectedDuration=None):
+        # A speed move has no natural end; the handle completes once the drive reports it stopped
+        with drive.Transaction(drive.IDriveAddress):
+            drive.GoAtSpeed(params)
+            return self.Track(drive, "GoAtSpeed", params, expectedDuration)
+
+    def _Poll(self, handle):
+        handle.polls += 1
+        with handle.drive.Transaction(handle.address):
+            return handle.drive.IsMoving()
+
+    def _Run(self):
+        while True:
+            with self._wake:
+                while not self._stopped and not self.handles:
+                    self._wake.wait()
+                if self._stopped:
+                    return
+                now = self.clock()
+                due = [h for h in self.handles if h.nextPoll <= now]
+                if not due:
+                    self._wake.wait(min(h.nextPoll for h in self.handles) - now)
+                    continue
+            for handle in due:
+                try:
+                    moving = self._Poll(handle)
+                except Exception as e:
+                    self._Remove(handle)
+                    handle._Finish(e)
+                    continue
+                if moving:
+                    handle._ScheduleNext(self.clock())
+                else:
+                    self._Remove(handle)
+                    handle._Finish()
+
+    def _Remove(self, handle):
+        with self._wake:
+            if handle in self.handles:
+                self.handles.remove(handle)
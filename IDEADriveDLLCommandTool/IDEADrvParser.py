@@ -0,0 +1,140 @@
+# Name:           IDEADrvParser.py
+# Environment:    Python 3.11
+# File Type:      Object class
+# Description:    Turns raw IDEA Drive responses into small typed records. A record class is built once
+#                 per command letter from the DLL's output field list (GetOutputFieldList) and uses
+#                 __slots__, so long telemetry histories stay compact and consumers no longer need to
+#                 slice and split the response strings themselves.
+
+import re
+
+#Response framing, matching the slicing done by the command tool: 2 leading characters
+#(echo/command letter) and 5 trailing characters are not part of the comma separated values.
+RESPONSE_HEADER_LEN = 2
+RESPONSE_TRAILER_LEN = 5
+
+def FieldIdentifier(fieldName, index):
+    # "Position (counts)" -> "PositionCounts". Falls back to Field<n> for empty or numeric names.
+    words = re.findall(r'[A-Za-z0-9]+', fieldName)
+    name = "".join(w[0].upper() + w[1:] for w in words)
+    if not name or name[0].isdigit():
+        name = "Field" + str(index) + name
+    return name
+
+def ToNumber(token):
+    # Tokens with leading zeros ("0101") are bit patterns, not numbers, and are kept as text
+    digits = token.strip().lstrip("+-")
+    if len(digits) > 1 and digits[0] == "0" and digits[1].isdigit():
+        return token.strip()
+    try:
+        return int(token)
+    except ValueError:
+        pass
+    try:
+        return float(token)
+    except ValueError:
+        return token.strip()
+
+def ResponseBody(response):
+    # The comma separated value text of a response (str, bytes or memoryview), framing removed
+    if not isinstance(response, str):
+        response = str(response, 'UTF-8').replace("\r","",1)
+    return response[RESPONSE_HEADER_LEN:-RESPONSE_TRAILER_LEN]
+
+def ResponseValues(response):
+    # Comma separated values of a response converted with ToNumber
+    body = ResponseBody(response)
+    if not body:
+        return []
+    return [ToNumber(token) for token in body.split(",")]
+
+def ResponseFlag(response):
+    # Yes/no responses (IsMoveExecuting, IsProgramExecuting, ...): true if the first value is non-zero
+    if not isinstance(response, str):
+        response = str(response, 'UTF-8').replace("\r","",1)
+    body = response[RESPONSE_HEADER_LEN:-RESPONSE_TRAILER_LEN] or response.strip()
+    value = ToNumber(body.split(",")[0])
+    if isinstance(value, str):
+        return value.lower() in ("true", "yes", "y", "t")
+    return value != 0
+
+class ResponseRecord:
+    __slots__ = ()
+    FIELDS = ()
+    FIELD_NAMES = ()
+    COMMAND = ''
+
+    def __init__(self, *values):
+        for name, value in zip(self.FIELDS, values):
+            setattr(self, name, value)
+        for name in self.FIELDS[len(values):]:
+            setattr(self, name, None)
+
+    def __iter__(self):
+        return (getattr(self, name) for name in self.FIELDS)
+
+    def __len__(self):
+        return len(self.FIELDS)
+
+    def __getitem__(self, index):
+        return getattr(self, self.FIELDS[index])
+
+    def __eq__(self, other):
+        if not isinstance(other, ResponseRecord):
+            return NotImplemented
+        return self.COMMAND == other.COMMAND and tuple(self) == tuple(other)
+
+    def __repr__(self):
+        values = ", ".join(name + "=" + repr(getattr(self, name)) for name in self.FIELDS)
+        return type(self).__name__ + "(" + values + ")"
+
+    def AsTuple(self):
+        return tuple(self)
+
+    def AsDict(self):
+        # Keyed by the DLL's descriptive field names
+        return dict(zip(self.FIELD_NAMES, self))
+
+class ResponseSchema:
+    def __init__(self, commandLetter, fieldNames):
+        self.commandLetter = commandLetter
+        self.fieldNames = tuple(fieldNames)
+        identifiers = []
+        for i, fieldName in enumerate(self.fieldNames):
+            identifier = FieldIdentifier(fieldName, i)
+            while identifier in identifiers:
+                identifier = identifier + "_"
+            identifiers.append(identifier)
+        self.record = type("Response_" + commandLetter, (ResponseRecord,), {
+            '__slots__': tuple(identifiers),
+            'FIELDS': tuple(identifiers),
+            'FIELD_NAMES': self.fieldNames,
+            'COMMAND': commandLetter,
+        })
+
+    def Parse(self, response):
+        return self.record(*ResponseValues(response)[:len(self.record.FIELDS)])
+
+class ResponseParser:
+    # Builds and caches one ResponseSchema per command letter. fieldListSource is normally an
+    # IDEADrv (anything with GetOutputFieldList(commandLetter) returning a comma separated string).
+    def __init__(self, fieldListSource):
+        self.fieldListSource = fieldListSource
+        self.schemas = {}
+
+    def GetSchema(self, commandLetter):
+        schema = self.schemas.get(commandLetter)
+        if schema is None:
+            fields = self.fieldListSource.GetOutputFieldList(commandLetter)
+            if not isinstance(fields, str):
+                fields = str(fields, 'UTF-8')
+            fieldNames = [f.strip() for f in fields.split(",") if f.strip()]
+            schema = ResponseSchema(commandLetter, fieldNames)
+            self.schemas[commandLetter] = schema
+        return schema
+
+    def Parse(self, commandLetter, response):
+        return self.GetSchema(commandLetter).Parse(response)
+
+    def Clear(self):
+        self.schemas.clear()
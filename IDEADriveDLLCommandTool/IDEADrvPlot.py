@@ -0,0 +1,149 @@
+# Name:           IDEADrvPlot.py
+# Environment:    Python 3.11
+# File Type:      Object class
+# Description:    Live telemetry plots for the command tool. A TelemetryPanel is a Tk frame with one canvas
+#                 per plot (position, velocity, I/O). Every drive added to it is polled by its own
+#                 TelemetryStreamer; on each refresh the panel moves the new rows into a MinMaxHistory
+#                 and redraws each line from the min and max per pixel column of the visible time span,
+#                 so drawing costs the same for ten seconds or eight hours of history and memory stays
+#                 fixed. Canvas items are created once and then only get new coordinates.
+
+import math
+import tkinter as tk
+from tkinter import ttk
+
+from IDEADrvTelemetry import MinMaxHistory
+
+PLOT_GETTERS = ("GetPositionVelocity", "GetIOReading")
+#Plot title and channels; a name ending in "." stands for every channel of that getter
+PLOTS = (("Position", ("GetPositionVelocity.0",)),
+         ("Velocity", ("GetPositionVelocity.1",)),
+         ("I/O", ("GetIOReading.",)))
+SPANS = (("10 s", 10.0), ("1 min", 60.0), ("10 min", 600.0), ("1 h", 3600.0), ("8 h", 28800.0))
+COLORS = ("blue", "red", "dark green", "purple", "dark orange", "brown", "black", "magenta")
+REFRESH_INTERVAL = 50       # ms
+PLOT_HEIGHT = 120
+AXIS_WIDTH = 70             # pixels left of the plot for the axis labels
+
+def PlotChannels(names, channels):
+    # Indexes of the channels named by a PLOTS entry
+    return [i for i, channel in enumerate(channels)
+            if any(channel == name or (name.endswith(".") and channel.startswith(name)) for name in names)]
+
+class PlotSource:
+    __slots__ = ('label', 'streamer', 'history', 'total')
+
+    def __init__(self, label, streamer, capacity):
+        self.label = label
+        self.streamer = streamer
+        self.history = MinMaxHistory(streamer.ring.channels, capacity)
+        self.total = 0                      # rows of the streamer's ring already moved into history
+
+class TelemetryPanel(tk.Frame):
+    def __init__(self, master, refreshInterval=REFRESH_INTERVAL, historyCapacity=65536):
+        tk.Frame.__init__(self, master)
+        self.refreshInterval = refreshInterval
+        self.historyCapacity = historyCapacity
+        self.sources = []
+        self.lines = {}             # (plot, source, channel) -> canvas line
+        self.labels = []            # per plot: (title, top value, bottom value) canvas texts
+
+        controls = tk.Frame(self)
+        controls.grid(row=0, column=0, sticky=tk.W)
+        tk.Label(controls, text="Span").grid(row=0, column=0, padx=2)
+        self.spanMenu = ttk.Combobox(controls, values=[label for label, _ in SPANS], state='readonly', width=8)
+        self.spanMenu.set(SPANS[0][0])
+        self.spanMenu.grid(row=0, column=1, padx=2)
+        self.paused = tk.IntVar(self, 0)
+        tk.Checkbutton(controls, text="Pause", variable=self.paused).grid(row=0, column=2, padx=2)
+        self.statusLabel = tk.Label(controls, text="No drives", anchor=tk.W)
+        self.statusLabel.grid(row=0, column=3, sticky=tk.W, padx=6)
+
+        self.canvases = []
+        for row, (title, _) in enumerate(PLOTS, 1):
+            canvas = tk.Canvas(self, height=PLOT_HEIGHT, bg='white', highlightthickness=0)
+            canvas.grid(row=row, column=0, sticky=tk.NSEW, padx=2, pady=2)
+            self.rowconfigure(row, weight=1)
+            self.labels.append((canvas.create_text(4, 2, anchor=tk.NW, text=title, font=("Arial", 10, "bold")),
+                                canvas.create_text(AXIS_WIDTH - 4, 2, anchor=tk.NE, text=""),
+                                canvas.create_text(AXIS_WIDTH - 4, PLOT_HEIGHT - 2, anchor=tk.SE, text="")))
+            canvas.create_line(AXIS_WIDTH, 0, AXIS_WIDTH, 10000, fill='grey')
+            self.canvases.append(canvas)
+        self.columnconfigure(0, weight=1)
+        self._refreshJob = self.after(self.refreshInterval, self._Refresh)
+
+    def AddStreamer(self, label, streamer):
+        # streamer: a started TelemetryStreamer polling (at least) PLOT_GETTERS
+        self.sources.append(PlotSource(label, streamer, self.historyCapacity))
+
+    def Stop(self):
+        if self._refreshJob is not None:
+            self.after_cancel(self._refreshJob)
+            self._refreshJob = None
+        for source in self.sources:
+            source.streamer.Stop()
+
+    def Span(self):
+        return dict(SPANS).get(self.spanMenu.get(), SPANS[0][1])
+
+    def _Refresh(self):
+        for source in self.sources:
+            rows, source.total = source.streamer.ring.RowsSince(source.total)
+            for row in rows:
+                source.history.Append(row[0], row[1:])
+        if self.sources:
+            self.statusLabel.configure(text="   ".join(
+                "%s: %.0f Hz, %d dropped" % (source.label, stats['achievedRate'], stats['dropped'])
+                for source, stats in ((s, s.streamer.Stats()) for s in self.sources)))
+        if not self.paused.get():
+            self.Draw()
+        self._refreshJob = self.after(self.refreshInterval, self._Refresh)
+
+    def Draw(self):
+        newest = [source.history.raw.Row(-1)[0] for source in self.sources if len(source.history.raw)]
+        if not newest:
+            return
+        t1 = max(newest)
+        t0 = t1 - self.Span()
+        for plot, ((title, names), canvas) in enumerate(zip(PLOTS, self.canvases)):
+            width = canvas.winfo_width()
+            height = canvas.winfo_height()
+            columns = max(1, width - AXIS_WIDTH)
+            series = []
+            for index, source in enumerate(self.sources):
+                for color, channel in enumerate(PlotChannels(names, source.history.channels), index * 3):
+                    mins, maxs = source.history.Decimate(channel, t0, t1, columns)
+                    series.append(((plot, index, channel), COLORS[color % len(COLORS)], mins, maxs))
+            low, high = math.inf, -math.inf
+            for _, _, mins, maxs in series:
+                for value in mins:
+                    if value < low:
+                        low = value
+                for value in maxs:
+                    if value > high:
+                        high = value
+            if low > high:
+                low, high = -1.0, 1.0
+            elif low == high:
+                low, high = low - 1.0, high + 1.0
+            scale = (height - 4) / (high - low)
+            _, top, bottom = self.labels[plot]
+            canvas.itemconfigure(top, text="%.6g" % high)
+            canvas.itemconfigure(bottom, text="%.6g" % low)
+            canvas.coords(bottom, AXIS_WIDTH - 4, height - 2)
+            for key, color, mins, maxs in series:
+                #One vertical stroke from min to max per column, joined to the next column
+                coords = []
+                for x, (lo, hi) in enumerate(zip(mins, maxs), AXIS_WIDTH):
+                    if lo == lo:
+                        coords += (x, height - 2 - (lo - low) * scale, x, height - 2 - (hi - low) * scale)
+                line = self.lines.get(key)
+                if len(coords) < 4:
+                    if line is not None:
+                        canvas.itemconfigure(line, state='hidden')
+                    continue
+                if line is None:
+                    self.lines[key] = canvas.create_line(*coords, fill=color)
+                else:
+                    canvas.coords(line, *coords)
+                    canvas.itemconfigure(line, state='normal')
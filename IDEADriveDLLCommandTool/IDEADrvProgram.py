@@ -0,0 +1,242 @@
+# Name:           IDEADrvProgram.py
+# Environment:    Python 3.11
+# File Type:      Object class
+# Description:    Program transfer. A program of any length is downloaded as a sequence of DownloadProgram
+#                 calls, one line or one chunk of whole lines per call, each within the DLL's parameter
+#                 limit, so nothing is cut off at the 1 KB buffer. The first line of a download is the
+#                 program name (added when the text does not start with it); the drive keeps taking
+#                 program lines until another command is sent, so every download is closed by recalling
+#                 the program, which also checks what the drive stored. Every program is hashed (SHA-256
+#                 of its normalized lines, name line included); the hash of each copy confirmed on a drive
+#                 is kept in a ProgramHashCache (optionally a JSON file), and a download whose hash matches
+#                 is skipped. With verify set, a drive missing from the cache is checked by recalling its
+#                 copy instead.
+#                 Deploy sends programs to many drives of a DriveSession through the per-bus workers.
+
+import json
+import os
+import threading
+import time
+
+from IDEADrvParser import ResponseBody
+
+MAX_PARAMETER_LENGTH = 1023     # longest parameter string the DLL accepts (1 KB buffer incl. terminator)
+PROGRAM_LINE_END = "\r"
+PROGRAM_CACHE_FORMAT = 1
+
+def ProgramLines(text):
+    # Program text as a list of command lines, surrounding blanks and empty lines dropped
+    lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return [line.strip() for line in lines if line.strip()]
+
+def ProgramHash(text):
+    import hashlib
+    return hashlib.sha256("\n".join(ProgramLines(text)).encode('UTF-8')).hexdigest()
+
+def ProgramChunks(lines, chunkSize=MAX_PARAMETER_LENGTH, lineByLine=False):
+    # Whole lines joined by PROGRAM_LINE_END into chunks of at most chunkSize characters
+    chunk = ""
+    for line in lines:
+        if len(line) > chunkSize:
+            raise ValueError("program line longer than " + str(chunkSize) + " characters: " + line[:40])
+        if lineByLine:
+            yield line
+        elif not chunk:
+            chunk = line
+        elif len(chunk) + len(PROGRAM_LINE_END) + len(line) <= chunkSize:
+            chunk += PROGRAM_LINE_END + line
+        else:
+            yield chunk
+            chunk = line
+    if chunk:
+        yield chunk
+
+def ProgramNames(response):
+    # GetListProgramNames response ("Program1  Program2  Program3...") as a list of names
+    if not isinstance(response, str):
+        response = str(response, 'UTF-8')
+    return response.split()
+
+class Program:
+    __slots__ = ('name', 'text', 'lines', 'hash')
+
+    def __init__(self, name, text):
+        # text may start with the name line or leave it out; lines always start with it
+        if ProgramLines(name) != [name]:
+            raise ValueError("a program name is one line without surrounding blanks: " + repr(name))
+        self.name = name
+        self.text = text
+        self.lines = ProgramLines(text)
+        if not self.lines or self.lines[0] != name:
+            self.lines.insert(0, name)
+        self.hash = ProgramHash("\n".join(self.lines))
+
+    def __repr__(self):
+        return "Program(%r, %d lines, %s)" % (self.name, len(self.lines), self.hash[:12])
+
+    @classmethod
+    def FromFile(cls, path, name=None):
+        # The program name defaults to the file name without extension
+        with open(path) as f:
+            text = f.read()
+        if name is None:
+            name = os.path.splitext(os.path.basename(path))[0]
+        return cls(name, text)
+
+class ProgramHashCache:
+    # (port, address, program name) -> hash of the copy last downloaded to that drive
+    def __init__(self, path=None):
+        self.path = path
+        self.hashes = {}
+        self.lock = threading.Lock()
+        if path:
+            self.Load()
+
+    def _Key(self, drive, name):
+        return drive.serialPort + "|" + drive.IDriveAddress + "|" + name
+
+    def Get(self, drive, name):
+        with self.lock:
+            return self.hashes.get(self._Key(drive, name))
+
+    def Set(self, drive, name, programHash):
+        with self.lock:
+            self.hashes[self._Key(drive, name)] = programHash
+        self.Save()
+
+    def Invalidate(self, drive=None, name=None):
+        with self.lock:
+            if drive is None:
+                self.hashes.clear()
+            elif name is not None:
+                self.hashes.pop(self._Key(drive, name), None)
+            else:
+                prefix = drive.serialPort + "|" + drive.IDriveAddress + "|"
+                for key in [k for k in self.hashes if k.startswith(prefix)]:
+                    del self.hashes[key]
+        self.Save()
+
+    def Load(self):
+        try:
+            with open(self.path) as f:
+                document = json.load(f)
+        except (OSError, ValueError):
+            return
+        if document.get('format') == PROGRAM_CACHE_FORMAT:
+            with self.lock:
+                self.hashes = dict(document.get('hashes', {}))
+
+    def Save(self):
+        if not self.path:
+            return
+        with self.lock:
+            document = {'format': PROGRAM_CACHE_FORMAT, 'hashes': dict(self.hashes)}
+        tmpPath = self.path + ".tmp." + str(threading.get_ident())
+        try:
+            with open(tmpPath, 'w') as f:
+                json.dump(document, f, indent=1)
+            os.replace(tmpPath, self.path)
+        except OSError:
+            pass
+
+class TransferResult:
+    __slots__ = ('name', 'hash', 'action', 'chunks', 'characters', 'elapsed', 'error')
+
+    def __init__(self, name, programHash, action, chunks=0, characters=0, elapsed=0.0, error=None):
+        self.name = name
+        self.hash = programHash
+        self.action = action            # "downloaded", "skipped" or "failed"
+        self.chunks = chunks
+        self.characters = characters
+        self.elapsed = elapsed
+        self.error = error
+
+    def __repr__(self):
+        return "TransferResult(%r, %s, %d chunks, %.3fs)" % (self.name, self.action, self.chunks, self.elapsed)
+
+    def Ok(self):
+        return self.error is None
+
+class ProgramTransfer:
+    def __init__(self, cache=None, chunkSize=MAX_PARAMETER_LENGTH, lineByLine=False, verify=False, clock=time.perf_counter):
+        self.cache = cache if cache is not None else ProgramHashCache()
+        self.chunkSize = chunkSize
+        self.lineByLine = lineByLine
+        self.verify = verify
+        self.clock = clock
+
+    def Recall(self, drive, name):
+        # Full program text from the drive
+        response = drive.RecallProgram(name)
+        if not isinstance(response, str):
+            response = drive.Buffer2String(response)
+        return response
+
+    def List(self, drive):
+        return ProgramNames(drive.GetListProgramNames())
+
+    def Delete(self, drive, name):
+        with drive.Transaction(drive.IDriveAddress):
+            result = drive.DeleteProgram(name)
+        self.cache.Invalidate(drive, name)
+        return result
+
+    def IsCurrent(self, drive, program):
+        # True if drive already holds this exact program (cached hash, or a recalled copy with verify)
+        cached = self.cache.Get(drive, program.name)
+        if cached is not None:
+            return cached == program.hash
+        if not self.verify:
+            return False
+        return self.Verify(drive, program)
+
+    def Verify(self, drive, program):
+        # True if the copy recalled from drive is this exact program; the cache follows the answer
+        onDrive = ProgramHash(ResponseBody(self.Recall(drive, program.name)))
+        if onDrive == program.hash:
+            self.cache.Set(drive, program.name, onDrive)
+            return True
+        self.cache.Invalidate(drive, program.name)
+        return False
+
+    def Download(self, drive, program, force=False):
+        start = self.clock()
+        result = TransferResult(program.name, program.hash, "skipped")
+        try:
+            with drive.Transaction(drive.IDriveAddress):
+                if not force and self.IsCurrent(drive, program):
+                    result.elapsed = self.clock() - start
+                    return result
+                #The chunks are built before anything is sent, so an unsendable line fails the whole
+                #program rather than leaving half of it on the drive
+                chunks = list(ProgramChunks(program.lines, self.chunkSize, self.lineByLine))
+                self.cache.Invalidate(drive, program.name)
+                for chunk in chunks:
+                    drive.DownloadProgram(chunk)
+                    result.chunks += 1
+                    result.characters += len(chunk)
+                #The recall ends the download, so the next program does not run on into this one, and
+                #only a copy the drive gives back unchanged is cached
+                onDrive = ProgramHash(ResponseBody(self.Recall(drive, program.name)))
+            if onDrive != program.hash:
+                raise RuntimeError("program " + program.name + " on the drive differs from the one downloaded")
+            self.cache.Set(drive, program.name, program.hash)
+            result.action = "downloaded"
+        except Exception as e:
+            result.action = "failed"
+            result.error = e
+        result.elapsed = self.clock() - start
+        return result
+
+    def DownloadAll(self, drive, programs, force=False):
+        return [self.Download(drive, program, force) for program in programs]
+
+    def Deploy(self, session, programs, keys=None, force=False):
+        # Downloads programs to every drive in keys (default: all drives of the session), drives on
+        # different buses side by side. Returns (port, address) -> [TransferResult].
+        if isinstance(programs, Program):
+            programs = [programs]
+        programs = list(programs)
+        keys = sorted(session) if keys is None else list(keys)
+        futures = {key: session.Submit(key[0], key[1], self.DownloadAll, programs, force) for key in keys}
+        return {key: future.result() for key, future in futures.items()}
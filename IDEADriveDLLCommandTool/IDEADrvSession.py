@@ -0,0 +1,165 @@
+# Name:           IDEADrvSession.py
+# Environment:    Python 3.11
+# File Type:      Object class
+# Description:    Manages many IDEA Drives (several serial ports, several RS485 addresses per port) from
+#                 one process. The DLL is loaded once and shared by one IDEADrv per (port, address).
+#                 Each call is routed to its drive: the serial port is only reopened when the call is
+#                 for a different port than the one the DLL has open, and SetCurrentAddress is only sent
+#                 when the address changes.
+#
+#                 Locking: every port (RS485 bus) has its own lock and its own worker thread fed by a
+#                 request queue (Submit returns a concurrent.futures.Future). A request holds its bus
+#                 lock for address + command + response, so commands on one chain never interleave.
+#                 The DLL itself keeps a single open port and address, so calls into one loaded DLL are
+#                 additionally serialized on its lock (DLLPrototypes.lock); queueing, encoding, parsing
+#                 and result delivery of different buses still overlap.
+
+import concurrent.futures
+import queue
+import threading
+from contextlib import contextmanager
+
+from IDEADrvCommander import IDEADrv, SharedPrototypes
+
+def NormalizeAddress(address):
+    # 7, "7", "07" or "#007" -> "#007". "" (or None) is the broadcast/no address used by the DLL.
+    if address is None or address == "":
+        return ""
+    if isinstance(address, int):
+        return "#%03d" % address
+    address = str(address)
+    if address.startswith("#"):
+        address = address[1:]
+    return "#%03d" % int(address)
+
+class BusWorker:
+    # One thread and request queue per serial port
+    def __init__(self, session, port):
+        self.session = session
+        self.port = port
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._Run, name="IDEADrvBus-" + str(port), daemon=True)
+        self.thread.start()
+
+    def Submit(self, address, method, args):
+        future = concurrent.futures.Future()
+        self.queue.put((future, address, method, args))
+        return future
+
+    def Stop(self, wait=True):
+        self.queue.put(None)
+        if wait and threading.current_thread() is not self.thread:
+            self.thread.join()
+
+    def _Run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            future, address, method, args = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = self.session.Call(self.port, address, method, *args)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+class DriveSession:
+    def __init__(self, path, dll=None):
+        self.DLL_Path = path
+        self.dll = dll if dll is not None else SharedPrototypes(path)
+        self.lock = self.dll.lock       # DLL state (open port, current address)
+        self.drives = {}                # (port, address) -> IDEADrv
+        self.busLocks = {}              # port -> RLock
+        self.workers = {}               # port -> BusWorker
+
+    def __len__(self):
+        return len(self.drives)
+
+    def __iter__(self):
+        return iter(list(self.drives))
+
+    def AddDrive(self, port, address=""):
+        key = (port, NormalizeAddress(address))
+        with self.lock:
+            drive = self.drives.get(key)
+            if drive is None:
+                drive = IDEADrv(port, self.DLL_Path, key[1], dll=self.dll)
+                self.drives[key] = drive
+                self.busLocks.setdefault(port, threading.RLock())
+        return drive
+
+    def RemoveDrive(self, port, address=""):
+        with self.lock:
+            return self.drives.pop((port, NormalizeAddress(address)), None)
+
+    def Drive(self, port, address=""):
+        return self.drives[(port, NormalizeAddress(address))]
+
+    def Ports(self):
+        return sorted(set(port for port, _ in self.drives))
+
+    def Addresses(self, port):
+        return sorted(address for p, address in self.drives if p == port)
+
+    def BusLock(self, port):
+        return self.busLocks[port]
+
+    def Select(self, port, address=""):
+        # Points the DLL at (port, address), touching the serial port and address only when they change
+        drive = self.Drive(port, address)
+        with self.lock:
+            if self.dll.openPort != port:
+                drive.CloseComms()
+                drive.OpenComms()
+            drive.SetCurrentAddress(drive.IDriveAddress)
+        return drive
+
+    @contextmanager
+    def Transaction(self, port, address=""):
+        # with session.Transaction("COM3", 2) as drive: ... several calls with nothing interleaved
+        with self.BusLock(port), self.lock:
+            yield self.Select(port, address)
+
+    def Call(self, port, address, method, *args):
+        # session.Call("COM3", 2, "MoveToPosition", "1000,...") -> drive.MoveToPosition("1000,...")
+        # method may also be a function taking the drive: session.Call("COM3", 2, lambda d: ...)
+        with self.Transaction(port, address) as drive:
+            if callable(method):
+                return method(drive, *args)
+            return getattr(drive, method)(*args)
+
+    def SendCommand(self, port, address, command):
+        return self.Call(port, address, "SendCommand", command)
+
+    def Submit(self, port, address, method, *args):
+        # Queues the call on the port's worker thread and returns a Future for its result
+        with self.lock:
+            worker = self.workers.get(port)
+            if worker is None:
+                self.Drive(port, address)
+                worker = BusWorker(self, port)
+                self.workers[port] = worker
+        return worker.Submit(address, method, args)
+
+    def Broadcast(self, method, *args):
+        # Runs method on every drive, grouped by port so each port is opened once
+        results = {}
+        for key in sorted(self.drives):
+            results[key] = self.Call(key[0], key[1], method, *args)
+        return results
+
+    def SubmitAll(self, method, *args):
+        return {key: self.Submit(key[0], key[1], method, *args) for key in sorted(self.drives)}
+
+    def Close(self):
+        with self.lock:
+            workers = list(self.workers.values())
+            self.workers.clear()
+        for worker in workers:
+            worker.Stop()
+        with self.lock:
+            if self.dll.openPort is not None and self.drives:
+                next(iter(self.drives.values())).CloseComms()
@@ -0,0 +1,551 @@
+# Name:           IDEADrvSimulator.py
+# Environment:    Python 3.11
+# File Type:      Object class
+# Description:    Simulated IDEA Drive backend. SimulatedDLL exports the same functions as
+#                 IDEADriveCommandx64.dll (OpenSerial, SendCommand, GetPositionVelocity, MoveToPosition,
+#                 GetAddresses, the command set queries, ...) with the same arguments, so an IDEADrv runs
+#                 on it unchanged: IDEADrv("COM1", SIMULATED_DLL) or IDEADrv("COM1", SimulatedDLL(...)).
+#                 Every port is an RS485 bus with its own drives and a SimulatedLink that charges a
+#                 fixed latency per transaction plus the character time at the configured baud rate,
+#                 and can be made to lose or cut short a share of the responses (dropRate, garbleRate).
+#                 Each drive keeps its configuration and programs and moves a SimulatedAxis along
+#                 trapezoidal (or triangular) profiles, so position, velocity and move state change
+#                 over time like a real axis.
+#
+#                 Command letters: the simulator has its own command table (SIMULATED_COMMANDS); its
+#                 letters are not the drive's. Responses use the "`" + letter + values + "*000\r\n"
+#                 framing the command tool expects. Programs: a run of DownloadProgram calls with
+#                 nothing else in between is one program, named by its first line.
+
+import math
+import random
+import threading
+import time
+
+SIMULATED_DLL = "simulated"     # IDEADrv path that selects a default SimulatedDLL
+NUMBER_OF_ADDRESSES = 256
+BITS_PER_CHARACTER = 10         # start bit + 8 data bits + stop bit
+RESPONSE_TRAILER = "*000\r\n"
+
+class SimulatedCommand:
+    __slots__ = ('name', 'letter', 'function', 'parameters', 'outputs')
+
+    def __init__(self, name, letter, function, parameters=(), outputs=()):
+        self.name = name
+        self.letter = letter
+        self.function = function
+        self.parameters = tuple(parameters)
+        self.outputs = tuple(outputs)
+
+SIMULATED_COMMANDS = (
+    # Readonly commands
+    SimulatedCommand("Get Firmware Version", "v", "GetFWVersion", (), ("Version",)),
+    SimulatedCommand("Get Encoder Configuration", "e", "GetEncoderConfiguration", (), ("Resolution", "Direction")),
+    SimulatedCommand("Get Hall Sensor Configuration", "h", "GetHallSensorConfiguration", (), ("Hall Configuration",)),
+    SimulatedCommand("Get Motor Type", "t", "GetMotorType", (), ("Motor Type",)),
+    SimulatedCommand("Get Motor Parameters", "m", "GetMotorParameters", (), ("Resistance", "Inductance", "Torque Constant")),
+    SimulatedCommand("Get Control Reference", "r", "GetControlReference", (), ("Reference",)),
+    SimulatedCommand("Get Drive Address", "a", "GetDriveAddress", (), ("Address",)),
+    SimulatedCommand("Get Max Drive Current", "c", "GetMaxDriveCurrent", (), ("Max Current",)),
+    SimulatedCommand("Get Velocity Profile", "p", "GetVelocityProfile", (), ("Velocity", "Acceleration", "Deceleration")),
+    SimulatedCommand("Get Control Gain", "g", "GetControlGain", (), ("Proportional", "Integral", "Derivative")),
+    SimulatedCommand("Is Move Executing", "o", "IsMoveExecuting", (), ("Moving",)),
+    SimulatedCommand("Get Position Velocity", "l", "GetPositionVelocity", (), ("Position", "Velocity")),
+    SimulatedCommand("Is Input Override", "n", "IsInputOverride", (), ("Override",)),
+    SimulatedCommand("Get IO Reading", "i", "GetIOReading", (), ("Inputs", "Outputs")),
+    SimulatedCommand("Get Fault Parameters", "k", "GetFaultParameters", (),
+                     ("Position Limit Enable", "Minimum Position", "Maximum Position", "Current Limit Duration", "Position Error Limit")),
+    SimulatedCommand("Get Fault Reading", "f", "GetFaultReading", (), ("Faults",)),
+    SimulatedCommand("Get Startup Program Name", "s", "GetStartupProgramName", (), ("Program Name",)),
+    SimulatedCommand("Is Program Executing", "x", "IsProgramExecuting", (), ("Executing",)),
+    # Writeonly commands
+    SimulatedCommand("Set Encoder Configuration", "E", "SetEncoderConfiguration", ("Resolution", "Direction")),
+    SimulatedCommand("Set Hall Sensor Configuration", "H", "SetHallSensorConfiguration", ("Hall Configuration",)),
+    SimulatedCommand("Set Motor Type", "T", "SetMotorType", ("Motor Type",)),
+    SimulatedCommand("Set Motor Parameters", "J", "SetMotorParameters", ("Resistance", "Inductance", "Torque Constant")),
+    SimulatedCommand("Set Control Reference Configuration", "R", "SetControlReferenceConfiguration", ("Reference",)),
+    SimulatedCommand("Set Velocity Profile Waveshape", "W", "SetVelocityProfileWaveshape", ("Velocity", "Acceleration", "Deceleration")),
+    SimulatedCommand("Set Control Gains", "G", "SetControlGains", ("Proportional", "Integral", "Derivative")),
+    SimulatedCommand("Move To Position", "M", "MoveToPosition", ("Position", "Velocity", "Acceleration", "Deceleration")),
+    SimulatedCommand("Index Distance", "I", "IndexDistance", ("Distance", "Velocity", "Acceleration", "Deceleration")),
+    SimulatedCommand("Go At Speed", "S", "GoAtSpeed", ("Velocity", "Acceleration")),
+    SimulatedCommand("Immediate Stop", "Z", "ImmediateStop", ()),
+    SimulatedCommand("Stop Movement", "D", "StopMovement", ("Deceleration",)),
+    SimulatedCommand("Set Position Origin", "O", "SetPositionOrigin", ("Position",)),
+    SimulatedCommand("Set Output State", "U", "SetOutputState", ("Outputs",)),
+    SimulatedCommand("Set Position Limit Fault", "L", "SetPositionLimitFault", ("Enable", "Minimum Position", "Maximum Position")),
+    SimulatedCommand("Set Current Limit Duration Fault", "C", "SetCurrentLimitDurationFault", ("Duration",)),
+    SimulatedCommand("Set Position Error Fault", "B", "SetPositionErrorFault", ("Limit",)),
+    SimulatedCommand("Execute Program", "X", "ExecuteProgram", ("Program Name",)),
+    SimulatedCommand("Set Startup Program", "Y", "SetStartupProgram", ("Program Name",)),
+    SimulatedCommand("Run To Label", "K", "RunToLabel", ("Label",)),
+    SimulatedCommand("Set Inputs", "N", "SetInputs", ("Inputs",)),
+    SimulatedCommand("Set Input Override", "V", "SetInputOverride", ("Override",)),
+)
+
+#DLL functions the simulator accepts without modelling them
+NO_ARGUMENT_FUNCTIONS = ("Noop", "ReturnFromSub", "SingleStep", "WaitForMove", "Reset", "Abort",
+                         "EnableDataLogging", "DisableDataLogging")
+ACCEPTED_FUNCTIONS = ("SetDriveAddress", "SetPassword", "RemovePassword", "GoAtVoltage", "GoAtTorque",
+                      "SetInputInterrupts", "RunProgram", "SetDebugMode", "GotoAddress", "JumpNTimes",
+                      "GotoIf", "GotoSub", "ReturnTo", "WaitTime", "Label", "Comment")
+
+def _Text(value):
+    # bytes, c_char_p or str argument as str
+    value = getattr(value, 'value', value)
+    if isinstance(value, bytes):
+        return value.decode('UTF-8')
+    return value or ""
+
+def _Numbers(params, defaults):
+    # Comma separated parameters as floats, missing or unreadable ones taken from defaults
+    values = list(defaults)
+    for i, token in enumerate(params.split(",")[:len(values)] if params else ()):
+        try:
+            values[i] = float(token)
+        except ValueError:
+            pass
+    return values
+
+def _Fill(buf, size, text):
+    # Writes text into a ctypes char buffer the way the DLL does: at most size - 1 characters + NUL
+    buf.value = text.encode('UTF-8')[:max(0, min(size, len(buf)) - 1)]
+
+def _Format(value):
+    return str(int(round(value))) if isinstance(value, float) else str(value)
+
+class SimulatedAxis:
+    # Point-to-point moves with a trapezoidal (or, for short moves, triangular) velocity profile, and
+    # speed moves. A new move starts from the current position and from rest.
+    def __init__(self, clock):
+        self.clock = clock
+        self.origin = 0.0           # position at the start of the current motion
+        self.startedAt = clock()
+        self.mode = None            # None (stopped), "move" or "speed"
+        self.profile = None
+
+    def State(self):
+        # (position, velocity, moving)
+        t = self.clock() - self.startedAt
+        if self.mode == "move":
+            direction, length, velocity, acceleration, deceleration, accelTime, cruiseTime, decelTime = self.profile
+            if t >= accelTime + cruiseTime + decelTime:
+                return self.origin + direction * length, 0.0, False
+            if t < accelTime:
+                return self.origin + direction * 0.5 * acceleration * t * t, direction * acceleration * t, True
+            accelDistance = 0.5 * acceleration * accelTime * accelTime
+            if t < accelTime + cruiseTime:
+                return self.origin + direction * (accelDistance + velocity * (t - accelTime)), direction * velocity, True
+            td = t - accelTime - cruiseTime
+            distance = accelDistance + velocity * cruiseTime + velocity * td - 0.5 * deceleration * td * td
+            return self.origin + direction * distance, direction * (velocity - deceleration * td), True
+        if self.mode == "speed":
+            velocity, acceleration = self.profile
+            accelTime = abs(velocity) / acceleration if acceleration > 0 else 0.0
+            if t < accelTime:
+                return self.origin + math.copysign(0.5 * acceleration * t * t, velocity), math.copysign(acceleration * t, velocity), True
+            return self.origin + math.copysign(0.5 * acceleration * accelTime * accelTime, velocity) + velocity * (t - accelTime), velocity, True
+        return self.origin, 0.0, False
+
+    def Position(self):
+        return self.State()[0]
+
+    def IsMoving(self):
+        return self.State()[2]
+
+    def MoveBy(self, distance, velocity, acceleration, deceleration):
+        position = self.Stop()
+        velocity, acceleration, deceleration = abs(velocity), abs(acceleration), abs(deceleration)
+        if distance == 0 or velocity <= 0 or acceleration <= 0 or deceleration <= 0:
+            return
+        length = abs(distance)
+        accelDistance = velocity * velocity / (2.0 * acceleration)
+        decelDistance = velocity * velocity / (2.0 * deceleration)
+        if accelDistance + decelDistance > length:
+            velocity = math.sqrt(2.0 * length * acceleration * deceleration / (acceleration + deceleration))
+            accelDistance = velocity * velocity / (2.0 * acceleration)
+            decelDistance = velocity * velocity / (2.0 * deceleration)
+        cruiseTime = (length - accelDistance - decelDistance) / velocity
+        self.origin = position
+        self.startedAt = self.clock()
+        self.profile = (math.copysign(1.0, distance), length, velocity, acceleration, deceleration,
+                        velocity / acceleration, max(0.0, cruiseTime), velocity / deceleration)
+        self.mode = "move"
+
+    def MoveTo(self, target, velocity, acceleration, deceleration):
+        self.MoveBy(target - self.Position(), velocity, acceleration, deceleration)
+
+    def GoAtSpeed(self, velocity, acceleration):
+        position = self.Stop()
+        self.origin = position
+        self.startedAt = self.clock()
+        if velocity:
+            self.profile = (velocity, abs(acceleration))
+            self.mode = "speed"
+
+    def Stop(self):
+        # Stops where the axis is now and returns that position
+        position = self.Position()
+        self.origin = position
+        self.startedAt = self.clock()
+        self.mode = None
+        self.profile = None
+        return position
+
+    def SetOrigin(self, position):
+        self.Stop()
+        self.origin = position
+
+class SimulatedLink:
+    # One RS485 bus: latency seconds per transaction plus the character time at baud (None: no limit).
+    # A noisy bus loses dropRate of the responses and cuts garbleRate of them short.
+    def __init__(self, latency=0.0, baud=None, sleep=time.sleep, dropRate=0.0, garbleRate=0.0, rng=None):
+        self.latency = latency
+        self.baud = baud
+        self.sleep = sleep
+        self.dropRate = dropRate
+        self.garbleRate = garbleRate
+        self.random = rng if rng is not None else random.Random()
+        self.transactions = 0
+        self.charactersSent = 0
+        self.charactersReceived = 0
+
+    def TransferTime(self, sent, received):
+        seconds = self.latency
+        if self.baud:
+            seconds += (sent + received) * BITS_PER_CHARACTER / float(self.baud)
+        return seconds
+
+    def Transfer(self, sent, response, wait=0.0, limit=None):
+        # The response as the host receives it: "" if lost or not complete within limit seconds.
+        # Takes at least wait seconds (the write delay of SendTimedCommand).
+        self.transactions += 1
+        self.charactersSent += sent
+        seconds = self.TransferTime(sent, len(response))
+        if limit is not None and seconds > limit:
+            seconds, response = limit, ""
+        elif response and self.dropRate and self.random.random() < self.dropRate:
+            response = ""
+        elif response and self.garbleRate and self.random.random() < self.garbleRate:
+            response = response[:len(response) // 2]
+        seconds = max(seconds, wait)
+        if seconds > 0:
+            self.sleep(seconds)
+        self.charactersReceived += len(response)
+        return response
+
+class SimulatedDrive:
+    def __init__(self, address, clock, firmware="5.12.3"):
+        self.address = address
+        self.firmware = firmware
+        self.axis = SimulatedAxis(clock)
+        self.values = {
+            'e': ["4000", "0"], 'h': ["0"], 't': ["3"], 'm': ["1.20", "0.85", "0.032"], 'r': ["0"],
+            'c': ["10"], 'p': ["100000", "1000000", "1000000"], 'g': ["80", "4", "20"], 'n': ["0"],
+            'k': ["0", "-1000000", "1000000", "500", "2000"], 'f': ["0"], 's': [""],
+        }
+        self.inputs = "0000"
+        self.outputs = "0000"
+        self.programs = {}          # name -> [lines]
+        self.label = ""
+
+    def Read(self, letter):
+        # Values for a read command letter, None for letters the drive does not answer
+        if letter == 'v':
+            return [self.firmware]
+        if letter == 'a':
+            return [str(self.address)]
+        if letter == 'l':
+            position, velocity, _ = self.axis.State()
+            return [_Format(position), _Format(velocity)]
+        if letter == 'o':
+            return ["1" if self.axis.IsMoving() else "0"]
+        if letter == 'i':
+            return [self.inputs, self.outputs]
+        if letter == 'x':
+            return ["0"]
+        return self.values.get(letter)
+
+    def Write(self, letter, params, dll):
+        # Applies a write command; False for letters the drive does not know
+        profile = [float(v) for v in self.values['p']]
+        if letter in ('E', 'H', 'T', 'J', 'R', 'G', 'W', 'Y', 'V'):
+            target = {'E': 'e', 'H': 'h', 'T': 't', 'J': 'm', 'R': 'r', 'G': 'g', 'W': 'p', 'Y': 's', 'V': 'n'}[letter]
+            self.values[target] = params.split(",")
+        elif letter == 'L':
+            self.values['k'][0:3] = (params.split(",") + ["", "", ""])[:3]
+        elif letter == 'C':
+            self.values['k'][3] = params.split(",")[0]
+        elif letter == 'B':
+            self.values['k'][4] = params.split(",")[0]
+        elif letter == 'M':
+            target, velocity, acceleration, deceleration = _Numbers(params, [self.axis.Position()] + profile)
+            self.axis.MoveTo(target, velocity, acceleration, deceleration)
+        elif letter == 'I':
+            distance, velocity, acceleration, deceleration = _Numbers(params, [0.0] + profile)
+            self.axis.MoveBy(distance, velocity, acceleration, deceleration)
+        elif letter == 'S':
+            velocity, acceleration = _Numbers(params, [0.0, profile[1]])
+            self.axis.GoAtSpeed(velocity, acceleration)
+        elif letter in ('Z', 'D'):
+            self.axis.Stop()
+        elif letter == 'O':
+            self.axis.SetOrigin(_Numbers(params, [0.0])[0])
+        elif letter == 'U':
+            self.outputs = params
+        elif letter == 'N':
+            self.inputs = params
+        elif letter == 'K':
+            self.label = params
+        elif letter == 'X':
+            for line in self.programs.get(params, [])[1:]:
+                if line:
+                    dll._Dispatch(self, line[0], line[1:])
+        else:
+            return False
+        return True
+
+class SimulatedDLL:
+    # ports: {port name: addresses} (default one port "COM1" with address 1). latency and baud apply to
+    # every port's link unless changed through Link(port).
+    def __init__(self, ports=None, latency=0.0, baud=None, clock=time.monotonic, sleep=time.sleep):
+        if ports is None:
+            ports = {"COM1": (1,)}
+        self.clock = clock
+        self.buses = {}             # port -> {address: SimulatedDrive}
+        self.links = {}             # port -> SimulatedLink
+        for port, addresses in ports.items():
+            self.AddPort(port, addresses, latency, baud, sleep)
+        self.openPort = None
+        self.currentAddress = ""
+        self.downloading = None     # drives and program lines of a download in progress
+        self.lock = threading.RLock()
+        self.commands = {c.letter: c for c in SIMULATED_COMMANDS}
+        self.byName = {c.name: c for c in SIMULATED_COMMANDS}
+        self.initialized = False
+        for c in SIMULATED_COMMANDS:
+            setattr(self, c.function, self._Exported(c))
+        for name in NO_ARGUMENT_FUNCTIONS:
+            setattr(self, name, self._NoArguments(name))
+        for name in ACCEPTED_FUNCTIONS:
+            setattr(self, name, self._Accepted(name))
+
+    def AddPort(self, port, addresses, latency=0.0, baud=None, sleep=time.sleep):
+        self.buses[port] = {address: SimulatedDrive(address, self.clock) for address in addresses}
+        self.links[port] = SimulatedLink(latency, baud, sleep)
+
+    def Drive(self, port, address):
+        return self.buses[port][address]
+
+    def Link(self, port):
+        return self.links[port]
+
+    #region Bus access
+    def _Targets(self):
+        # Drives addressed by the current address on the open port (all of them when broadcasting)
+        bus = self.buses.get(self.openPort)
+        if bus is None:
+            return []
+        if self.currentAddress == "":
+            return [bus[address] for address in sorted(bus)]
+        drive = bus.get(self.currentAddress)
+        return [drive] if drive is not None else []
+
+    def _Transfer(self, sent, response, wait=0.0, limit=None):
+        link = self.links.get(self.openPort)
+        if link is None:
+            return response
+        return link.Transfer(sent, response, wait, limit)
+
+    def _Dispatch(self, drive, letter, params):
+        # One command to one drive; the framed response text ("" if none)
+        if letter.islower():
+            values = drive.Read(letter)
+            return "" if values is None else "`" + letter + ",".join(values) + RESPONSE_TRAILER
+        return "`" + letter + RESPONSE_TRAILER if drive.Write(letter, params, self) else ""
+
+    def _Command(self, letter, params, wait=0.0, limit=None):
+        # Sends a command on the bus; reads are answered by the first addressed drive
+        with self.lock:
+            self.downloading = None
+            targets = self._Targets()
+            response = ""
+            for drive in targets:
+                answer = self._Dispatch(drive, letter, params)
+                response = response or answer
+                if letter.islower():
+                    break
+            if self.openPort is not None:
+                response = self._Transfer(len(letter) + len(params) + len(self.currentAddress and "#000") + 1,
+                                          response, wait, limit)
+            return response
+    #endregion
+
+    #region Communications
+    def OpenSerial(self, port):
+        with self.lock:
+            port = _Text(port)
+            if port not in self.buses:
+                return 0
+            self.openPort = port
+            return 1
+
+    def CloseSerial(self):
+        with self.lock:
+            self.openPort = None
+            return True
+
+    def IsSerialOpen(self):
+        return self.openPort is not None
+
+    def SetCurrentAddress(self, address, length):
+        with self.lock:
+            text = _Text(address)[:length].lstrip("#")
+            address = int(text) if text else ""
+            #Program lines sent to another drive start a new download
+            if address != self.currentAddress:
+                self.downloading = None
+            self.currentAddress = address
+
+    def GetAddresses(self, addressList):
+        with self.lock:
+            bus = self.buses.get(self.openPort, {})
+            self._Transfer(NUMBER_OF_ADDRESSES, " " * (2 * len(bus)))
+            for i in range(NUMBER_OF_ADDRESSES):
+                addressList[i] = 1 if i in bus else 0
+    #endregion
+
+    #region Drive commands
+    def _Exported(self, command):
+        if command.letter.islower():
+            def read(buf, size):
+                _Fill(buf, size, self._Command(command.letter, ""))
+            return read
+
+        def write(params, length):
+            return bool(self._Command(command.letter, _Text(params)[:length]))
+        return write
+
+    def _NoArguments(self, name):
+        def call():
+            self._Command("", "")
+        return call
+
+    def _Accepted(self, name):
+        def call(params, length):
+            self._Command("", "")
+            return True
+        return call
+
+    def SendCommand(self, command, buf, size):
+        text = _Text(command)
+        _Fill(buf, size, self._Command(text[:1], text[1:]) if text else "")
+
+    def SendTimedCommand(self, command, buf, size, writeDelay, readDelay):
+        # Waits writeDelay ms after sending, then up to readDelay ms more; a later response is lost
+        text = _Text(command)
+        response = self._Command(text[:1], text[1:], writeDelay / 1000.0, (writeDelay + readDelay) / 1000.0) if text else ""
+        _Fill(buf, size, response)
+
+    def GetNVParameter(self, params, buf, size):
+        _Fill(buf, size, self._Command("", "") or "`q0" + RESPONSE_TRAILER)
+        return True
+
+    def IsValidPassword(self, params, buf, size):
+        _Fill(buf, size, "1")
+        return True
+
+    def DownloadProgram(self, params, buf, size):
+        with self.lock:
+            lines = _Text(params).replace("\r\n", "\n").replace("\r", "\n").split("\n")
+            downloading = self.downloading
+            self._Command("", "")
+            if downloading is None:
+                downloading = (self._Targets(), [])
+            downloading[1].extend(line for line in lines if line)
+            for drive in downloading[0]:
+                if downloading[1]:
+                    drive.programs[downloading[1][0]] = list(downloading[1])
+            self.downloading = downloading
+            _Fill(buf, size, "`P" + RESPONSE_TRAILER)
+            return True
+
+    def RecallProgram(self, params, buf, size):
+        with self.lock:
+            targets = self._Targets()
+            self._Command("", "")
+            lines = targets[0].programs.get(_Text(params), []) if targets else []
+            _Fill(buf, size, "`P" + "\n".join(lines) + RESPONSE_TRAILER)
+            return True
+
+    def GetListProgramNames(self, buf, size):
+        with self.lock:
+            targets = self._Targets()
+            self._Command("", "")
+            _Fill(buf, size, "  ".join(targets[0].programs) if targets else "")
+
+    def DeleteProgram(self, params, length):
+        with self.lock:
+            for drive in self._Targets():
+                drive.programs.pop(_Text(params)[:length], None)
+            self._Command("", "")
+            return True
+
+    def UpdateFirmware(self, doubleCheck):
+        return bool(getattr(doubleCheck, 'value', doubleCheck))
+
+    def RestoreFactoryDefaults(self, doubleCheck):
+        if not getattr(doubleCheck, 'value', doubleCheck):
+            return False
+        with self.lock:
+            for drive in self._Targets():
+                drive.values = SimulatedDrive(drive.address, self.clock).values
+            return True
+    #endregion
+
+    #region Command info commands (no drive interaction)
+    def InitializeCommandSet(self):
+        self.initialized = True
+
+    def _Find(self, name):
+        # Descriptive name ("Move To Position") only, like the DLL; "MoveToPosition" is not found
+        return self.byName.get(name)
+
+    def GetCommandList(self, buf):
+        _Fill(buf, len(buf), ",".join(c.name for c in SIMULATED_COMMANDS))
+
+    def GetCommandName(self, letter, buf, size):
+        command = self.commands.get(_Text(letter))
+        _Fill(buf, size, command.name if command else "")
+
+    def GetCommandLetterFromDescriptive(self, name, buf, size):
+        command = self._Find(_Text(name))
+        _Fill(buf, size, command.letter if command else "")
+
+    def GetParameterList(self, letter, buf, size):
+        command = self.commands.get(_Text(letter))
+        _Fill(buf, size, ",".join(command.parameters) if command else "")
+
+    def GetOutputFieldList(self, letter, buf, size):
+        command = self.commands.get(_Text(letter))
+        _Fill(buf, size, ",".join(command.outputs) if command else "")
+
+    def GetNumberOfParametersDesc(self, name):
+        command = self._Find(_Text(name))
+        return len(command.parameters) if command else 0
+
+    def GetNumberOfOutputsDesc(self, name):
+        command = self._Find(_Text(name))
+        return len(command.outputs) if command else 0
+    #endregion
+
+class SimulatedLibrary:
+    # Picklable recipe for a SimulatedDLL, for code that loads the library in another process
+    # (IDEADrvFleet): calling it builds a fresh SimulatedDLL with these ports and link settings.
+    def __init__(self, ports=None, latency=0.0, baud=None):
+        self.ports = ports
+        self.latency = latency
+        self.baud = baud
+
+    def __call__(self):
+        return SimulatedDLL(self.ports, self.latency, self.baud)
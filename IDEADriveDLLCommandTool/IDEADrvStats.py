@@ -0,0 +1,178 @@
+# Name:           IDEADrvStats.py
+# Environment:    Python 3.11
+# File Type:      Object class
+# Description:    Opt-in instrumentation of DLL calls. When an Instrumentation is attached to a DLLPrototypes
+#                 (IDEADrv.EnableInstrumentation) every DLL function is bound through a timing wrapper that
+#                 records call counts, a latency histogram (p50/p99/max), bytes passed in and read back,
+#                 and error and timeout counts per function; the fixed sleeps in OpenComms/CloseComms are
+#                 recorded the same way. When none is attached the functions are bound without a wrapper,
+#                 so a disabled instrumentation costs nothing per call. Stats export as a dict, JSON or
+#                 Prometheus text.
+
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+from ctypes import Array, c_char
+
+HISTOGRAM_BUCKETS_PER_OCTAVE = 4
+HISTOGRAM_MIN = 1e-6            # seconds, lower edge of the first bucket
+HISTOGRAM_BUCKETS = 112         # 1 us .. ~270 s
+
+def BucketIndex(seconds):
+    if seconds <= HISTOGRAM_MIN:
+        return 0
+    index = int(math.log2(seconds / HISTOGRAM_MIN) * HISTOGRAM_BUCKETS_PER_OCTAVE) + 1
+    return min(index, HISTOGRAM_BUCKETS - 1)
+
+def BucketUpperBound(index):
+    return HISTOGRAM_MIN * 2 ** (index / HISTOGRAM_BUCKETS_PER_OCTAVE)
+
+class CallStats:
+    __slots__ = ('name', 'calls', 'errors', 'timeouts', 'bytesIn', 'bytesOut', 'total', 'max', 'buckets')
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.bytesIn = 0
+        self.bytesOut = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * HISTOGRAM_BUCKETS
+
+    def Add(self, elapsed, bytesIn=0, bytesOut=0, error=False, timeout=False):
+        self.calls += 1
+        self.total += elapsed
+        if elapsed > self.max:
+            self.max = elapsed
+        self.buckets[BucketIndex(elapsed)] += 1
+        self.bytesIn += bytesIn
+        self.bytesOut += bytesOut
+        if error:
+            self.errors += 1
+        if timeout:
+            self.timeouts += 1
+
+    def Percentile(self, fraction):
+        # Upper bound of the histogram bucket holding the given fraction of calls (within 19%),
+        # never more than the largest latency seen
+        if not self.calls:
+            return 0.0
+        rank = max(1, math.ceil(fraction * self.calls))
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank:
+                return min(BucketUpperBound(index), self.max)
+        return self.max
+
+    def ToDict(self):
+        return {'calls': self.calls, 'errors': self.errors, 'timeouts': self.timeouts,
+                'bytesIn': self.bytesIn, 'bytesOut': self.bytesOut,
+                'total': self.total, 'mean': self.total / self.calls if self.calls else 0.0,
+                'p50': self.Percentile(0.5), 'p99': self.Percentile(0.99), 'max': self.max}
+
+class Instrumentation:
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.stats = {}             # function name -> CallStats
+        self.lock = threading.Lock()
+        self.startedAt = clock()
+
+    def Stats(self, name):
+        with self.lock:
+            stats = self.stats.get(name)
+            if stats is None:
+                stats = self.stats[name] = CallStats(name)
+            return stats
+
+    def Record(self, name, elapsed, bytesIn=0, bytesOut=0, error=False, timeout=False):
+        stats = self.Stats(name)
+        with self.lock:
+            stats.Add(elapsed, bytesIn, bytesOut, error, timeout)
+
+    #Timing wrapper for one DLL function. Bytes in are the bytes arguments, bytes out the text the DLL
+    #left in char buffer arguments; a call that left its buffer empty got no answer and is a timeout.
+    #Other ctypes arrays (the c_int address list of GetAllAvailableAddresses) are not measured.
+    def Wrap(self, name, func):
+        stats = self.Stats(name)
+        lock = self.lock
+        clock = self.clock
+
+        def call(*args):
+            bytesIn = 0
+            for arg in args:
+                if arg.__class__ is bytes:
+                    bytesIn += len(arg)
+            start = clock()
+            try:
+                result = func(*args)
+            except BaseException:
+                elapsed = clock() - start
+                with lock:
+                    stats.Add(elapsed, bytesIn, error=True)
+                raise
+            elapsed = clock() - start
+            bytesOut = 0
+            timeout = False
+            for arg in args:
+                if isinstance(arg, Array) and arg._type_ is c_char:
+                    length = len(arg.value)
+                    bytesOut += length
+                    timeout = length == 0
+            with lock:
+                stats.Add(elapsed, bytesIn, bytesOut, timeout=timeout)
+            return result
+        call.__name__ = getattr(func, '__name__', name)
+        return call
+
+    @contextmanager
+    def Time(self, name):
+        # with instrumentation.Time("OpenComms.sleep"): ...
+        start = self.clock()
+        try:
+            yield
+        finally:
+            self.Record(name, self.clock() - start)
+
+    def Reset(self):
+        with self.lock:
+            self.stats.clear()
+            self.startedAt = self.clock()
+
+    def Snapshot(self):
+        # {function name: {calls, errors, timeouts, bytesIn, bytesOut, total, mean, p50, p99, max}}
+        with self.lock:
+            return {name: stats.ToDict() for name, stats in sorted(self.stats.items()) if stats.calls}
+
+    def ToJSON(self, indent=1):
+        return json.dumps({'elapsed': self.clock() - self.startedAt, 'functions': self.Snapshot()}, indent=indent)
+
+    def ToPrometheus(self, prefix="ideadrv_dll"):
+        snapshot = self.Snapshot()
+        lines = []
+        counters = (('calls', 'calls_total', 'DLL calls'),
+                    ('errors', 'errors_total', 'DLL calls that raised'),
+                    ('timeouts', 'timeouts_total', 'DLL calls that returned no response'),
+                    ('bytesIn', 'bytes_in_total', 'Bytes passed to the DLL'),
+                    ('bytesOut', 'bytes_out_total', 'Bytes returned by the DLL'))
+        for key, metric, description in counters:
+            lines.append("# HELP %s_%s %s" % (prefix, metric, description))
+            lines.append("# TYPE %s_%s counter" % (prefix, metric))
+            for name, stats in snapshot.items():
+                lines.append('%s_%s{function="%s"} %d' % (prefix, metric, name, stats[key]))
+        lines.append("# HELP %s_call_seconds DLL call latency" % prefix)
+        lines.append("# TYPE %s_call_seconds summary" % prefix)
+        for name, stats in snapshot.items():
+            lines.append('%s_call_seconds{function="%s",quantile="0.5"} %.9f' % (prefix, name, stats['p50']))
+            lines.append('%s_call_seconds{function="%s",quantile="0.99"} %.9f' % (prefix, name, stats['p99']))
+            lines.append('%s_call_seconds_sum{function="%s"} %.9f' % (prefix, name, stats['total']))
+            lines.append('%s_call_seconds_count{function="%s"} %d' % (prefix, name, stats['calls']))
+        lines.append("# HELP %s_call_seconds_max Slowest DLL call" % prefix)
+        lines.append("# TYPE %s_call_seconds_max gauge" % prefix)
+        for name, stats in snapshot.items():
+            lines.append('%s_call_seconds_max{function="%s"} %.9f' % (prefix, name, stats['max']))
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,353 @@
+# Name:           IDEADrvTelemetry.py
+# Environment:    Python 3.11
+# File Type:      Object class
+# Description:    Background telemetry for one IDEADrv. A TelemetryStreamer polls a set of getters
+#                 (GetPositionVelocity, GetIOReading, GetFaultReading, ...) at a target rate on its own
+#                 thread, parses every response into numbers and stores timestamped rows in a
+#                 preallocated TelemetryRing (a flat array('d'), no per-sample lists). Consumers read
+#                 zero-copy memoryviews (or NumPy views when NumPy is installed), the latest rows, or
+#                 iterate new samples as they arrive. Stats() reports the achieved rate and how many
+#                 sample slots were dropped because the serial link could not keep up. MinMaxHistory
+#                 keeps rows at several resolutions (min/max summaries of 16, 256, ... rows, each level
+#                 a fixed size ring) so a plot can be decimated to min/max per pixel column in time
+#                 proportional to its width, whatever span of history it shows.
+
+import array
+import bisect
+import math
+import threading
+import time
+
+from IDEADrvParser import ResponseValues
+
+DEFAULT_GETTERS = ("GetPositionVelocity", "GetIOReading", "GetFaultReading")
+SUMMARY_FACTOR = 16             # rows per summary block, and blocks per block of the next level
+SUMMARY_LEVELS = 4
+POINTS_PER_COLUMN = 8           # most rows or blocks Decimate reads per pixel column
+
+def SampleValue(value):
+    # Numbers (including digit patterns such as "0101") as float, anything else NaN
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+class TelemetryRing:
+    # Fixed size ring of rows (timestamp, channel values...) stored in one flat array('d')
+    def __init__(self, channels, capacity):
+        self.channels = tuple(channels)
+        self.width = len(self.channels) + 1
+        self.capacity = capacity
+        self.data = array.array('d', bytes(8 * self.width * capacity))
+        self.head = 0           # next row to write
+        self.count = 0          # rows currently held
+        self.total = 0          # rows ever written
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return self.count
+
+    def Append(self, timestamp, values):
+        with self.lock:
+            data = self.data
+            row = self.head * self.width
+            data[row] = timestamp
+            for i, value in enumerate(values, row + 1):
+                data[i] = value
+            self.head = (self.head + 1) % self.capacity
+            if self.count < self.capacity:
+                self.count += 1
+            self.total += 1
+
+    def Views(self):
+        # Zero-copy memoryviews over the held rows, oldest first (one or two segments). Each segment is
+        # flat: timestamp, channel 0, channel 1, ... per row. Rows are overwritten as the ring wraps.
+        data = memoryview(self.data)
+        with self.lock:
+            split = self.head * self.width
+            if self.count < self.capacity:
+                return (data[:split],)
+            return (data[split:], data[:split])
+
+    def NumpyViews(self):
+        # Same segments as Views() as (rows, width) NumPy arrays sharing the ring's memory
+        import numpy
+        return tuple(numpy.frombuffer(view, dtype=numpy.float64).reshape(-1, self.width) for view in self.Views())
+
+    def Row(self, index):
+        # index 0 is the oldest held row, -1 the newest
+        with self.lock:
+            if index < 0:
+                index += self.count
+            if not 0 <= index < self.count:
+                raise IndexError("telemetry row out of range")
+            start = ((self.head - self.count + index) % self.capacity) * self.width
+            return tuple(self.data[start:start + self.width])
+
+    def Latest(self, n=1):
+        n = min(n, self.count)
+        return [self.Row(i) for i in range(-n, 0)]
+
+    def RowsSince(self, total):
+        # Rows written after the ring had written `total` rows in all. Returns (rows, newTotal).
+        with self.lock:
+            newTotal = self.total
+            available = min(newTotal - total, self.count)
+            rows = []
+            for i in range(self.count - available, self.count):
+                start = ((self.head - self.count + i) % self.capacity) * self.width
+                rows.append(tuple(self.data[start:start + self.width]))
+        return rows, newTotal
+
+    def Column(self, name):
+        # Copy of one channel ("timestamp" or a channel name) in time order
+        offset = 0 if name == "timestamp" else self.channels.index(name) + 1
+        column = array.array('d')
+        for view in self.Views():
+            column.extend(view[offset::self.width])
+        return column
+
+def _Lower(a, b):
+    # min/max that skip NaN
+    return b if a != a or b < a else a
+
+def _Higher(a, b):
+    return b if a != a or b > a else a
+
+class MinMaxHistory:
+    # Telemetry rows for plotting: the newest rows as they are (raw), plus SUMMARY_LEVELS rings of
+    # blocks holding the first and last timestamp and the min and max of every channel over
+    # SUMMARY_FACTOR ** (level + 1) rows. Every ring has a fixed capacity, so memory is fixed while the
+    # coarsest level spans capacity * 16 ** 4 rows (about 13 days at 100 Hz with the default capacity).
+    def __init__(self, channels, capacity=65536, factor=SUMMARY_FACTOR, levels=SUMMARY_LEVELS):
+        self.channels = tuple(channels)
+        self.factor = factor
+        self.raw = TelemetryRing(self.channels, capacity)
+        summary = ["end"] + [c + ".min" for c in self.channels] + [c + ".max" for c in self.channels]
+        self.levels = [TelemetryRing(summary, capacity) for _ in range(levels)]
+        self.pending = [None] * levels      # per level: [start, end, blocks, mins, maxs] being summarized
+
+    def __len__(self):
+        return self.raw.total
+
+    def Append(self, timestamp, values):
+        values = list(values)
+        self.raw.Append(timestamp, values)
+        if self.levels:
+            self._Summarize(0, timestamp, timestamp, values, values)
+
+    def _Summarize(self, level, start, end, mins, maxs):
+        block = self.pending[level]
+        if block is None:
+            block = self.pending[level] = [start, end, 0, list(mins), list(maxs)]
+        else:
+            block[1] = end
+            low, high = block[3], block[4]
+            for i in range(len(low)):
+                low[i] = _Lower(low[i], mins[i])
+                high[i] = _Higher(high[i], maxs[i])
+        block[2] += 1
+        if block[2] == self.factor:
+            self.pending[level] = None
+            self.levels[level].Append(block[0], [block[1]] + block[3] + block[4])
+            if level + 1 < len(self.levels):
+                self._Summarize(level + 1, block[0], block[1], block[3], block[4])
+
+    def _Sources(self):
+        return [self.raw] + self.levels
+
+    def _Columns(self, level, channel):
+        # Offsets of (end, low, high) in a row of the given source
+        ring = self._Sources()[level]
+        if level == 0:
+            return ring, 0, channel + 1, channel + 1
+        count = len(self.channels)
+        return ring, 1, channel + 2, channel + 2 + count
+
+    def _Count(self, ring, t0, t1):
+        count = 0
+        for view in ring.Views():
+            times = view[0::ring.width]
+            count += bisect.bisect_right(times, t1) - bisect.bisect_left(times, t0)
+        return count
+
+    def _Level(self, t0, t1, columns):
+        # Finest source that reaches back to t0 with at most POINTS_PER_COLUMN entries per column
+        limit = columns * POINTS_PER_COLUMN
+        chosen = 0
+        for level, ring in enumerate(self._Sources()):
+            if not len(ring):
+                break
+            chosen = level
+            reaches = len(ring) < ring.capacity or ring.Row(0)[0] <= t0
+            if reaches and self._Count(ring, t0, t1) <= limit:
+                break
+        return chosen
+
+    #Min and max of channel (name or index) per pixel column over t0..t1 as two lists (NaN where a column
+    #has no samples). Older parts come from the chosen summary level, rows newer than its last block
+    #from the finer levels and the raw ring.
+    def Decimate(self, channel, t0, t1, columns):
+        if not isinstance(channel, int):
+            channel = self.channels.index(channel)
+        mins = [math.nan] * columns
+        maxs = [math.nan] * columns
+        if columns <= 0 or t1 <= t0:
+            return mins, maxs
+        scale = columns / (t1 - t0)
+        after = None
+        for level in range(self._Level(t0, t1, columns), -1, -1):
+            ring, endOffset, lowOffset, highOffset = self._Columns(level, channel)
+            width = ring.width
+            last = None
+            for view in ring.Views():
+                times = view[0::width]
+                ends = view[endOffset::width]
+                lows = view[lowOffset::width]
+                highs = view[highOffset::width]
+                if after is None:
+                    first = bisect.bisect_left(times, t0)
+                    if first and ends[first - 1] >= t0:
+                        first -= 1
+                else:
+                    first = bisect.bisect_right(times, after)
+                stop = bisect.bisect_right(times, t1)
+                for i in range(first, stop):
+                    #A block covers every column between its first and last row
+                    column = max(0, int((times[i] - t0) * scale))
+                    lastColumn = min(columns - 1, int((min(ends[i], t1) - t0) * scale))
+                    low = lows[i]
+                    high = highs[i]
+                    for column in range(min(column, columns - 1), lastColumn + 1):
+                        mins[column] = _Lower(mins[column], low)
+                        maxs[column] = _Higher(maxs[column], high)
+                if len(ends):
+                    last = ends[len(ends) - 1]
+            if last is not None and (after is None or last > after):
+                after = last
+        return mins, maxs
+
+class TelemetryStreamer:
+    def __init__(self, drive, getters=DEFAULT_GETTERS, rate=100.0, capacity=100000,
+                 clock=time.perf_counter, timestamp=time.time):
+        self.drive = drive
+        self.getters = tuple(getters)
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.timestamp = timestamp
+        self.ring = None
+        self.widths = ()
+        self.samples = 0
+        self.dropped = 0
+        self.errors = 0
+        self.lastError = None
+        self.startedAt = None
+        self.stoppedAt = None
+        self._stop = threading.Event()
+        self._newSample = threading.Condition()
+        self._thread = None
+
+    def _Read(self):
+        # One response per getter, read with the drive's address held
+        with self.drive.Transaction(self.drive.IDriveAddress):
+            return [getattr(self.drive, getter)() for getter in self.getters]
+
+    def _Channels(self, responses):
+        channels = []
+        widths = []
+        for getter, response in zip(self.getters, responses):
+            count = max(1, len(ResponseValues(response)))
+            widths.append(count)
+            channels.extend(getter + "." + str(i) for i in range(count))
+        return channels, tuple(widths)
+
+    def _Values(self, responses):
+        values = []
+        for width, response in zip(self.widths, responses):
+            parsed = ResponseValues(response)[:width]
+            values.extend(SampleValue(v) for v in parsed)
+            values.extend([math.nan] * (width - len(parsed)))
+        return values
+
+    def Start(self):
+        # The first sample fixes the channel layout (number of values returned by each getter)
+        if self._thread is not None:
+            return self
+        responses = self._Read()
+        channels, self.widths = self._Channels(responses)
+        self.ring = TelemetryRing(channels, self.capacity)
+        self._stop.clear()
+        self.startedAt = self.clock()
+        self.stoppedAt = None
+        self._Store(self._Values(responses))
+        self._thread = threading.Thread(target=self._Run, name="IDEADrvTelemetry", daemon=True)
+        self._thread.start()
+        return self
+
+    def Stop(self):
+        self._stop.set()
+        if self._thread is not None and threading.current_thread() is not self._thread:
+            self._thread.join()
+        self._thread = None
+        if self.startedAt is not None and self.stoppedAt is None:
+            self.stoppedAt = self.clock()
+
+    def IsRunning(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _Store(self, values):
+        self.ring.Append(self.timestamp(), values)
+        self.samples += 1
+        with self._newSample:
+            self._newSample.notify_all()
+
+    def _Run(self):
+        period = 1.0 / self.rate
+        nextSample = self.startedAt + period
+        while not self._stop.is_set():
+            now = self.clock()
+            if now < nextSample:
+                self._stop.wait(nextSample - now)
+                continue
+            #Sample slots that passed while the last read was still running are dropped
+            missed = int((now - nextSample) / period)
+            if missed:
+                self.dropped += missed
+                nextSample += missed * period
+            nextSample += period
+            try:
+                self._Store(self._Values(self._Read()))
+            except Exception as e:
+                self.errors += 1
+                self.lastError = e
+        with self._newSample:
+            self._newSample.notify_all()
+
+    def Stats(self):
+        end = self.stoppedAt if self.stoppedAt is not None else self.clock()
+        elapsed = end - self.startedAt if self.startedAt is not None else 0.0
+        return {
+            'targetRate': self.rate,
+            'achievedRate': self.samples / elapsed if elapsed > 0 else 0.0,
+            'samples': self.samples,
+            'dropped': self.dropped,
+            'errors': self.errors,
+            'elapsed': elapsed,
+            'channels': self.ring.channels if self.ring else (),
+        }
+
+    def Samples(self, timeout=None):
+        # Yields (timestamp, values...) rows as they arrive until the streamer stops or no sample
+        # arrives within timeout seconds. Rows overwritten before they were read are skipped.
+        total = self.ring.total if self.ring else 0
+        while True:
+            with self._newSample:
+                if self.ring is None or self.ring.total == total:
+                    if self._stop.is_set() or self._thread is None:
+                        return
+                    if not self._newSample.wait(timeout) and timeout is not None:
+                        return
+            rows, total = self.ring.RowsSince(total)
+            for row in rows:
+                yield row
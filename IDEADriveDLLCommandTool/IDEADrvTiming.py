@@ -0,0 +1,265 @@
+# Name:           IDEADrvTiming.py
+# Environment:    Python 3.11
+# File Type:      Object class
+# Description:    Adaptive timing for SendTimedCommand. Instead of the fixed 60/30 ms write and read
+#                 delays, each command letter gets a TimingPolicy learned from its own responses: the round
+#                 trip from the write to the complete response is smoothed (EWMA of the round trip and of
+#                 its deviation, the way TCP estimates round trips). The write delay is the low end of that
+#                 estimate, so the response is hardly ever complete before reading starts, and the read
+#                 delay covers the rest up to its high end plus a margin. A response that was already
+#                 complete when the write delay ended only bounds the round trip from above, so the next
+#                 command of that letter probes with the shortest write delay to measure it again.
+#
+#                 Only read commands (lower case letters) are retried, after a jittered exponential backoff
+#                 with doubled delays; a write or motion command (upper case) is sent exactly once, since a
+#                 lost reply does not mean it was not carried out. A command without a usable response
+#                 raises a CommandTimeoutError or GarbledResponseError listing every attempt.
+#
+#                 The round trip is measured as the call time, which assumes the DLL returns as soon as the
+#                 response is complete and waits at most the read delay for it.
+
+import random
+import threading
+import time
+
+from IDEADrvParser import RESPONSE_HEADER_LEN, RESPONSE_TRAILER_LEN
+
+DEFAULT_WRITE_DELAY = 60        # ms; the former fixed delays, used until a letter has been measured
+DEFAULT_READ_DELAY = 30
+MIN_DELAY = 2                   # ms
+MAX_DELAY = 2000
+DEFAULT_MARGIN = 5              # ms added to the read delay estimate
+ROUND_TRIP_GAIN = 0.125         # weight of a new sample in the round trip EWMA
+DEVIATION_GAIN = 0.25           # weight of a new sample in the deviation EWMA
+DEVIATION_FACTOR = 4            # write delay = round trip - DEVIATION_FACTOR * deviation, read delay up to
+                                # round trip + DEVIATION_FACTOR * deviation + margin
+EARLY_RESPONSE = 1.0            # ms; a call returning sooner than this after the write delay found the
+                                # response already complete
+RETRY_INCREASE = 2              # delay factor for each retry, and read delay factor after a bad response
+DEFAULT_RETRIES = 2
+BACKOFF_BASE = 0.01             # seconds before the first retry, doubled for each one after it
+BACKOFF_MAX = 0.5
+
+EMPTY = "empty"
+GARBLED = "garbled"
+
+def Clamp(delay):
+    return int(min(MAX_DELAY, max(MIN_DELAY, round(delay))))
+
+def FramedResponse(text):
+    # Default check for a complete response: long enough to hold the header and trailer framing
+    return len(text) >= RESPONSE_HEADER_LEN + RESPONSE_TRAILER_LEN
+
+def ResponseProblem(response, validator=FramedResponse):
+    # None for a good response, otherwise EMPTY or GARBLED
+    if isinstance(response, str):
+        text = response
+    else:
+        try:
+            text = str(response, 'UTF-8')
+        except UnicodeDecodeError:
+            return GARBLED
+    if not text.strip():
+        return EMPTY
+    if validator is not None and not validator(text):
+        return GARBLED
+    return None
+
+class CommandAttempt:
+    __slots__ = ('writeDelay', 'readDelay', 'elapsed', 'response', 'problem')
+
+    def __init__(self, writeDelay, readDelay, elapsed, response, problem):
+        self.writeDelay = writeDelay
+        self.readDelay = readDelay
+        self.elapsed = elapsed              # seconds
+        self.response = response
+        self.problem = problem              # None, EMPTY or GARBLED
+
+    def __repr__(self):
+        return "CommandAttempt(%d/%d ms, %.1f ms, %s)" % (self.writeDelay, self.readDelay, self.elapsed * 1000.0,
+                                                         self.problem or "ok")
+
+class CommandError(Exception):
+    # A timed command that got no usable response; attempts lists every try with its delays
+    def __init__(self, command, attempts):
+        self.command = command
+        self.letter = command[:1]
+        self.attempts = list(attempts)
+        self.problem = self.attempts[-1].problem if self.attempts else None
+        Exception.__init__(self, "%s response to %r after %d attempt(s) (delays %s ms)" % (
+            self.problem, command, len(self.attempts),
+            ", ".join("%d/%d" % (a.writeDelay, a.readDelay) for a in self.attempts)))
+
+    def ToDict(self):
+        return {'command': self.command, 'problem': self.problem,
+                'attempts': [{'writeDelay': a.writeDelay, 'readDelay': a.readDelay, 'elapsed': a.elapsed,
+                              'problem': a.problem} for a in self.attempts]}
+
+class CommandTimeoutError(CommandError, TimeoutError):
+    pass
+
+class GarbledResponseError(CommandError):
+    pass
+
+class TimingPolicy:
+    # Delays (ms) for one command letter. fixed pins them (no learning, no longer delays on retries).
+    __slots__ = ('letter', 'roundTrip', 'deviation', 'writeDelay', 'readDelay', 'margin', 'fixed',
+                 'samples', 'failures', 'probes')
+
+    def __init__(self, letter, margin=DEFAULT_MARGIN):
+        self.letter = letter
+        self.roundTrip = None               # ms, EWMA of the time from the write to the complete response
+        self.deviation = 0.0                # ms, EWMA of its absolute deviation
+        self.writeDelay = DEFAULT_WRITE_DELAY
+        self.readDelay = DEFAULT_READ_DELAY
+        self.margin = margin
+        self.fixed = False
+        self.samples = 0
+        self.failures = 0
+        self.probes = 0
+
+    def Delays(self):
+        return self.writeDelay, self.readDelay
+
+    def Fix(self, writeDelay, readDelay):
+        self.writeDelay = Clamp(writeDelay)
+        self.readDelay = Clamp(readDelay)
+        self.fixed = True
+
+    def Success(self, writeDelay, elapsed):
+        # elapsed: seconds the call took with the given write delay
+        self.samples += 1
+        if self.fixed:
+            return
+        sample = elapsed * 1000.0
+        if sample - writeDelay < EARLY_RESPONSE and writeDelay > MIN_DELAY:
+            #The response was waiting when reading started: the round trip is somewhere below writeDelay.
+            #Probe with the shortest write delay, keeping the whole window, to measure it.
+            self.probes += 1
+            high = writeDelay if self.roundTrip is None else max(writeDelay, self.roundTrip + DEVIATION_FACTOR * self.deviation)
+            self.writeDelay = MIN_DELAY
+            self.readDelay = Clamp(high + self.margin - MIN_DELAY)
+            return
+        if self.roundTrip is None:
+            self.roundTrip = sample
+            self.deviation = sample / 2.0
+        else:
+            self.deviation += DEVIATION_GAIN * (abs(sample - self.roundTrip) - self.deviation)
+            self.roundTrip += ROUND_TRIP_GAIN * (sample - self.roundTrip)
+        spread = DEVIATION_FACTOR * self.deviation
+        self.writeDelay = Clamp(self.roundTrip - spread)
+        self.readDelay = Clamp(self.roundTrip + spread + self.margin - self.writeDelay)
+
+    def Failure(self):
+        # No usable response within writeDelay + readDelay: the window was too short (or the reply was
+        # lost), so the read delay is widened until a measured response sets it again
+        self.failures += 1
+        if not self.fixed:
+            self.readDelay = Clamp(self.readDelay * RETRY_INCREASE)
+
+    def ToDict(self):
+        return {'writeDelay': self.writeDelay, 'readDelay': self.readDelay, 'roundTrip': self.roundTrip,
+                'deviation': self.deviation, 'fixed': self.fixed, 'samples': self.samples,
+                'failures': self.failures, 'probes': self.probes}
+
+class AdaptiveTimeouts:
+    # Per command letter TimingPolicy objects and the retry loop around one timed command
+    def __init__(self, retries=DEFAULT_RETRIES, margin=DEFAULT_MARGIN, validator=FramedResponse,
+                 backoff=BACKOFF_BASE, clock=time.perf_counter, sleep=time.sleep, rng=None):
+        self.retries = retries
+        self.margin = margin
+        self.validator = validator
+        self.backoff = backoff
+        self.clock = clock
+        self.sleep = sleep
+        self.random = rng if rng is not None else random.Random()
+        self.policies = {}                  # command letter -> TimingPolicy
+        self.noRetry = set()                # read command letters sent only once
+        self.lock = threading.Lock()
+
+    def Policy(self, letter):
+        with self.lock:
+            policy = self.policies.get(letter)
+            if policy is None:
+                policy = self.policies[letter] = TimingPolicy(letter, self.margin)
+            return policy
+
+    def SetDelays(self, letter, writeDelay, readDelay):
+        # Pins the delays of one command letter
+        policy = self.Policy(letter)
+        with self.lock:
+            policy.Fix(writeDelay, readDelay)
+
+    def Retryable(self, letter):
+        # Only reads are safe to send again; a write or motion command may have been carried out even
+        # though its reply was lost
+        return letter.islower() and letter not in self.noRetry
+
+    def SetRetry(self, letter, enabled):
+        # Turns retries of one read command letter off or back on
+        if enabled and not letter.islower():
+            raise ValueError("write and motion commands are never resent: " + repr(letter))
+        with self.lock:
+            if enabled:
+                self.noRetry.discard(letter)
+            else:
+                self.noRetry.add(letter)
+
+    def Reset(self, letter=None):
+        with self.lock:
+            if letter is None:
+                self.policies.clear()
+            else:
+                self.policies.pop(letter, None)
+
+    def Snapshot(self):
+        # {command letter: {writeDelay, readDelay, roundTrip, deviation, fixed, samples, failures, probes}}
+        with self.lock:
+            return {letter: policy.ToDict() for letter, policy in sorted(self.policies.items())}
+
+    def Backoff(self, retry):
+        # Seconds to wait before retry number retry (1, 2, ...): exponential, jittered by +-50%
+        return min(BACKOFF_MAX, self.backoff * 2 ** (retry - 1)) * (0.5 + self.random.random())
+
+    #Sends commandParameters with send(commandParameters, writeDelay, readDelay) until it gets a good
+    #response or retries run out. Explicit delays are used as given and teach the policy nothing;
+    #retries after them still wait longer. A retry sends the command again, so commands that are not
+    #Retryable get a single attempt whatever retries says.
+    def Send(self, send, commandParameters, writeDelay=None, readDelay=None, retries=None):
+        letter = commandParameters[:1]
+        policy = self.Policy(letter)
+        learn = writeDelay is None and readDelay is None
+        if learn:
+            with self.lock:
+                writeDelay, readDelay = policy.Delays()
+        else:
+            writeDelay = DEFAULT_WRITE_DELAY if writeDelay is None else writeDelay
+            readDelay = DEFAULT_READ_DELAY if readDelay is None else readDelay
+        retries = self.retries if retries is None else retries
+        if not self.Retryable(letter):
+            retries = 0
+        attempts = []
+        for attempt in range(retries + 1):
+            if attempt:
+                self.sleep(self.Backoff(attempt))
+            start = self.clock()
+            try:
+                response = send(commandParameters, writeDelay, readDelay)
+                problem = ResponseProblem(response, self.validator)
+            except UnicodeDecodeError:
+                response, problem = None, GARBLED
+            elapsed = self.clock() - start
+            attempts.append(CommandAttempt(writeDelay, readDelay, elapsed, response, problem))
+            if problem is None:
+                if learn:
+                    with self.lock:
+                        policy.Success(writeDelay, elapsed)
+                return response
+            with self.lock:
+                policy.Failure()
+            if not (learn and policy.fixed):
+                writeDelay = Clamp(writeDelay * RETRY_INCREASE)
+                readDelay = Clamp(readDelay * RETRY_INCREASE)
+        if attempts[-1].problem == EMPTY:
+            raise CommandTimeoutError(commandParameters, attempts)
+        raise GarbledResponseError(commandParameters, attempts)
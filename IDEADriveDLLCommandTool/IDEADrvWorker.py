@@ -0,0 +1,95 @@
+# Name:           IDEADrvWorker.py
+# Environment:    Python 3.11
+# File Type:      Object class
+# Description:    Runs drive operations off the Tk main loop. Jobs submitted to a DriveWorker run one at a
+#                 time on a background thread (the DLL holds a single open port, so they stay in order)
+#                 and their results, errors and progress reports are queued back to the main loop, which
+#                 collects them every few milliseconds with root.after and calls the given callbacks
+#                 there. Widgets are therefore only touched from the main loop, and the window stays
+#                 responsive while any number of jobs are waiting or running.
+
+import queue
+import threading
+
+POLL_INTERVAL = 15          # ms between checks for finished jobs
+
+class DriveWorker:
+    # root: anything with Tk's after(ms, func). onPending(count) is called on the main loop whenever
+    # the number of submitted but unfinished jobs changes; onError(exception) gets the errors of jobs
+    # submitted without a failed callback.
+    def __init__(self, root, onPending=None, onError=None, pollInterval=POLL_INTERVAL):
+        self.root = root
+        self.onPending = onPending
+        self.onError = onError
+        self.pollInterval = pollInterval
+        self.jobs = queue.Queue()
+        self.results = queue.Queue()
+        self.pending = 0
+        self.stopped = False
+        self.thread = threading.Thread(target=self._Run, name="IDEADrvWorker", daemon=True)
+        self.thread.start()
+        self.root.after(self.pollInterval, self._Poll)
+
+    #Queues func(*args) for the worker thread. done(result) or failed(exception) is called on the main
+    #loop when it finishes. With progress given, func also gets a report keyword argument; every
+    #report(value) made on the worker becomes a progress(value) call on the main loop.
+    def Submit(self, func, *args, done=None, failed=None, progress=None):
+        kwargs = {}
+        if progress is not None:
+            kwargs['report'] = lambda value: self.results.put((progress, (value,)))
+        self.pending += 1
+        self._PendingChanged()
+        self.jobs.put((func, args, kwargs, done, failed))
+
+    def Pending(self):
+        return self.pending
+
+    def Stop(self, timeout=5.0):
+        # Lets queued jobs finish (up to timeout seconds), then ends the worker thread
+        if not self.stopped:
+            self.stopped = True
+            self.jobs.put(None)
+            self.thread.join(timeout)
+
+    def _Run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            func, args, kwargs, done, failed = job
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                self.results.put((self._Finished, (failed or self._Failed, e)))
+            else:
+                self.results.put((self._Finished, (done, result)))
+
+    def _Finished(self, callback, value):
+        self.pending -= 1
+        self._PendingChanged()
+        if callback is not None:
+            callback(value)
+
+    def _Failed(self, e):
+        if self.onError is not None:
+            self.onError(e)
+        else:
+            print("Drive operation failed: " + repr(e))
+
+    def _PendingChanged(self):
+        if self.onPending is not None:
+            self.onPending(self.pending)
+
+    def _Poll(self):
+        # Main loop side: runs the callbacks of everything the worker finished since the last poll
+        while True:
+            try:
+                callback, args = self.results.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                callback(*args)
+            except Exception as e:
+                print("DriveWorker callback failed: " + repr(e))
+        if not self.stopped:
+            self.root.after(self.pollInterval, self._Poll)
@@ -0,0 +1,48 @@
+# Name:           test_async.py
+# Environment:    Python 3.11
+# File Type:      Test
+# Description:    AsyncIDEADrv on the simulated drive. Run from the tool folder: python -m pytest Tests
+
+import asyncio
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from IDEADrvAsync import AsyncIDEADrv, SHARED_EXECUTOR_WORKERS
+from IDEADrvCommander import IDEADrv
+from IDEADrvSimulator import SimulatedDLL
+
+class AsyncIDEADrvTest(unittest.TestCase):
+    def setUp(self):
+        self.dll = SimulatedDLL({"COM1": (1, 2)})
+
+    def test_drives_share_one_executor(self):
+        first = IDEADrv("COM1", self.dll, "#001")
+        second = IDEADrv("COM1", self.dll, "#002", dll=first.LoadDLL())
+        drives = [AsyncIDEADrv(first), AsyncIDEADrv(second)]
+        self.assertIs(drives[0].executor, drives[1].executor)
+        self.assertEqual(drives[0].executor._max_workers, SHARED_EXECUTOR_WORKERS)
+
+        async def main():
+            await drives[0].OpenComms()
+            calls = [drive.GetDriveAddress() for _ in range(5) for drive in drives]
+            return await asyncio.gather(*calls, drives[0].SendCommand("v"))
+
+        responses = asyncio.run(main())
+        #Every call went to the address of the drive it was made on
+        self.assertEqual(responses[:-1], ["`a1*000\n", "`a2*000\n"] * 5)
+        self.assertTrue(responses[-1].startswith("`v"))
+        for drive in drives:
+            drive.Close()
+        #The shared executor outlives the drives that used it
+        self.assertFalse(drives[0].executor._shutdown)
+
+    def test_own_executor_closed(self):
+        drive = AsyncIDEADrv(IDEADrv("COM1", self.dll, "#001"), maxWorkers=2)
+        drive.Close()
+        self.assertTrue(drive.executor._shutdown)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+# Name:           test_batch.py
+# Environment:    Python 3.11
+# File Type:      Test
+# Description:    Batched command submission on the simulated drive. Run from the tool folder:
+#                 python -m pytest Tests
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from IDEADrvBatch import BatchElapsed, BatchEntry, BatchErrors
+from IDEADrvCommander import IDEADrv
+from IDEADrvSimulator import SimulatedDLL
+
+class RunBatchTest(unittest.TestCase):
+    def setUp(self):
+        self.dll = SimulatedDLL({"COM1": (1, 2)})
+        self.drive = IDEADrv("COM1", self.dll, "#001")
+        self.drive.OpenComms()
+        self.addCleanup(self.drive.CloseComms)
+
+    def test_entries(self):
+        self.assertEqual(BatchEntry("v"), ("v", None, None))
+        self.assertEqual(BatchEntry(("SetMotorType", "2")), ("SetMotorType", "2", None))
+
+    def test_addresses_and_results(self):
+        instrumentation = self.drive.EnableInstrumentation()
+        results = self.drive.RunBatch([("SetMotorType", "2", 2), ("GetMotorType", None, 2), ("a", None, 2),
+                                       ("SetMotorType", "1"), ("a",)])
+        self.drive.DisableInstrumentation()
+        self.assertEqual([r.response for r in results], [True, "`t2*000\n", "`a2*000\n", True, "`a2*000\n"])
+        self.assertEqual(self.dll.Drive("COM1", 2).values['t'], ["1"])
+        self.assertEqual(self.dll.Drive("COM1", 1).values['t'], ["3"])
+        #One address change for the batch, one back to the drive's own address afterwards
+        self.assertEqual(instrumentation.Snapshot()['SetCurrentAddress']['calls'], 2)
+        self.assertEqual(self.drive.IDriveAddress, "#001")
+        self.assertEqual(BatchErrors(results), [])
+        self.assertGreater(BatchElapsed(results), 0.0)
+
+    def test_stop_on_error(self):
+        entries = [("GetMotorType",), ("Failing", "1"), ("GetMotorType",)]
+        self.drive.Failing = lambda params: 1 / 0
+        results = self.drive.RunBatch(entries, stopOnError=True)
+        self.assertIsInstance(results[1].error, ZeroDivisionError)
+        self.assertEqual([r.Ok() for r in results], [True, False, True])
+        self.assertIsNone(results[2].response)
+        results = self.drive.SubmitBatch(entries).result(timeout=10)
+        self.assertEqual(results[2].response, "`t3*000\n")
+
+if __name__ == "__main__":
+    unittest.main()
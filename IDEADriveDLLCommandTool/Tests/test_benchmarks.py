@@ -0,0 +1,51 @@
+# Name:           test_benchmarks.py
+# Environment:    Python 3.11
+# File Type:      Test
+# Description:    The benchmark suite's measurements and regression check, on a short simulated run.
+#                 Run from the tool folder: python -m pytest Tests
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Benchmarks"))
+
+import BenchmarkSuite
+from IDEADrvCommander import IDEADrv
+
+class BenchmarkSuiteTest(unittest.TestCase):
+    def test_percentile(self):
+        values = list(range(101))
+        self.assertEqual(BenchmarkSuite.Percentile(values, 0.5), 50)
+        self.assertEqual(BenchmarkSuite.Percentile(values, 0.99), 99)
+        self.assertEqual(BenchmarkSuite.Percentile([], 0.5), 0.0)
+
+    def test_compare_flags_regressions(self):
+        baseline = {'results': {'fast': {'opsPerSec': 1000.0}, 'slow': {'opsPerSec': 1000.0}}}
+        results = {'results': {'fast': {'opsPerSec': 950.0}, 'slow': {'opsPerSec': 500.0},
+                               'new': {'opsPerSec': 10.0}}}
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(BenchmarkSuite.Compare(results, baseline, 0.15), ['slow'])
+
+    def test_cases_run(self):
+        args = argparse.Namespace(backend="simulated", latency=0.0, baud=None, drives=2, iterations=10, lib=None)
+        drive = IDEADrv(BenchmarkSuite.PORT, BenchmarkSuite.MakeBackend(args), "#001")
+        drive.OpenComms()
+        self.addCleanup(drive.CloseComms)
+        drive.InitializeCommandSet()
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = {name: BenchmarkSuite.Run(name, func, iterations, repeat=1, warmup=1)
+                       for name, func, iterations in BenchmarkSuite.Cases(drive, args)}
+        self.assertEqual(len(results), 8)
+        for result in results.values():
+            self.assertGreater(result['opsPerSec'], 0.0)
+            self.assertLessEqual(result['p50us'], result['p99us'])
+            self.assertLessEqual(result['p99us'], result['maxus'])
+        self.assertEqual(drive.IDriveAddress, "#001")
+
+if __name__ == "__main__":
+    unittest.main()
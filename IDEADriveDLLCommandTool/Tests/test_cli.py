@@ -0,0 +1,63 @@
+# Name:           test_cli.py
+# Environment:    Python 3.11
+# File Type:      Test
+# Description:    Script parsing and running of IDEADrvCLI on the simulated drive. Run from the tool folder:
+#                 python -m pytest Tests
+
+import io
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from IDEADrvCLI import CaptureWriter, ParseScript, ScriptError, ScriptRunner
+from IDEADrvCommander import IDEADrv
+from IDEADrvSimulator import SimulatedDLL
+
+class ParseScriptTest(unittest.TestCase):
+    def test_raw_write_commands(self):
+        steps = ParseScript(["M1000", "Z", "v", "MoveToPosition 10000,1"])
+        self.assertEqual([(s.kind, s.command, s.params) for s in steps],
+                         [("call", "M1000", None), ("call", "Z", None), ("call", "v", None),
+                          ("call", "MoveToPosition", "10000,1")])
+
+    def test_unbalanced_repeat(self):
+        with self.assertRaises(ScriptError):
+            ParseScript(["repeat 2", "v"])
+
+class RunTest(unittest.TestCase):
+    def test_raw_write_sent(self):
+        dll = SimulatedDLL({"COM1": (1,)})
+        drive = IDEADrv("COM1", dll, "#001")
+        drive.OpenComms()
+        stream = io.StringIO()
+        runner = ScriptRunner(drive, CaptureWriter(stream, "jsonl"))
+        try:
+            self.assertEqual(runner.Run(ParseScript(["O500", "Z"])), 0)
+        finally:
+            runner.Close()
+            drive.CloseComms()
+        records = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual([r['response'] for r in records], ["`O*000", "`Z*000"])
+
+    def test_address_restored_after_move_elsewhere(self):
+        dll = SimulatedDLL({"COM1": (1, 2, 3)})
+        drive = IDEADrv("COM1", dll, "#001")
+        drive.OpenComms()
+        stream = io.StringIO()
+        runner = ScriptRunner(drive, CaptureWriter(stream, "jsonl"))
+        try:
+            script = ["address #002", "@#003 MoveToPosition 1000", "a", "@#003 wait"]
+            self.assertEqual(runner.Run(ParseScript(script)), 0)
+        finally:
+            runner.Close()
+            drive.CloseComms()
+        records = [json.loads(line) for line in stream.getvalue().splitlines()]
+        read = [r for r in records if r['command'] == "a"][0]
+        self.assertEqual((read['address'], read['response']), ("#002", "`a2*000"))
+        self.assertEqual(dll.Drive("COM1", 3).axis.Position(), 1000)
+
+if __name__ == "__main__":
+    unittest.main()
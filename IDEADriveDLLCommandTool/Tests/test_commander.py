@@ -0,0 +1,191 @@
+# Name:           test_commander.py
+# Environment:    Python 3.11
+# File Type:      Test
+# Description:    IDEADrv DLL sharing and per-call state on the simulated drive. Run from the tool folder:
+#                 python -m pytest Tests
+
+import os
+import sys
+import threading
+import unittest
+from ctypes import c_bool
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from IDEADrvCommander import (DLL_PROTOTYPES, DLLPrototypes, IDEADrv, BufferPool, RESPONSE_BYTES,
+                               RESPONSE_VIEW)
+from IDEADrvSimulator import SimulatedDLL
+
+class StandInFunction:
+    # Looks like a ctypes function: the prototype is set on it and the calls counted
+    def __init__(self):
+        self.argtypes = None
+        self.restype = None
+        self.calls = 0
+
+    def __call__(self, *args):
+        self.calls += 1
+        return True
+
+class StandInLibrary:
+    def __init__(self):
+        self.functions = {name: StandInFunction() for name in DLL_PROTOTYPES}
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return self.functions[name]
+
+class PrototypeTest(unittest.TestCase):
+    def test_bound_once(self):
+        library = StandInLibrary()
+        dll = DLLPrototypes(library)
+        function = dll.MoveToPosition
+        self.assertIs(dll.MoveToPosition, function)
+        self.assertEqual(function.argtypes, DLL_PROTOTYPES['MoveToPosition'][0])
+
+    def test_bool_results(self):
+        dll = DLLPrototypes(StandInLibrary())
+        dll.BindAll()
+        for name in ("SetMotorType", "SetInputs", "MoveToPosition", "IndexDistance", "GoAtSpeed", "RunToLabel",
+                     "ExecuteProgram", "DeleteProgram", "GetNVParameter", "DownloadProgram", "IsValidPassword",
+                     "RecallProgram", "UpdateFirmware", "RestoreFactoryDefaults"):
+            self.assertIs(getattr(dll, name).restype, c_bool, name)
+        self.assertIsNone(dll.SetCurrentAddress.restype)
+
+    def test_setters_called_directly(self):
+        # Bool setters keep the pre-encoded path of PrepareCall
+        drive = IDEADrv("COM1", SimulatedDLL({"COM1": (1,)}), "#001")
+        func, args = drive.PrepareCall("SetMotorType", "2")
+        self.assertIs(func, drive.dll.SetMotorType)
+        self.assertEqual(args, (b"2", 1))
+
+    def test_simulated_move_acknowledged(self):
+        drive = IDEADrv("COM1", SimulatedDLL({"COM1": (1,)}), "#001")
+        drive.OpenComms()
+        self.addCleanup(drive.CloseComms)
+        self.assertIs(drive.MoveToPosition("1000"), True)
+
+class ReadBufferTest(unittest.TestCase):
+    def setUp(self):
+        self.drive = IDEADrv("COM1", SimulatedDLL({"COM1": (1,)}), "#001")
+        self.drive.OpenComms()
+        self.addCleanup(self.drive.CloseComms)
+
+    def test_command_list_grows(self):
+        full = self.drive.GetCommandList()
+        self.drive.bufferSizes.clear()
+        self.drive.MAX_STREAM_BUFF_SIZE = 64
+        self.assertEqual(self.drive.GetCommandList(), full)
+        self.assertGreater(self.drive.bufferSizes['GetCommandList'], len(full))
+
+    def test_size_remembered_per_command(self):
+        self.drive.MAX_BUFSIZE = 8
+        version = self.drive.GetFirmwareVersion()
+        self.assertEqual(version, "`v5.12.3*000\n")
+        self.assertEqual(list(self.drive.bufferSizes.values()), [32])
+        self.drive.GetFirmwareVersion()
+        self.assertEqual(list(self.drive.bufferSizes.values()), [32])
+
+class ResponseModeTest(unittest.TestCase):
+    def setUp(self):
+        self.drive = IDEADrv("COM1", SimulatedDLL({"COM1": (1,)}), "#001")
+        self.drive.OpenComms()
+        self.addCleanup(self.drive.CloseComms)
+
+    def test_buffer_reused(self):
+        pool = BufferPool()
+        buf = pool.Acquire(64)
+        pool.Release(buf)
+        self.assertIs(pool.Acquire(64), buf)
+        self.assertIsNot(pool.Acquire(64), buf)
+        large = BufferPool(maxPooledSize=32)
+        big = large.Acquire(64)
+        large.Release(big)
+        self.assertIsNot(large.Acquire(64), big)
+
+    def test_bytes_mode(self):
+        self.drive.SetResponseMode(RESPONSE_BYTES)
+        self.assertEqual(self.drive.GetFirmwareVersion(), b"`v5.12.3*000\r\n")
+
+    def test_view_mode(self):
+        self.drive.SetResponseMode(RESPONSE_VIEW)
+        view = self.drive.GetFirmwareVersion()
+        self.assertIsInstance(view, memoryview)
+        self.assertEqual(bytes(view), b"`v5.12.3*000\r\n")
+        self.drive.GetDriveAddress()
+        self.assertEqual(bytes(self.drive.GetDriveAddress()), b"`a1*000\r\n")
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            self.drive.SetResponseMode("text")
+
+class SharedDLLTest(unittest.TestCase):
+    def setUp(self):
+        self.dll = SimulatedDLL({"COM1": (1, 2)})
+        self.drives = [IDEADrv("COM1", self.dll, "#00" + str(n)) for n in (1, 2)]
+        self.drives[0].OpenComms()
+        self.addCleanup(self.drives[0].CloseComms)
+
+    def test_drives_share_prototypes(self):
+        self.assertIs(self.drives[0].dll, self.drives[1].dll)
+
+    def test_alternating_addresses(self):
+        a, b = self.drives
+        a.SetCurrentAddress("#001")
+        b.SetCurrentAddress("#002")
+        a.SetCurrentAddress("#001")
+        self.assertEqual(a.GetDriveAddress(), "`a1*000\n")
+        b.SetCurrentAddress("#002")
+        self.assertEqual(b.GetDriveAddress(), "`a2*000\n")
+
+    def test_thread_safe_shared(self):
+        # One drive asking for thread safety locks the calls of every drive on the DLL
+        drive = IDEADrv("COM1", self.dll, "#001", threadSafe=True)
+        self.assertIs(drive.dll, self.drives[0].dll)
+        self.assertTrue(self.drives[0].dll.threadSafe)
+
+    def test_transactions_serialized(self):
+        errors = []
+
+        def run(drive, response):
+            for _ in range(200):
+                with drive.Transaction(drive.IDriveAddress):
+                    if drive.GetDriveAddress() != response:
+                        errors.append(response)
+
+        threads = [threading.Thread(target=run, args=(drive, "`a" + str(n) + "*000\n"))
+                   for n, drive in zip((1, 2), self.drives)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+class DeferredLoadTest(unittest.TestCase):
+    def setUp(self):
+        self.dll = SimulatedDLL({"COM1": (1, 2)})
+
+    def test_constructor_does_not_load(self):
+        drive = IDEADrv("COM1", self.dll, "#002")
+        self.assertFalse(drive.IsDLLLoaded())
+        drive.CloseComms()
+        self.assertFalse(drive.IsDLLLoaded())
+
+    def test_first_call_loads(self):
+        drive = IDEADrv("COM1", self.dll, "#002")
+        drive.OpenComms()
+        self.addCleanup(drive.CloseComms)
+        self.assertTrue(drive.IsDLLLoaded())
+        self.assertEqual(drive.GetDriveAddress(), "`a2*000\n")
+
+    def test_load_sets_address(self):
+        drive = IDEADrv("COM1", self.dll, "#002")
+        dll = drive.LoadDLL()
+        self.assertIs(drive.dll, dll)
+        self.assertEqual(dll.currentAddress, "#002")
+        self.assertIs(IDEADrv("COM1", self.dll, "#001").LoadDLL(), dll)
+        self.assertEqual(dll.currentAddress, "#001")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+# Name:           test_commandset.py
+# Environment:    Python 3.11
+# File Type:      Test
+# Description:    The in-memory and on-disk command database, on the simulated drive. Run from the tool
+#                 folder: python -m pytest Tests
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from IDEADrvCommandSet import CommandSet
+from IDEADrvCommander import IDEADrv
+from IDEADrvSimulator import SimulatedDLL
+
+class CommandSetTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder)
+        self.path = os.path.join(self.folder, "commands.json")
+        self.drive = IDEADrv("COM1", SimulatedDLL({"COM1": (1,)}), "#001")
+        self.drive.OpenComms()
+        self.addCleanup(self.drive.CloseComms)
+
+    def Lookups(self):
+        drive = self.drive
+        return (drive.GetCommandList(), drive.GetCommandLetterFromDescriptive("Move To Position"),
+                drive.GetCommandName("l"), drive.GetParameterList("M"), drive.GetOutputFieldList("l"),
+                drive.GetNumberOfParametersDesc("Move To Position"), drive.GetNumberOfOutputsDesc("Get Position Velocity"))
+
+    def test_cached_answers_match_dll(self):
+        fromDLL = self.Lookups()
+        self.drive.InitializeCommandSet()
+        self.assertIn("Move To Position", self.drive.commandSet)
+        self.assertEqual(self.Lookups(), fromDLL)
+
+    def test_cached_lookups_skip_dll(self):
+        self.drive.InitializeCommandSet()
+        instrumentation = self.drive.EnableInstrumentation()
+        self.Lookups()
+        self.drive.DisableInstrumentation()
+        self.assertEqual(instrumentation.Snapshot(), {})
+
+    def test_saved_and_loaded(self):
+        self.drive.SetCommandSetCachePath(self.path)
+        self.drive.InitializeCommandSet()
+        loaded = CommandSet.Load(self.path)
+        self.assertEqual(loaded.Names(), self.drive.commandSet.Names())
+        self.assertEqual(loaded.Info("l").OutputFieldList(), "Position,Velocity")
+        self.assertIsNone(CommandSet.Load(self.path, ["other.dll", 1, 2]))
+        self.assertIsNone(CommandSet.Load(os.path.join(self.folder, "missing.json")))
+
+    def test_warm_cache_skips_dll(self):
+        self.drive.SetCommandSetCachePath(self.path)
+        self.drive.InitializeCommandSet()
+        drive = IDEADrv("COM1", SimulatedDLL({"COM1": (1,)}), "#001")
+        drive.SetCommandSetCachePath(self.path)
+        drive.LoadCommandSet()
+        self.assertFalse(drive.IsDLLLoaded())
+        self.assertEqual(drive.commandSet.Names(), self.drive.commandSet.Names())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+# Name:           test_config.py
+# Environment:    Python 3.11
+# File Type:      Test
+# Description:    Configuration snapshots captured from and pushed to the simulated drive. Run from the tool
+#                 folder: python -m pytest Tests
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from IDEADrvCommander import IDEADrv
+from IDEADrvConfig import CaptureSnapshot, ConfigSnapshot, Diff, PushSnapshot
+from IDEADrvSimulator import SimulatedDLL
+
+class PushSnapshotTest(unittest.TestCase):
+    def setUp(self):
+        self.dll = SimulatedDLL({"COM1": (1,)})
+        self.drive = IDEADrv("COM1", self.dll, "#001")
+        self.drive.OpenComms()
+        self.addCleanup(self.drive.CloseComms)
+        self.current = CaptureSnapshot(self.drive)
+        self.target = ConfigSnapshot(self.current.values)
+
+    def test_changed_items_written(self):
+        self.target.values['MotorType'] = ['2']
+        self.target.values['FaultParameters'] = ['0', '-2000', '2000', '400', '1000']
+        self.assertEqual(sorted(Diff(self.current, self.target)), ['FaultParameters', 'MotorType'])
+        results, after = PushSnapshot(self.drive, self.target, self.current)
+        #One setter for the motor type, the fault parameters split over their three setters
+        self.assertEqual([r.command for r in results], ['SetMotorType', 'SetPositionLimitFault',
+                                                        'SetCurrentLimitDurationFault', 'SetPositionErrorFault'])
+        self.assertEqual(Diff(after, self.target), [])
+        self.assertEqual(Diff(CaptureSnapshot(self.drive), self.target), [])
+
+    def test_rejected_setter_not_recorded(self):
+        self.target.values['MotorType'] = ['2']
+        #No reply: the setter returns False
+        self.dll.Link("COM1").dropRate = 1.0
+        results, after = PushSnapshot(self.drive, self.target, self.current)
+        self.assertIs(results[0].response, False)
+        self.assertEqual(after.values['MotorType'], ['3'])
+
+if __name__ == "__main__":
+    unittest.main()
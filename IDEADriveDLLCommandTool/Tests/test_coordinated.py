@@ -0,0 +1,64 @@
+# Name:           test_coordinated.py
+# Environment:    Python 3.11
+# File Type:      Test
+# Description:    CoordinatedMove arming and dispatch on the simulated drive. Run from the tool folder:
+#                 python -m pytest Tests
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from IDEADrvCommandSet import CommandInfo, CommandSet
+from IDEADrvCommander import IDEADrv
+from IDEADrvCoordinated import (AxisMove, CoordinatedMove, SharedTransfer, DISPATCH_DIRECT,
+                                DISPATCH_PROGRAM)
+from IDEADrvMotion import MoveTracker
+from IDEADrvSimulator import SimulatedDLL
+
+class CoordinatedMoveTest(unittest.TestCase):
+    def setUp(self):
+        self.dll = SimulatedDLL({"COM1": (1, 2, 3)})
+        self.drive = IDEADrv("COM1", self.dll, "#001")
+        self.drive.OpenComms()
+        self.addCleanup(self.drive.CloseComms)
+
+    def Position(self, address):
+        return self.dll.Drive("COM1", address).axis.Position()
+
+    def test_program_dispatch_tracked(self):
+        move = CoordinatedMove(self.drive, [(2, "1000"), (3, "2000")], DISPATCH_PROGRAM).Arm()
+        result = move.Dispatch()
+        self.assertTrue(result.Ok())
+        tracker = MoveTracker()
+        self.addCleanup(tracker.Stop)
+        handles = result.Track(tracker, self.drive)
+        self.assertEqual([handle.address for handle in handles], ["#002", "#003"])
+        for handle in handles:
+            self.assertTrue(handle.Wait(10))
+        self.assertEqual((self.Position(2), self.Position(3)), (1000, 2000))
+        #Tracking polled the axes through the drive without moving it off its own address
+        self.assertEqual(self.drive.IDriveAddress, "#001")
+        self.assertEqual(self.drive.GetDriveAddress(), "`a1*000\n")
+
+    def test_direct_acknowledged(self):
+        result = CoordinatedMove(self.drive, [(2, "500"), (3, "600")], DISPATCH_DIRECT).Dispatch()
+        self.assertEqual([axis.acknowledged for axis in result.axes], [True, True])
+        self.assertEqual(self.drive.IDriveAddress, "#001")
+
+    def test_letters_from_command_set(self):
+        self.drive.commandSet = CommandSet([CommandInfo("Move To Position", "X", (), ())])
+        self.assertEqual(AxisMove(2, "1000").ProgramLine(self.drive), "X1000")
+
+    def test_arm_state_per_dll(self):
+        other = IDEADrv("COM1", self.dll, "#002")
+        self.assertIs(SharedTransfer(other), SharedTransfer(self.drive))
+        separate = IDEADrv("COM1", SimulatedDLL({"COM1": (1,)}), "#001")
+        self.assertIsNot(SharedTransfer(separate), SharedTransfer(self.drive))
+        CoordinatedMove(self.drive, [(2, "1000")], DISPATCH_PROGRAM).Arm()
+        self.assertEqual(len(self.drive.dll.armedPrograms["COM1|#002"]), 1)
+        self.assertEqual(separate.dll.armedPrograms, {})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+# Name:           test_discovery.py
+# Environment:    Python 3.11
+# File Type:      Test
+# Description:    Port and drive discovery against simulated serial ports. Run from the tool folder:
+#                 python -m pytest Tests
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from IDEADrvCommander import IDEADrv
+from IDEADrvDiscovery import DiscoveryResult, DriveDiscovery, LoadPortList, SavePortList
+from IDEADrvSimulator import SimulatedDLL
+
+PORTS = ["A", "B", "C", "D"]
+
+class SimulatedPorts:
+    # Port opener taking delays[port] seconds to open a port; missing ports do not open
+    def __init__(self, delays):
+        self.delays = delays
+
+    def __call__(self, port, timeout):
+        if port not in self.delays:
+            return False
+        time.sleep(self.delays[port])
+        return True
+
+class ScanPortsTest(unittest.TestCase):
+    def Discovery(self, delays, drive=None):
+        return DriveDiscovery(drive, maxWorkers=4, portTimeout=0.5, portLister=lambda: list(PORTS),
+                              portOpener=SimulatedPorts(delays))
+
+    def test_slow_consumer_gets_every_port(self):
+        discovery = self.Discovery({"A": 0.0, "B": 0.1, "C": 0.2, "D": 0.3})
+        found = []
+        for port in discovery.ScanPorts():
+            found.append(port)
+            time.sleep(0.6)
+        self.assertEqual(found, PORTS)
+
+    def test_hung_port_given_up(self):
+        discovery = self.Discovery({"A": 0.0, "B": 2.0, "D": 0.1})
+        start = time.monotonic()
+        self.assertEqual(discovery.AvailablePorts(), ["A", "D"])
+        self.assertLess(time.monotonic() - start, 1.5)
+        self.assertEqual(discovery.portCache["B"][1], False)
+        self.assertEqual(discovery.portCache["C"][1], False)
+
+    def test_cached_ports_not_probed(self):
+        opener = SimulatedPorts({"A": 0.0})
+        discovery = DriveDiscovery(portLister=lambda: ["A"], portOpener=opener)
+        self.assertEqual(discovery.AvailablePorts(), ["A"])
+        opener.delays = {}
+        self.assertEqual(discovery.AvailablePorts(), ["A"])
+        self.assertEqual(discovery.AvailablePorts(force=True), [])
+
+    def test_discover_slow_consumer(self):
+        dll = SimulatedDLL({"A": (1,), "B": (2, 3), "C": (), "D": (4,)})
+        drive = IDEADrv("A", dll, "#001")
+        discovery = self.Discovery({"A": 0.0, "B": 0.1, "C": 0.2, "D": 0.3}, drive)
+        found = []
+        for result in discovery.Discover():
+            found.append((result.port, result.address))
+            time.sleep(0.6)
+        self.assertEqual(found, [("A", 1), ("B", 2), ("B", 3), ("D", 4)])
+        self.assertEqual(discovery.driveCache["B"][1][0], DiscoveryResult("B", 2, "`v5.12.3*000\n"))
+        self.assertEqual(drive.IDriveAddress, "#001")
+
+class PortListTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder)
+        self.path = os.path.join(self.folder, "ports.json")
+
+    def test_saved_and_loaded(self):
+        SavePortList(self.path, ["D", "A"])
+        self.assertEqual(LoadPortList(self.path), ["A", "D"])
+        self.assertEqual(LoadPortList(os.path.join(self.folder, "missing.json")), [])
+
+    def test_only_candidates_probed(self):
+        probed = []
+
+        def opener(port, timeout):
+            probed.append(port)
+            return port != "C"
+
+        discovery = DriveDiscovery(portLister=lambda: list(PORTS), portOpener=opener)
+        self.assertEqual(sorted(discovery.ScanPorts(candidates=["A", "C"])), ["A"])
+        self.assertEqual(sorted(probed), ["A", "C"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+# Name:           test_fleet.py
+# Environment:    Python 3.11
+# File Type:      Test
+# Description:    DriveFleet supervision with simulated drives in worker processes: queued calls, hung
+#                 calls and dead workers. Run from the tool folder: python -m pytest Tests
+
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from IDEADrvFleet import DriveFleet, FleetClosedError, WorkerRestartedError
+from IDEADrvSimulator import SimulatedLibrary
+
+BUSES = {"COM1": (1,)}
+
+class FleetSupervisionTest(unittest.TestCase):
+    def Fleet(self, latency, callTimeout):
+        fleet = DriveFleet(SimulatedLibrary(BUSES, latency=latency), BUSES, callTimeout=callTimeout)
+        self.addCleanup(fleet.Close)
+        return fleet
+
+    def test_queued_calls_not_hung(self):
+        # Five calls of 0.3 s each wait 1.5 s in total, each one runs well within the timeout
+        fleet = self.Fleet(0.3, 0.8)
+        futures = [fleet.Submit("COM1", 1, "GetFirmwareVersion") for _ in range(5)]
+        for future in futures:
+            self.assertTrue(future.result(timeout=30))
+        self.assertEqual(fleet.Stats()[0]['restarts'], 0)
+
+    def test_hung_call_restarts_worker(self):
+        fleet = self.Fleet(2.0, 0.5)
+        future = fleet.Submit("COM1", 1, "GetFirmwareVersion")
+        with self.assertRaises(WorkerRestartedError) as raised:
+            future.result(timeout=30)
+        self.assertEqual(raised.exception.reason, "hung")
+        self.assertEqual(fleet.Stats()[0]['lastRestartReason'], "hung")
+
+    def test_dead_worker_restarted(self):
+        fleet = self.Fleet(0.0, 5.0)
+        self.assertTrue(fleet.Call("COM1", 1, "GetFirmwareVersion"))
+        worker = fleet.routes["COM1"]
+        worker.process.kill()
+        worker.process.join()
+        for _ in range(300):
+            if worker.restarts:
+                break
+            time.sleep(0.01)
+        self.assertEqual(worker.lastRestartReason, "died")
+        self.assertTrue(fleet.Call("COM1", 1, "GetFirmwareVersion"))
+
+    def test_submit_after_close(self):
+        fleet = self.Fleet(0.0, 5.0)
+        fleet.Close()
+        with self.assertRaises(FleetClosedError):
+            fleet.Submit("COM1", 1, "GetFirmwareVersion")
+
+if __name__ == "__main__":
+    unittest.main()
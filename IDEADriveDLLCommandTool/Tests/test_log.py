@@ -0,0 +1,81 @@
+# Name:           test_log.py
+# Environment:    Python 3.11
+# File Type:      Test
+# Description:    Telemetry log recording and reading on the simulated drive. Run from the tool folder:
+#                 python -m pytest Tests
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from IDEADrvCommander import IDEADrv
+from IDEADrvLog import TelemetryLog, TelemetryRecorder
+from IDEADrvSimulator import SimulatedDLL
+
+class TelemetryLogTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder)
+        self.path = os.path.join(self.folder, "run.ideatlog")
+        self.dll = SimulatedDLL({"COM1": (1, 2)})
+        self.drives = [IDEADrv("COM1", self.dll, "#00" + str(n)) for n in (1, 2)]
+        self.drives[0].OpenComms()
+
+    def test_followers_merged_in_time_order(self):
+        streamers = [drive.StartTelemetry(rate=200.0) for drive in self.drives]
+        recorder = TelemetryRecorder(self.path, streamers[0].ring.channels)
+        for drive, streamer in zip(self.drives, streamers):
+            recorder.Follow(streamer, drive.IDriveAddress, owned=True)
+        time.sleep(0.6)
+        recorder.Close()
+        self.drives[0].CloseComms()
+        with TelemetryLog(self.path) as log:
+            times = list(log.Timestamps())
+            self.assertEqual(len(log), sum(streamer.ring.total for streamer in streamers))
+            self.assertEqual(times, sorted(times))
+            self.assertEqual(log.Addresses(), [1, 2])
+            middle = times[len(times) // 2]
+            start, stop = log.IndexRange(middle)
+            self.assertEqual(stop - start, sum(1 for t in times if t >= middle))
+            del times
+
+    def test_late_follower_kept_in_order(self):
+        first = self.drives[0].StartTelemetry(rate=200.0)
+        recorder = TelemetryRecorder(self.path, first.ring.channels)
+        recorder.Follow(first, "#001", owned=True)
+        time.sleep(0.4)
+        late = self.drives[1].StartTelemetry(rate=200.0)
+        time.sleep(0.4)
+        recorder.Follow(late, "#002", owned=True)
+        time.sleep(0.4)
+        recorder.Close()
+        self.drives[0].CloseComms()
+        #Rows of the late streamer from before rows already written are dropped, the rest merged in order
+        self.assertGreater(recorder.late, 0)
+        with TelemetryLog(self.path) as log:
+            times = list(log.Timestamps())
+            self.assertEqual(times, sorted(times))
+            self.assertEqual(len(log), first.ring.total + late.ring.total - recorder.late)
+            self.assertEqual(log.Addresses(), [1, 2])
+            del times
+
+    def test_append_and_reopen(self):
+        recorder = TelemetryRecorder(self.path, ("a", "b"))
+        recorder.Append(1.0, "#001", (1.0, 2.0))
+        recorder.AppendRows("#002", [(2.0, 3.0, 4.0), (3.0, 5.0, 6.0)])
+        recorder.Close()
+        recorder = TelemetryRecorder(self.path, ("a", "b"))
+        recorder.Append(4.0, 1, (7.0, 8.0))
+        recorder.Close()
+        with TelemetryLog(self.path) as log:
+            self.assertEqual(log.Record(1), (2.0, 2, 3.0, 4.0))
+            self.assertEqual(list(log.Column("b")), [2.0, 4.0, 6.0, 8.0])
+            self.assertEqual(log.IndexRange(2.0, 4.0), (1, 3))
+
+if __name__ == "__main__":
+    unittest.main()
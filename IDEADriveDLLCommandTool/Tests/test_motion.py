@@ -0,0 +1,43 @@
+# Name:           test_motion.py
+# Environment:    Python 3.11
+# File Type:      Test
+# Description:    MoveTracker on the simulated drive. Run from the tool folder: python -m pytest Tests
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from IDEADrvCommander import IDEADrv
+from IDEADrvMotion import MoveTracker
+from IDEADrvSimulator import SimulatedDLL
+
+class MoveTrackerTest(unittest.TestCase):
+    def setUp(self):
+        self.dll = SimulatedDLL({"COM1": (1, 2)})
+        self.drive = IDEADrv("COM1", self.dll, "#001")
+        self.drive.OpenComms()
+        self.tracker = MoveTracker()
+        self.addCleanup(self.drive.CloseComms)
+        self.addCleanup(self.tracker.Stop)
+
+    def test_move_completes(self):
+        handle = self.tracker.MoveToPosition(self.drive, "2000")
+        self.assertTrue(handle.Wait(10))
+        self.assertIsNone(handle.Exception())
+        self.assertGreaterEqual(handle.polls, 1)
+
+    def test_address_kept_after_tracked_move(self):
+        # The move and its polls go to #002; the drive stays on #001
+        with self.drive.Transaction("#002"):
+            handle = self.tracker.MoveToPosition(self.drive, "2000")
+        self.assertEqual(handle.address, "#002")
+        self.assertTrue(handle.Wait(10))
+        self.assertEqual(self.drive.IDriveAddress, "#001")
+        self.assertEqual(self.drive.GetDriveAddress(), "`a1*000\n")
+        self.assertEqual(self.dll.Drive("COM1", 2).axis.Position(), 2000)
+        self.assertEqual(self.dll.Drive("COM1", 1).axis.Position(), 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+# Name:           test_parser.py
+# Environment:    Python 3.11
+# File Type:      Test
+# Description:    Response parsing into typed records, on the simulated drive. Run from the tool folder:
+#                 python -m pytest Tests
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from IDEADrvCommander import IDEADrv, RESPONSE_BYTES
+from IDEADrvParser import (FieldIdentifier, ResponseBody, ResponseFlag, ResponseSchema, ResponseValues,
+                           ToNumber)
+from IDEADrvSimulator import SimulatedDLL
+
+class ValuesTest(unittest.TestCase):
+    def test_to_number(self):
+        self.assertEqual([ToNumber(t) for t in ("12", "-3", "1.5", "0101", "0", "abc ")],
+                         [12, -3, 1.5, "0101", 0, "abc"])
+
+    def test_field_identifier(self):
+        self.assertEqual(FieldIdentifier("Position (counts)", 0), "PositionCounts")
+        self.assertEqual(FieldIdentifier("", 3), "Field3")
+        self.assertEqual(FieldIdentifier("2nd gain", 1), "Field12ndGain")
+
+    def test_response_values(self):
+        self.assertEqual(ResponseBody("`l100,-20*000\n"), "100,-20")
+        self.assertEqual(ResponseValues(b"`l100,-20*000\r\n"), [100, -20])
+        self.assertEqual(ResponseValues("`s*000\n"), [])
+        self.assertTrue(ResponseFlag("`o1*000\n"))
+        self.assertFalse(ResponseFlag("`o0*000\n"))
+
+    def test_duplicate_fields(self):
+        schema = ResponseSchema("x", ["Gain", "Gain"])
+        record = schema.Parse("`x1,2*000\n")
+        self.assertEqual(type(record).FIELDS, ("Gain", "Gain_"))
+        self.assertEqual(record.AsTuple(), (1, 2))
+        #A record has no __dict__, only its slots
+        with self.assertRaises(AttributeError):
+            record.other = 3
+
+class ParseResponseTest(unittest.TestCase):
+    def setUp(self):
+        self.dll = SimulatedDLL({"COM1": (1,)})
+        self.drive = IDEADrv("COM1", self.dll, "#001")
+        self.drive.OpenComms()
+        self.addCleanup(self.drive.CloseComms)
+
+    def test_fields_from_dll(self):
+        self.dll.Drive("COM1", 1).axis.origin = 1500
+        record = self.drive.ParseResponse("l", self.drive.GetPositionVelocity())
+        self.assertEqual((record.Position, record.Velocity), (1500, 0))
+        self.assertEqual(record.AsDict(), {'Position': 1500, 'Velocity': 0})
+        self.assertIs(self.drive.responseParser.GetSchema("l"), self.drive.responseParser.GetSchema("l"))
+
+    def test_bit_patterns_kept(self):
+        record = self.drive.ParseResponse("i", self.drive.GetIOReading())
+        self.assertEqual(record.AsTuple(), ("0000", "0000"))
+
+    def test_bytes_response(self):
+        self.drive.SetResponseMode(RESPONSE_BYTES)
+        record = self.drive.ParseResponse("l", self.drive.GetPositionVelocity())
+        self.assertEqual(record.AsTuple(), (0, 0))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+# Name:           test_program.py
+# Environment:    Python 3.11
+# File Type:      Test
+# Description:    ProgramTransfer on the simulated drive: name lines, separate downloads, skipping and
+#                 verification. Run from the tool folder: python -m pytest Tests
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from IDEADrvCommander import IDEADrv
+from IDEADrvParser import ResponseBody
+from IDEADrvProgram import Program, ProgramLines, ProgramTransfer
+from IDEADrvSimulator import SimulatedDLL
+
+class ProgramTransferTest(unittest.TestCase):
+    def setUp(self):
+        self.dll = SimulatedDLL({"COM1": (1, 2)})
+        self.drive = IDEADrv("COM1", self.dll, "#001")
+        self.drive.OpenComms()
+        self.transfer = ProgramTransfer()
+
+    def tearDown(self):
+        self.drive.CloseComms()
+
+    def Stored(self, name, address=1):
+        return self.dll.Drive("COM1", address).programs.get(name)
+
+    def test_name_line_added(self):
+        program = Program("P1", "M100\rI50")
+        self.assertEqual(program.lines, ["P1", "M100", "I50"])
+        self.assertEqual(Program("P1", "P1\rM100\rI50").hash, program.hash)
+        self.assertTrue(self.transfer.Download(self.drive, program).Ok())
+        self.assertEqual(self.Stored("P1"), ["P1", "M100", "I50"])
+        self.assertIsNone(self.Stored("M100"))
+
+    def test_download_all_keeps_programs_apart(self):
+        results = self.transfer.DownloadAll(self.drive, [Program("A", "M100"), Program("B", "I5\rI6")])
+        self.assertEqual([r.action for r in results], ["downloaded", "downloaded"])
+        self.assertEqual(self.Stored("A"), ["A", "M100"])
+        self.assertEqual(self.Stored("B"), ["B", "I5", "I6"])
+        self.assertEqual(ProgramLines(ResponseBody(self.transfer.Recall(self.drive, "A"))), ["A", "M100"])
+
+    def test_unchanged_program_skipped(self):
+        program = Program("A", "M100")
+        self.transfer.Download(self.drive, program)
+        self.assertEqual(self.transfer.Download(self.drive, program).action, "skipped")
+        self.assertEqual(self.transfer.Download(self.drive, Program("A", "M200")).action, "downloaded")
+
+    def test_verify_invalidates_replaced_program(self):
+        program = Program("A", "M100")
+        self.transfer.Download(self.drive, program)
+        ProgramTransfer().Download(self.drive, Program("A", "M999"))
+        self.assertFalse(self.transfer.Verify(self.drive, program))
+        self.assertIsNone(self.transfer.cache.Get(self.drive, "A"))
+        self.assertEqual(self.transfer.Download(self.drive, program).action, "downloaded")
+
+    def test_unconfirmed_download_not_cached(self):
+        transfer = self.transfer
+        transfer.Recall = lambda drive, name: "`P" + name + "\nM1*000\r\n"
+        result = transfer.Download(self.drive, Program("A", "M100"))
+        self.assertEqual(result.action, "failed")
+        self.assertIsNone(transfer.cache.Get(self.drive, "A"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,30 @@
+# Name:           test_simulator.py
+# Environment:    Python 3.11
+# File Type:      Test
+# Description:    Command set queries of the simulated DLL. Run from the tool folder: python -m pytest Tests
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from IDEADrvCommander import IDEADrv
+from IDEADrvSimulator import SimulatedDLL
+
+class CommandInfoTest(unittest.TestCase):
+    def setUp(self):
+        self.drive = IDEADrv("COM1", SimulatedDLL({"COM1": (1,)}), "#001")
+
+    def test_descriptive_names(self):
+        self.assertEqual(self.drive.GetNumberOfParametersDesc("Set Position Limit Fault"), 3)
+        self.assertEqual(self.drive.GetNumberOfOutputsDesc("Get Position Velocity"), 2)
+        self.assertEqual(self.drive.GetCommandLetterFromDescriptive("Move To Position"), "M")
+
+    def test_function_names_not_found(self):
+        self.assertEqual(self.drive.GetNumberOfParametersDesc("SetPositionLimitFault"), 0)
+        self.assertEqual(self.drive.GetNumberOfOutputsDesc("GetPositionVelocity"), 0)
+        self.assertEqual(self.drive.GetCommandLetterFromDescriptive("MoveToPosition"), "")
+
+if __name__ == "__main__":
+    unittest.main()
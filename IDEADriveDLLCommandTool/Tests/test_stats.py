@@ -0,0 +1,47 @@
+# Name:           test_stats.py
+# Environment:    Python 3.11
+# File Type:      Test
+# Description:    Instrumentation of DLL calls on the simulated drive. Run from the tool folder:
+#                 python -m pytest Tests
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from IDEADrvCommander import IDEADrv
+from IDEADrvSimulator import SimulatedDLL
+
+class InstrumentationTest(unittest.TestCase):
+    def setUp(self):
+        self.dll = SimulatedDLL({"COM1": (1, 2)})
+        self.drive = IDEADrv("COM1", self.dll, "#001")
+        self.instrumentation = self.drive.EnableInstrumentation()
+        self.drive.OpenComms()
+
+    def tearDown(self):
+        self.drive.DisableInstrumentation()
+        self.drive.CloseComms()
+
+    def test_char_buffer_measured(self):
+        response = self.drive.GetFirmwareVersion()
+        stats = self.instrumentation.Snapshot()['GetFWVersion']
+        self.assertEqual(stats['calls'], 1)
+        #The buffer still holds the "\r" that the response string has lost
+        self.assertEqual(stats['bytesOut'], len(response) + 1)
+        self.assertEqual(stats['timeouts'], 0)
+
+    def test_int_array_not_measured(self):
+        addresses = self.drive.GetAllAvailableAddresses()
+        self.assertIsNotNone(addresses)
+        stats = self.instrumentation.Snapshot()['GetAddresses']
+        self.assertEqual((stats['calls'], stats['errors'], stats['bytesOut'], stats['timeouts']), (1, 0, 0, 0))
+
+    def test_empty_response_is_timeout(self):
+        self.dll.Link("COM1").dropRate = 1.0
+        self.drive.GetFirmwareVersion()
+        self.assertEqual(self.instrumentation.Snapshot()['GetFWVersion']['timeouts'], 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+# Name:           test_telemetry.py
+# Environment:    Python 3.11
+# File Type:      Test
+# Description:    Telemetry ring buffer and streamer on the simulated drive. Run from the tool folder:
+#                 python -m pytest Tests
+
+import math
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from IDEADrvCommander import IDEADrv
+from IDEADrvSimulator import SimulatedDLL
+from IDEADrvTelemetry import MinMaxHistory, SampleValue, TelemetryRing
+
+class TelemetryRingTest(unittest.TestCase):
+    def setUp(self):
+        self.ring = TelemetryRing(("a", "b"), 3)
+        for n in range(5):
+            self.ring.Append(float(n), (10.0 * n, -n))
+
+    def test_wraps(self):
+        self.assertEqual((len(self.ring), self.ring.total), (3, 5))
+        self.assertEqual(self.ring.Row(0), (2.0, 20.0, -2.0))
+        self.assertEqual(self.ring.Latest(2), [(3.0, 30.0, -3.0), (4.0, 40.0, -4.0)])
+        self.assertEqual(list(self.ring.Column("a")), [20.0, 30.0, 40.0])
+        self.assertEqual(list(self.ring.Column("timestamp")), [2.0, 3.0, 4.0])
+
+    def test_views_share_memory(self):
+        views = self.ring.Views()
+        self.assertEqual(len(views), 2)
+        self.assertEqual(sum(len(view) for view in views), 3 * self.ring.width)
+        self.ring.Append(5.0, (50.0, -5.0))
+        self.assertIn(5.0, list(views[0]) + list(views[1]))
+
+    def test_rows_since(self):
+        rows, total = self.ring.RowsSince(3)
+        self.assertEqual(([row[0] for row in rows], total), ([3.0, 4.0], 5))
+        #Rows already overwritten are left out
+        rows, total = self.ring.RowsSince(0)
+        self.assertEqual([row[0] for row in rows], [2.0, 3.0, 4.0])
+
+    def test_sample_value(self):
+        self.assertEqual(SampleValue("0101"), 101.0)
+        self.assertTrue(math.isnan(SampleValue("abc")))
+
+def Wave(n):
+    return (n % 37) - 0.5 * (n % 11)
+
+def BruteForce(rows, t0, t1, columns):
+    mins = [math.inf] * columns
+    maxs = [-math.inf] * columns
+    scale = columns / (t1 - t0)
+    for t, value in rows:
+        if t0 <= t <= t1:
+            column = min(columns - 1, int((t - t0) * scale))
+            mins[column] = min(mins[column], value)
+            maxs[column] = max(maxs[column], value)
+    return mins, maxs
+
+class MinMaxHistoryTest(unittest.TestCase):
+    def History(self, count, capacity):
+        history = MinMaxHistory(("value",), capacity=capacity, factor=4, levels=3)
+        rows = [(0.01 * n, float(Wave(n))) for n in range(count)]
+        for t, value in rows:
+            history.Append(t, (value,))
+        return history, rows
+
+    def test_raw_rows_exact(self):
+        # 200 rows fit in 40 columns of POINTS_PER_COLUMN, so the raw rows are used
+        history, rows = self.History(200, 1024)
+        mins, maxs = history.Decimate("value", 0.0, 2.0, 40)
+        expected = BruteForce(rows, 0.0, 2.0, 40)
+        self.assertEqual((mins, maxs), expected)
+
+    def test_summaries_bound_long_history(self):
+        # 64 rows per ring, 5000 rows appended: the older part only survives in the summary levels,
+        # the coarsest of which (64 blocks of 64 rows) reaches back to about row 900
+        history, rows = self.History(5000, 64)
+        self.assertEqual(len(history.raw), 64)
+        self.assertLess(history.levels[-1].Row(0)[0], 10.0)
+        mins, maxs = history.Decimate(0, 10.0, 50.0, 20)
+        expectedMins, expectedMaxs = BruteForce(rows, 10.0, 50.0, 20)
+        for column in range(20):
+            self.assertLessEqual(mins[column], expectedMins[column])
+            self.assertGreaterEqual(maxs[column], expectedMaxs[column])
+        self.assertEqual((min(mins), max(maxs)), (min(expectedMins), max(expectedMaxs)))
+
+    def test_empty_range(self):
+        history, _ = self.History(10, 64)
+        mins, maxs = history.Decimate("value", 5.0, 6.0, 3)
+        self.assertTrue(all(math.isnan(v) for v in mins + maxs))
+
+class TelemetryStreamerTest(unittest.TestCase):
+    def setUp(self):
+        self.dll = SimulatedDLL({"COM1": (1,)})
+        self.drive = IDEADrv("COM1", self.dll, "#001")
+        self.drive.OpenComms()
+        self.addCleanup(self.drive.CloseComms)
+
+    def test_streams_parsed_samples(self):
+        self.dll.Drive("COM1", 1).axis.origin = 250
+        streamer = self.drive.StartTelemetry(("GetPositionVelocity", "GetIOReading"), rate=200.0, capacity=1000)
+        self.addCleanup(streamer.Stop)
+        self.assertEqual(streamer.ring.channels, ("GetPositionVelocity.0", "GetPositionVelocity.1",
+                                                  "GetIOReading.0", "GetIOReading.1"))
+        rows = []
+        for row in streamer.Samples(timeout=1.0):
+            rows.append(row)
+            if len(rows) == 10:
+                break
+        streamer.Stop()
+        self.assertEqual(rows[0][1:], (250.0, 0.0, 0.0, 0.0))
+        self.assertEqual([row[0] for row in rows], sorted(row[0] for row in rows))
+        stats = streamer.Stats()
+        self.assertEqual(stats['samples'], streamer.ring.total)
+        self.assertGreater(stats['achievedRate'], 0.0)
+        self.assertFalse(streamer.IsRunning())
+
+    def test_read_errors_counted(self):
+        streamer = self.drive.StartTelemetry(("GetPositionVelocity",), rate=200.0)
+        self.addCleanup(streamer.Stop)
+        self.drive.GetPositionVelocity = None
+        time.sleep(0.1)
+        streamer.Stop()
+        self.assertGreater(streamer.errors, 0)
+        self.assertIsInstance(streamer.lastError, TypeError)
+
+if __name__ == "__main__":
+    unittest.main()
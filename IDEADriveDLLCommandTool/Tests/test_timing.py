@@ -0,0 +1,111 @@
+# Name:           test_timing.py
+# Environment:    Python 3.11
+# File Type:      Test
+# Description:    AdaptiveTimeouts retries and delay learning, with a scripted send function and on the
+#                 simulated drive. Run from the tool folder: python -m pytest Tests
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from IDEADrvCommander import IDEADrv
+from IDEADrvSimulator import SimulatedDLL
+from IDEADrvTiming import AdaptiveTimeouts, CommandTimeoutError, GarbledResponseError, MIN_DELAY
+
+GOOD = "`l100,0*000\r\n"
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class ScriptedSend:
+    # Answers with the given responses in turn; each call takes roundTrip ms or the write delay if longer
+    def __init__(self, clock, responses, roundTrip=10.0):
+        self.clock = clock
+        self.responses = list(responses)
+        self.roundTrip = roundTrip
+        self.calls = []
+
+    def __call__(self, command, writeDelay, readDelay):
+        self.calls.append((command, writeDelay, readDelay))
+        self.clock.now += max(writeDelay, self.roundTrip) / 1000.0
+        return self.responses.pop(0) if self.responses else GOOD
+
+def Timeouts(clock):
+    return AdaptiveTimeouts(clock=clock, sleep=lambda seconds: None)
+
+class RetryTest(unittest.TestCase):
+    def test_read_retried(self):
+        clock = FakeClock()
+        send = ScriptedSend(clock, ["", "`l1"])
+        self.assertEqual(Timeouts(clock).Send(send, "l"), GOOD)
+        self.assertEqual(len(send.calls), 3)
+        self.assertEqual(send.calls[1][1], 2 * send.calls[0][1])
+
+    def test_write_sent_once(self):
+        clock = FakeClock()
+        send = ScriptedSend(clock, ["", "", ""])
+        with self.assertRaises(CommandTimeoutError) as raised:
+            Timeouts(clock).Send(send, "I1000", retries=5)
+        self.assertEqual(len(send.calls), 1)
+        self.assertEqual(len(raised.exception.attempts), 1)
+
+    def test_garbled_write_sent_once(self):
+        clock = FakeClock()
+        send = ScriptedSend(clock, ["`M"])
+        with self.assertRaises(GarbledResponseError):
+            Timeouts(clock).Send(send, "M5000")
+        self.assertEqual(len(send.calls), 1)
+
+    def test_retry_opt_out(self):
+        clock = FakeClock()
+        timeouts = Timeouts(clock)
+        timeouts.SetRetry("l", False)
+        send = ScriptedSend(clock, [""])
+        with self.assertRaises(CommandTimeoutError):
+            timeouts.Send(send, "l")
+        self.assertEqual(len(send.calls), 1)
+        with self.assertRaises(ValueError):
+            timeouts.SetRetry("M", True)
+
+    def test_lost_move_reply_not_resent_on_drive(self):
+        dll = SimulatedDLL({"COM1": (1,)})
+        drive = IDEADrv("COM1", dll, "#001")
+        drive.OpenComms()
+        link = dll.Link("COM1")
+        link.dropRate = 1.0
+        before = link.transactions
+        with self.assertRaises(CommandTimeoutError):
+            drive.SendTimedCommand("I1000")
+        self.assertEqual(link.transactions - before, 1)
+        drive.CloseComms()
+
+class DelayTest(unittest.TestCase):
+    def test_early_response_probes_write_delay(self):
+        clock = FakeClock()
+        timeouts = Timeouts(clock)
+        send = ScriptedSend(clock, [], roundTrip=10.0)
+        timeouts.Send(send, "l")
+        #The default 60 ms write delay found the response waiting: the next read probes
+        self.assertEqual(timeouts.Policy("l").writeDelay, MIN_DELAY)
+        for _ in range(20):
+            timeouts.Send(send, "l")
+        policy = timeouts.Policy("l")
+        self.assertAlmostEqual(policy.roundTrip, 10.0, delta=0.5)
+        self.assertLessEqual(policy.writeDelay, 10)
+        self.assertGreaterEqual(policy.writeDelay + policy.readDelay, 10)
+
+    def test_fixed_delays_kept(self):
+        clock = FakeClock()
+        timeouts = Timeouts(clock)
+        timeouts.SetDelays("l", 40, 20)
+        timeouts.Send(ScriptedSend(clock, []), "l")
+        self.assertEqual(timeouts.Policy("l").Delays(), (40, 20))
+
+if __name__ == "__main__":
+    unittest.main()
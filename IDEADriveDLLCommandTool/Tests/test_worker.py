@@ -0,0 +1,85 @@
+# Name:           test_worker.py
+# Environment:    Python 3.11
+# File Type:      Test
+# Description:    DriveWorker jobs and main loop callbacks, with a stand-in for the Tk root. Run from the
+#                 tool folder: python -m pytest Tests
+
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from IDEADrvCommander import IDEADrv
+from IDEADrvSimulator import SimulatedDLL
+from IDEADrvWorker import DriveWorker
+
+class StandInRoot:
+    # Tk's after(), with the scheduled calls run by Update() on the calling thread
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, ms, func):
+        self.scheduled.append(func)
+
+    def Update(self):
+        scheduled, self.scheduled = self.scheduled, []
+        for func in scheduled:
+            func()
+
+class DriveWorkerTest(unittest.TestCase):
+    def setUp(self):
+        self.root = StandInRoot()
+        self.pending = []
+        self.errors = []
+        self.worker = DriveWorker(self.root, onPending=self.pending.append, onError=self.errors.append)
+        self.addCleanup(self.worker.Stop)
+
+    def RunUntilIdle(self, timeout=10.0):
+        deadline = time.monotonic() + timeout
+        while self.worker.Pending() and time.monotonic() < deadline:
+            self.root.Update()
+            time.sleep(0.001)
+        self.root.Update()
+
+    def test_callbacks_on_main_loop(self):
+        main = threading.current_thread()
+        calls = []
+
+        def job(value, report):
+            report(value)
+            calls.append(("job", threading.current_thread() is main))
+            return value * 2
+
+        self.worker.Submit(job, 21, done=lambda r: calls.append(("done", r, threading.current_thread() is main)),
+                           progress=lambda v: calls.append(("progress", v, threading.current_thread() is main)))
+        self.RunUntilIdle()
+        self.assertEqual(calls, [("job", False), ("progress", 21, True), ("done", 42, True)])
+        self.assertEqual(self.pending, [1, 0])
+
+    def test_errors(self):
+        failed = []
+        self.worker.Submit(lambda: 1 / 0, failed=failed.append)
+        self.worker.Submit(lambda: [][0])
+        self.RunUntilIdle()
+        self.assertIsInstance(failed[0], ZeroDivisionError)
+        self.assertIsInstance(self.errors[0], IndexError)
+
+    def test_drive_jobs_in_order(self):
+        drive = IDEADrv("COM1", SimulatedDLL({"COM1": (1, 2)}), "#001")
+        self.worker.Submit(drive.OpenComms)
+        responses = []
+        for address in ("#002", "#001", "#002"):
+            def job(address=address):
+                with drive.Transaction(address):
+                    return drive.GetDriveAddress()
+            self.worker.Submit(job, done=responses.append)
+        self.worker.Submit(drive.CloseComms)
+        self.RunUntilIdle()
+        self.assertEqual(responses, ["`a2*000\n", "`a1*000\n", "`a2*000\n"])
+        self.assertEqual(self.errors, [])
+
+if __name__ == "__main__":
+    unittest.main()